@@ -7,6 +7,7 @@
 let badgeData = null;
 let currentUser = null;
 let badgeSocket = null;
+let badgeVersion = 0;  // version of the last badge_event applied to badgeData
 
 // DOM elements - will be initialized after document load
 const loginSection = document.getElementById('login-section');
@@ -45,10 +46,25 @@ function connectBadgeWebSocket() {
         try {
             const data = JSON.parse(event.data);
             
-            if (data.type === 'badge_data_update' || data.type === 'badge_update_response') {
+            if (data.type === 'badge_event') {
+                handleBadgeEvent(data);
+            } else if (data.type === 'badge_data_update' || data.type === 'badge_update_response') {
                 if (data.status === 'success' && data.badge_data) {
                     badgeData = data.badge_data;
+                    badgeVersion = data.version || 0;
+                    refreshCurrentUser();
                     updateUI();
+                } else if (data.status === 'success' && data.action === 'get_activity_feed') {
+                    // Next (older) page of the activity feed
+                    if (badgeData) {
+                        badgeData.activityFeed.push(...data.activities);
+                        badgeData.activityFeedNext = data.next;
+                        initActivityFeed();
+                    }
+                } else if (data.status === 'success' && data.user) {
+                    // Login reply; a new user also arrives as a user_added event
+                    addUserIfMissing(data.user);
+                    loginUser(data.user.id);
                 } else if (data.status === 'error') {
                     console.error('Badge error:', data.message);
                     alert(`Error: ${data.message}`);
@@ -159,6 +175,79 @@ function setupEventListeners() {
     document.getElementById('nomination-form')?.addEventListener('submit', handleNomination);
 }
 
+// Apply a badge change broadcast by the server to the local copy of the badge data
+function handleBadgeEvent(event) {
+    if (!badgeData || event.version <= badgeVersion) return;
+    
+    if (event.version !== badgeVersion + 1) {
+        // Missed an event (e.g. while reconnecting) - fetch a fresh snapshot instead
+        sendMessage({ type: 'badge_update', action: 'get_badge_data' });
+        return;
+    }
+    badgeVersion = event.version;
+    
+    switch (event.event) {
+        case 'user_added':
+            addUserIfMissing(event.user);
+            break;
+        case 'badge_awarded': {
+            const user = badgeData.users.find(u => u.id === event.userId);
+            if (user && !user.earnedBadges.some(b => b.badgeId === event.earned.badgeId)) {
+                user.earnedBadges.push(event.earned);
+            }
+            badgeData.activityFeed.unshift(event.activity);
+            break;
+        }
+        case 'badge_added':
+            badgeData.badges.push(event.badge);
+            break;
+        case 'badge_updated':
+            badgeData.badges = badgeData.badges.map(b => b.id === event.badge.id ? event.badge : b);
+            break;
+        case 'badge_deleted':
+            badgeData.users.forEach(u => {
+                u.earnedBadges = u.earnedBadges.filter(b => b.badgeId !== event.badgeId);
+            });
+            badgeData.badges = badgeData.badges.filter(b => b.id !== event.badgeId);
+            badgeData.activityFeed = badgeData.activityFeed.filter(a => a.badgeId !== event.badgeId);
+            break;
+        case 'category_added':
+            badgeData.categories.push(event.category);
+            break;
+        case 'category_updated':
+            badgeData.categories = badgeData.categories.map(c => c.id === event.category.id ? event.category : c);
+            if (event.oldName !== event.category.name) {
+                badgeData.badges.forEach(b => {
+                    if (b.category === event.oldName) b.category = event.category.name;
+                });
+            }
+            break;
+        case 'category_deleted':
+            badgeData.categories = badgeData.categories.filter(c => c.id !== event.categoryId);
+            break;
+        default:
+            console.warn('Unknown badge event:', event.event);
+            return;
+    }
+    
+    refreshCurrentUser();
+    updateUI();
+}
+
+// Add a user to the local badge data unless it's already there
+function addUserIfMissing(user) {
+    if (badgeData && !badgeData.users.some(u => u.id === user.id)) {
+        badgeData.users.push(user);
+    }
+}
+
+// Point currentUser at the user object in the latest badge data
+function refreshCurrentUser() {
+    if (currentUser && badgeData) {
+        currentUser = badgeData.users.find(user => user.id === currentUser.id) || null;
+    }
+}
+
 // Send message to WebSocket
 function sendMessage(message) {
     if (badgeSocket && badgeSocket.readyState === WebSocket.OPEN) {
@@ -460,6 +549,22 @@ function initActivityFeed() {
         
         feedContainer.appendChild(activityItem);
     });
+    
+    // The server sends the feed a page at a time; fetch older pages on request
+    if (badgeData.activityFeedNext != null) {
+        const loadMore = document.createElement('button');
+        loadMore.className = 'primary-btn';
+        loadMore.textContent = 'Load older activity';
+        loadMore.addEventListener('click', () => {
+            loadMore.disabled = true;
+            sendMessage({
+                type: 'badge_update',
+                action: 'get_activity_feed',
+                before: badgeData.activityFeedNext
+            });
+        });
+        feedContainer.appendChild(loadMore);
+    }
 }
 
 // Initialize admin section
@@ -1,4 +1,4 @@
-import { sendUpdate } from '../websocket/websocket.js';
+import { sendBoardOp } from '../websocket/websocket.js';
 import { stopTimer, updateStartButtonState } from '../pomodoro/pomodoro.js';
 
 // DOM elements - grouped for better organization
@@ -40,6 +40,13 @@ const EMPTY_STATE_TEXT = {
     trashTasks: 'Drop here to delete'
 };
 
+// Board column keys used by the server, mapped to their task container ids
+const COLUMN_CONTAINER_IDS = {
+    todo: 'todoTasks',
+    inProgress: 'inProgressTasks',
+    done: 'doneTasks'
+};
+
 document.addEventListener('DOMContentLoaded', () => {
     // Initialize DOM references
     DOM.modals.taskEdit = document.getElementById('taskEditModal');
@@ -336,7 +343,12 @@ function handleDrop(e) {
     // Update start button state after task movement
     updateStartButtonState();
     
-    sendUpdate();
+    sendBoardOp({
+        action: 'move',
+        cardId: taskElement.id,
+        toColumn: getColumnKey(tasksContainer.id),
+        toIndex: getTaskIndex(tasksContainer, taskElement)
+    });
 }
 
 function getTaskData(container) {
@@ -370,10 +382,15 @@ DOM.buttons.loadTasks.addEventListener('click', function() {
     tasks.forEach((task) => {
         const taskElement = createTaskElement(task);
         DOM.columns.todo.appendChild(taskElement);
+        sendBoardOp({
+            action: 'add',
+            column: 'todo',
+            index: getTaskIndex(DOM.columns.todo, taskElement),
+            card: { id: taskElement.id, text: task, details: '' }
+        });
     });
     
     DOM.inputs.taskInput.value = '';
-    sendUpdate();
 });
 
 DOM.buttons.clearStorage.addEventListener('click', function() {
@@ -388,7 +405,7 @@ DOM.buttons.clearStorage.addEventListener('click', function() {
         DOM.displays.currentTask.innerHTML = '<i class="fas fa-clock"></i> No task selected';
         taskIdCounter = 0;
         
-        sendUpdate();
+        sendBoardOp({ action: 'clear' });
     }
 });
 
@@ -482,8 +499,16 @@ function saveTaskDetails() {
         DOM.displays.currentTask.innerHTML = `<i class="fas fa-clock"></i> ${taskTitle.textContent}`;
     }
     
+    const editedTaskId = currentEditingTask.id;
+    const editedDetails = taskContent.querySelector('.task-details');
+    
     closeEditModal();
-    sendUpdate();
+    sendBoardOp({
+        action: 'edit',
+        cardId: editedTaskId,
+        text: taskTitle.textContent,
+        details: editedDetails ? editedDetails.textContent : ''
+    });
 }
 
 function setupTrashColumn() {
@@ -555,7 +580,7 @@ function setupTrashColumn() {
             updateStartButtonState();
             
             // Update the board state
-            sendUpdate();
+            sendBoardOp({ action: 'delete', cardId: taskId });
         }
         
         // Hide trash column after drop
@@ -563,10 +588,137 @@ function setupTrashColumn() {
     });
 }
 
+// Remote board operations (patches from other clients)
+function getColumnKey(containerId) {
+    return Object.keys(COLUMN_CONTAINER_IDS).find(key => COLUMN_CONTAINER_IDS[key] === containerId);
+}
+
+function getTaskIndex(container, taskElement) {
+    return Array.from(container.children)
+        .filter(el => el.classList.contains('task'))
+        .indexOf(taskElement);
+}
+
+function insertTaskAt(container, taskElement, index) {
+    const emptyState = container.querySelector('.empty-state');
+    if (emptyState) emptyState.remove();
+    
+    const tasks = Array.from(container.children)
+        .filter(el => el.classList.contains('task') && el !== taskElement);
+    if (Number.isInteger(index) && index < tasks.length) {
+        container.insertBefore(taskElement, tasks[index]);
+    } else {
+        container.appendChild(taskElement);
+    }
+}
+
+function restoreEmptyState(container) {
+    if (!container || container.querySelector('.task') || container.querySelector('.empty-state')) return;
+    const emptyDiv = document.createElement('div');
+    emptyDiv.className = 'empty-state';
+    emptyDiv.textContent = getDefaultEmptyText(container.id);
+    container.appendChild(emptyDiv);
+}
+
+function keepTaskIdCounterAhead(taskId) {
+    const match = /^task-(\d+)$/.exec(taskId);
+    if (match) {
+        taskIdCounter = Math.max(taskIdCounter, parseInt(match[1], 10) + 1);
+    }
+}
+
+// Apply a single board operation received from the server.
+// Returns false if the DOM doesn't match the operation and a full reload is needed.
+function applyBoardOp(op) {
+    switch (op.action) {
+        case 'replace':
+            initializeBoard(op.board);
+            return true;
+            
+        case 'add': {
+            const container = document.getElementById(COLUMN_CONTAINER_IDS[op.column]);
+            if (!container || document.getElementById(op.card.id)) return false;
+            const taskElement = createTaskElement(op.card.text, op.card.details);
+            taskElement.id = op.card.id;
+            keepTaskIdCounterAhead(op.card.id);
+            insertTaskAt(container, taskElement, op.index);
+            break;
+        }
+            
+        case 'move': {
+            const container = document.getElementById(COLUMN_CONTAINER_IDS[op.toColumn]);
+            const taskElement = document.getElementById(op.cardId);
+            if (!container || !taskElement) return false;
+            const source = taskElement.parentElement;
+            insertTaskAt(container, taskElement, op.toIndex);
+            restoreEmptyState(source);
+            break;
+        }
+            
+        case 'edit': {
+            const taskElement = document.getElementById(op.cardId);
+            if (!taskElement) return false;
+            const taskContent = taskElement.querySelector('.task-content');
+            if ('text' in op) {
+                taskContent.querySelector('.task-title').textContent = op.text;
+            }
+            if ('details' in op) {
+                let taskDetails = taskContent.querySelector('.task-details');
+                if (op.details) {
+                    if (!taskDetails) {
+                        taskDetails = document.createElement('div');
+                        taskDetails.className = 'task-details';
+                        taskContent.appendChild(taskDetails);
+                    }
+                    taskDetails.textContent = op.details;
+                } else if (taskDetails) {
+                    taskContent.removeChild(taskDetails);
+                }
+            }
+            break;
+        }
+            
+        case 'delete': {
+            const taskElement = document.getElementById(op.cardId);
+            if (!taskElement) return false;
+            const source = taskElement.parentElement;
+            taskElement.remove();
+            restoreEmptyState(source);
+            break;
+        }
+            
+        case 'clear':
+            resetColumn(DOM.columns.todo, EMPTY_STATE_TEXT.todoTasks);
+            resetColumn(DOM.columns.inProgress, EMPTY_STATE_TEXT.inProgressTasks);
+            resetColumn(DOM.columns.done, EMPTY_STATE_TEXT.doneTasks);
+            taskIdCounter = 0;
+            break;
+            
+        default:
+            console.warn('Unknown board operation:', op.action);
+            return false;
+    }
+    
+    updateCurrentTaskDisplay(getTaskData(DOM.columns.inProgress));
+    updateStartButtonState();
+    return true;
+}
+
+// The server assigned a different id to a task we added (id collision with another client)
+function renameTask(oldId, newId) {
+    const taskElement = document.getElementById(oldId);
+    if (taskElement) {
+        taskElement.id = newId;
+        keepTaskIdCounterAhead(newId);
+    }
+}
+
 // Export functions for use in other modules
 export { 
     initializeBoard, 
     updateBoard, 
     getTaskData,
+    applyBoardOp,
+    renameTask,
     taskIdCounter
 };
\ No newline at end of file
@@ -6,6 +6,7 @@ import { wsSwitchRoom } from './wsSwitchRoom.js';
 import { wsSetupSocket } from './wsSetupSocket.js';
 import { wsRequestRoomDeletion } from './wsRequestRoomDeletion.js';
 import { wsSendUpdate } from './wsSendUpdate.js';
+import { wsSendBoardOp } from './wsSendBoardOp.js';
 import { wsSendTimerUpdate } from './wsSendTimerUpdate.js';
 
 // Enhanced timer update function with fixed message type to match server expectations
@@ -63,6 +64,7 @@ wsSetupSocket();
 export { 
     wsSetupSocket as connectWebSocket, 
     wsSendUpdate as sendUpdate, 
+    wsSendBoardOp as sendBoardOp,
     socket, 
     wsSafeSend as safeSend,
     setSocketReference
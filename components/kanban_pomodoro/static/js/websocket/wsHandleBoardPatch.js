@@ -0,0 +1,58 @@
+import { applyBoardOp, renameTask } from '../kanban/kanban.js';
+import { getBoardVersion, setBoardVersion, acknowledgeBoardOp } from './wsSendBoardOp.js';
+import { wsSafeSend } from './wsSafeSend.js';
+import { currentRoomId } from './wsUpdateRoomSelect.js';
+
+// Set while we wait for a full_update after detecting a missed patch
+let resyncRequested = false;
+
+function requestBoardResync() {
+    if (resyncRequested) return;
+    resyncRequested = true;
+    console.log(`Board out of sync, requesting full state for room ${currentRoomId}`);
+    wsSafeSend(JSON.stringify({
+        type: 'reload_state_request',
+        room: currentRoomId
+    }));
+}
+
+// Called when a full_update has replaced the board
+function wsBoardResynced() {
+    resyncRequested = false;
+}
+
+// Apply a versioned board patch from the server
+function wsHandleBoardPatch(patch) {
+    const version = getBoardVersion();
+
+    // Already applied (or superseded by a full update)
+    if (patch.version <= version) return;
+
+    // We missed at least one patch - fall back to a full state load
+    if (patch.version !== version + 1) {
+        requestBoardResync();
+        return;
+    }
+
+    const op = patch.op || {};
+    const expectedVersion = patch.opId ? acknowledgeBoardOp(patch.opId) : null;
+    if (expectedVersion !== null) {
+        // Our own op. The DOM applied it on top of the board we had when we sent it; if another
+        // client's op reached the server first, positions may differ from the server's board
+        if (patch.version !== expectedVersion) {
+            requestBoardResync();
+            return;
+        }
+        // Otherwise the DOM already reflects it, only pick up server-assigned ids
+        if (op.action === 'add' && op.renamedFrom) {
+            renameTask(op.renamedFrom, op.card.id);
+        }
+    } else if (!applyBoardOp(op)) {
+        requestBoardResync();
+        return;
+    }
+
+    setBoardVersion(patch.version);
+}
+
+export { wsHandleBoardPatch, wsBoardResynced };
@@ -0,0 +1,52 @@
+import { wsSafeSend } from './wsSafeSend.js';
+import { currentRoomId } from './wsUpdateRoomSelect.js';
+
+// Last board version we have applied from the server
+let boardVersion = 0;
+
+// Ops we've sent that the server hasn't acknowledged with a board_patch yet:
+// opId -> the version the board should have once the op is applied
+const pendingOps = new Map();
+let opCounter = 0;
+const clientId = Math.random().toString(36).slice(2, 10);
+
+function getBoardVersion() {
+    return boardVersion;
+}
+
+function setBoardVersion(version) {
+    boardVersion = Number.isInteger(version) ? version : 0;
+}
+
+// If the patch acknowledges one of our own ops, returns the version we expected it to get, else null
+function acknowledgeBoardOp(opId) {
+    if (!pendingOps.has(opId)) return null;
+    const expectedVersion = pendingOps.get(opId);
+    pendingOps.delete(opId);
+    return expectedVersion;
+}
+
+// Forget unacknowledged ops, e.g. after a full state reload replaced the board
+function clearPendingBoardOps() {
+    pendingOps.clear();
+}
+
+// Send a single card operation (add/move/edit/delete/clear) instead of the whole board
+function wsSendBoardOp(op) {
+    const opId = `${clientId}-${++opCounter}`;
+    // Lands right after the current board and our earlier pending ops, unless someone else's op gets in first
+    pendingOps.set(opId, boardVersion + pendingOps.size + 1);
+
+    const message = {
+        type: 'board_op',
+        room: currentRoomId,
+        baseVersion: boardVersion,
+        opId: opId,
+        op: op
+    };
+
+    console.log('Sending board op:', message);
+    wsSafeSend(JSON.stringify(message));
+}
+
+export { wsSendBoardOp, getBoardVersion, setBoardVersion, acknowledgeBoardOp, clearPendingBoardOps };
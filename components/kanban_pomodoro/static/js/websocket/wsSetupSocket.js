@@ -4,6 +4,8 @@ import { wsProcessQueue } from './wsProcessQueue.js';
 import { wsUpdateRoomSelect, currentRoomId } from './wsUpdateRoomSelect.js';
 import { wsSwitchRoom } from './wsSwitchRoom.js';
 import { setSocketReference } from './wsSafeSend.js';
+import { setBoardVersion, clearPendingBoardOps } from './wsSendBoardOp.js';
+import { wsHandleBoardPatch, wsBoardResynced } from './wsHandleBoardPatch.js';
 
 const connectionStatus = document.getElementById('connectionStatus');
 
@@ -66,6 +68,9 @@ function wsSetupSocket() {
                     if (isForCurrentRoom) {
                         // Only update our board if this update is for our current room
                         initializeBoard(data.data.board);
+                        setBoardVersion(data.data.board.version);
+                        clearPendingBoardOps();
+                        wsBoardResynced();
                         
                         // Handle timer state with higher priority logging
                         if (data.data.timer) {
@@ -81,6 +86,28 @@ function wsSetupSocket() {
                     
                 case 'update_confirmation':
                     console.log('Server confirmed update:', data);
+                    if (isForCurrentRoom && data.version) {
+                        setBoardVersion(data.version);
+                    }
+                    break;
+                    
+                case 'board_patch':
+                    console.log('Handling board patch:', data);
+                    if (isForCurrentRoom) {
+                        wsHandleBoardPatch(data);
+                    } else {
+                        console.log(`Ignoring board patch from room ${messageRoom}, we're in ${currentRoomId}`);
+                    }
+                    break;
+                    
+                case 'board_op_rejected':
+                    console.warn('Server rejected board op:', data.message);
+                    if (isForCurrentRoom) {
+                        // Replace our board with the server's authoritative copy
+                        initializeBoard(data.board);
+                        setBoardVersion(data.version);
+                        clearPendingBoardOps();
+                    }
                     break;
                     
                 case 'reload_state_request':
@@ -1,6 +1,6 @@
 import { initializeBoard, updateBoard } from '../kanban/kanban.js';
 import { updateTimerState } from '../pomodoro/pomodoro.js';
-import { initializeWorkflow, updateWorkflow } from '../workflow/workflow.js';
+import { initializeWorkflow, updateWorkflow, applyWorkflowPatch, handleWorkflowOpRejected } from '../workflow/workflow.js';
 import { handleRpsUpdate } from '../rps-game/rps-game.js';
 import { wsProcessQueue } from './wsProcessQueue.js';
 import { wsUpdateRoomSelect, currentRoomId } from './wsUpdateRoomSelect.js';
@@ -72,6 +72,12 @@ function wsSetupSocket() {
                 console.log('Handling workflow update:', data.data);
                 updateWorkflow(data.data);
                 break;
+            case 'workflow_patch':
+                applyWorkflowPatch(data);
+                break;
+            case 'workflow_op_rejected':
+                handleWorkflowOpRejected(data);
+                break;
             case 'rps_update':
                 console.log('Handling RPS update:', data.data);
                 handleRpsUpdate(data.data);
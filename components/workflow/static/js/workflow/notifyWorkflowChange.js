@@ -4,4 +4,10 @@
 export function notifyWorkflowChange() {
     const event = new CustomEvent('workflow-state-changed');
     document.dispatchEvent(event);
-}
\ No newline at end of file
+}
+
+// Notify that a single item or workflow structure changed, so only that change is sent
+export function notifyWorkflowOp(op) {
+    const event = new CustomEvent('workflow-op', { detail: op });
+    document.dispatchEvent(event);
+}
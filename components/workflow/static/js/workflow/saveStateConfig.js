@@ -1,6 +1,6 @@
 // Save state configuration for workflow management
 import { updateState, addState } from './state.js';
-import { sendWorkflowUpdate } from './sync.js';
+import { notifyWorkflowOp } from './notifyWorkflowChange.js';
 import { closeModalFromModals } from './closeModalFromModals.js';
 
 // Save state configuration
@@ -22,14 +22,17 @@ export function saveStateConfig() {
     
     // Check if this is a new state or an edit
     const isEdit = idInput && idInput.value !== '';
+    let op;
     
     if (isEdit) {
         // Update existing state
         const stateId = idInput.value;
         updateState(stateId, { name, color });
+        op = { action: 'update_state', stateId, changes: { name, color } };
     } else {
         // Create new state
-        addState(name, color);
+        const newState = addState(name, color);
+        op = { action: 'add_state', state: newState };
     }
     
     // Close the modal
@@ -38,8 +41,8 @@ export function saveStateConfig() {
         closeModalFromModals(modal); // Use imported function
     }
     
-    // Update UI and send to server
-    sendWorkflowUpdate();
+    // Update UI and send the state change to the server
+    notifyWorkflowOp(op);
     
     // Refresh the workflow configuration screen to show the updated state
     const configContainer = document.getElementById('configContainer');
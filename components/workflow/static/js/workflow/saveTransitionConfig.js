@@ -1,7 +1,7 @@
 // Save transition configuration for workflow management
 import { workflowState } from './state.js';
 import { addTransition } from './state.js';
-import { sendWorkflowUpdate } from './sync.js';
+import { notifyWorkflowOp } from './notifyWorkflowChange.js';
 import { closeModalFromModals } from './closeModalFromModals.js';
 
 // Save transition configuration
@@ -48,11 +48,16 @@ export function saveTransitionConfig() {
         // Update existing transition
         const index = parseInt(indexInput.value);
         if (index >= 0 && index < workflowState.transitions.length) {
+            const previous = workflowState.transitions[index];
             workflowState.transitions[index] = { from: fromStateId, to: toStateId };
+            // An edit is sent as removing the old transition and adding the new one
+            notifyWorkflowOp({ action: 'delete_transition', from: previous.from, to: previous.to });
+            notifyWorkflowOp({ action: 'add_transition', from: fromStateId, to: toStateId });
         }
     } else {
         // Create new transition
         addTransition(fromStateId, toStateId);
+        notifyWorkflowOp({ action: 'add_transition', from: fromStateId, to: toStateId });
     }
     
     // Close the modal
@@ -61,9 +66,6 @@ export function saveTransitionConfig() {
         closeModalFromModals(modal); // Use imported function
     }
     
-    // Update UI and send to server
-    sendWorkflowUpdate();
-    
     // Refresh the workflow configuration screen to show the updated transition
     const configContainer = document.getElementById('configContainer');
     if (configContainer && configContainer.style.display === 'block') {
@@ -54,6 +54,103 @@ function sendWorkflowUpdate() {
     }
 }
 
+// Last workflow version received from the server, used as the base of the next op
+let workflowVersion = 0;
+let workflowOpCounter = 0;
+let workflowOpListenerAdded = false;
+
+// Function to send one workflow operation instead of the whole workflow
+function sendWorkflowOp(op) {
+    if (socket && socket.readyState === WebSocket.OPEN) {
+        const opData = {
+            type: 'workflow_op',
+            opId: `${localStorage.getItem('clientId') || 'client'}-${workflowOpCounter++}`,
+            baseVersion: workflowVersion,
+            op
+        };
+        console.log('Sending workflow op:', opData);
+        socket.send(JSON.stringify(opData));
+    } else {
+        console.warn('Cannot send workflow op - WebSocket is not connected. Workflow will resync on reconnect.');
+    }
+}
+
+function upsertById(list, entry, previousId) {
+    const index = list.findIndex(existing => existing.id === (previousId || entry.id));
+    if (index >= 0) {
+        list[index] = entry;
+    } else {
+        list.push(entry);
+    }
+}
+
+// Apply a workflow patch broadcast by the server (including our own ops, as acknowledgement)
+function applyWorkflowPatch(data) {
+    console.log('Received workflow patch:', data);
+
+    // A missed patch means our copy is stale - fetch the whole workflow instead
+    if (data.version !== workflowVersion + 1 && data.version > workflowVersion) {
+        console.warn(`Workflow version gap (have ${workflowVersion}, got ${data.version}), requesting full data`);
+        if (socket && socket.readyState === WebSocket.OPEN) {
+            socket.send(JSON.stringify({
+                type: 'get_workflow_data',
+                data: { clientId: localStorage.getItem('clientId') || 'unknown' }
+            }));
+        }
+        return;
+    }
+    if (data.version <= workflowVersion) return;
+
+    const op = data.op;
+    workflowState.states = workflowState.states || [];
+    workflowState.transitions = workflowState.transitions || [];
+
+    switch (op.action) {
+        case 'create_item':
+        case 'update_item':
+        case 'transition_item':
+        case 'add_journal_entry':
+            upsertById(workItems, op.item, op.renamedFrom);
+            break;
+        case 'delete_item': {
+            const index = workItems.findIndex(item => item.id === op.itemId);
+            if (index >= 0) workItems.splice(index, 1);
+            break;
+        }
+        case 'add_state':
+        case 'update_state':
+            upsertById(workflowState.states, op.state, op.renamedFrom);
+            break;
+        case 'delete_state':
+            workflowState.states = workflowState.states.filter(s => s.id !== op.stateId);
+            workflowState.transitions = workflowState.transitions.filter(
+                t => t.from !== op.stateId && t.to !== op.stateId
+            );
+            break;
+        case 'add_transition':
+            if (!workflowState.transitions.some(t => t.from === op.transition.from && t.to === op.transition.to)) {
+                workflowState.transitions.push({ ...op.transition });
+            }
+            break;
+        case 'delete_transition':
+            workflowState.transitions = workflowState.transitions.filter(
+                t => t.from !== op.transition.from || t.to !== op.transition.to
+            );
+            break;
+    }
+
+    workflowVersion = data.version;
+    workflowState.version = data.version;
+    updateWorkflow({});
+}
+
+// The server refused one of our ops; take its copy of the workflow
+function handleWorkflowOpRejected(data) {
+    console.warn('Workflow op rejected:', data.message);
+    alert(data.message);
+    updateWorkflow({ workflow: data.workflow, workItems: data.workItems });
+}
+
 // Update the workflow state from external sources (WebSocket updates)
 function updateWorkflow(data) {
     console.log('Received workflow update:', data);
@@ -81,10 +178,11 @@ function updateWorkflow(data) {
     // Update the workflow state
     if (data.workflow) {
         updateWorkflowState(data.workflow);
+        workflowVersion = data.workflow.version || 0;
     }
     
     if (data.workItems) {
-        updateWorkItemsData(data.workItems);
+        updateWorkItemsData(data.workItems, data.workflow?.workItemIdCounter);
     }
     
     // Detect if visualization is visible
@@ -137,13 +235,14 @@ function initializeWorkflow(data) {
     
     if (data.workflow) {
         updateWorkflowState(data.workflow);
+        workflowVersion = data.workflow.version || 0;
     } else {
         // Initialize with default workflow if none exists
         initializeDefaultWorkflow();
     }
     
     if (data.workItems) {
-        updateWorkItemsData(data.workItems);
+        updateWorkItemsData(data.workItems, data.workflow?.workItemIdCounter);
     }
     
     // Set up a listener for when websocket reconnects
@@ -162,6 +261,14 @@ function initializeWorkflow(data) {
         console.log('Sync module: Workflow state changed, sending update');
         sendWorkflowUpdate();
     });
+
+    // Single changes go out as ops (initialization runs on every full update, so only listen once)
+    if (!workflowOpListenerAdded) {
+        workflowOpListenerAdded = true;
+        document.addEventListener('workflow-op', function(event) {
+            sendWorkflowOp(event.detail);
+        });
+    }
 }
 
 // Function to reconnect workflow after page refresh
@@ -196,6 +303,9 @@ function reconnectWorkflow(data) {
 
 export {
     sendWorkflowUpdate,
+    sendWorkflowOp,
+    applyWorkflowPatch,
+    handleWorkflowOpRejected,
     updateWorkflow,
     initializeWorkflow,
     reconnectWorkflow
@@ -14,11 +14,16 @@ if (typeof window.workflowVisualizationTimeoutId === 'undefined') {
     window.workflowVisualizationTimeoutId = null;
 }
 
-// Function to notify workflow changes
-function notifyWorkflowChange() {
+// Function to notify that states were moved or released
+function notifyStatePositions(stateIds) {
     // Use an event instead of direct import to avoid circular dependency
-    const event = new CustomEvent('workflow-state-changed');
-    document.dispatchEvent(event);
+    stateIds.forEach(stateId => {
+        const stateObj = workflowState.states.find(s => s.id === stateId);
+        const event = new CustomEvent('workflow-op', {
+            detail: { action: 'update_state', stateId, changes: { position: stateObj?.position || null } }
+        });
+        document.dispatchEvent(event);
+    });
 }
 
 function createWorkflowVisualization(container, currentStateId) {
@@ -605,7 +610,7 @@ function createWorkflowVisualization(container, currentStateId) {
                         updateNodeAppearance(d);
                         setTimeout(() => {
                             if (!isDragging) {
-                                notifyWorkflowChange();
+                                notifyStatePositions([d.id]);
                             }
                         }, 200);
                     }
@@ -653,7 +658,7 @@ function createWorkflowVisualization(container, currentStateId) {
                     setTimeout(() => {
                         if (window.workflowVisualizations[graphId]) {
                             simulation.alpha(0).stop();
-                            notifyWorkflowChange();
+                            notifyStatePositions(nodes.map(node => node.id));
                             fitView(); // Fit view after resetting
                         }
                     }, 1500);
@@ -671,7 +676,7 @@ function createWorkflowVisualization(container, currentStateId) {
                         const stateObj = workflowState.states.find(s => s.id === nodeId);
                         if (stateObj) delete stateObj.position;
                         simulation.alpha(0.3).restart();
-                        notifyWorkflowChange();
+                        notifyStatePositions([nodeId]);
                         setTimeout(() => {
                             if (window.workflowVisualizations[graphId]) {
                                 simulation.alpha(0).stop();
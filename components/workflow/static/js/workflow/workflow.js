@@ -21,6 +21,8 @@ import {
 import { 
     sendWorkflowUpdate, 
     updateWorkflow, 
+    applyWorkflowPatch,
+    handleWorkflowOpRejected,
     initializeWorkflow as initWorkflow,
     reconnectWorkflow,
     registerUIFunctions
@@ -119,6 +121,8 @@ function initializeWorkflow(data) {
 export { 
     workflowState, 
     updateWorkflow, 
+    applyWorkflowPatch,
+    handleWorkflowOpRejected,
     sendWorkflowUpdate, 
     initializeWorkflow 
 };
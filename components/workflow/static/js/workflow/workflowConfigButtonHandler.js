@@ -2,6 +2,7 @@
 import { workflowState } from './state.js';
 import { deleteState, deleteTransition } from './state.js';
 import { showStateModal, showTransitionModal } from './modals.js';
+import { notifyWorkflowOp } from './notifyWorkflowChange.js';
 
 // Configuration button click handler for workflow UI
 export function workflowConfigButtonHandler(e) {
@@ -48,7 +49,9 @@ export function workflowConfigButtonHandler(e) {
         const button = e.target.classList.contains('delete-state-btn') ? e.target : e.target.closest('.delete-state-btn');
         const stateId = button.getAttribute('data-id') || button.getAttribute('data-state-id');
         console.log('Delete state button clicked for stateId:', stateId);
-        deleteState(stateId);
+        if (deleteState(stateId)) {
+            notifyWorkflowOp({ action: 'delete_state', stateId });
+        }
         e.preventDefault();
         return;
     }
@@ -70,7 +73,10 @@ export function workflowConfigButtonHandler(e) {
         const button = e.target.classList.contains('delete-transition-btn') ? e.target : e.target.closest('.delete-transition-btn');
         const index = parseInt(button.getAttribute('data-index'));
         console.log('Delete transition button clicked for index:', index);
-        deleteTransition(index);
+        const transition = workflowState.transitions[index];
+        if (transition && deleteTransition(index)) {
+            notifyWorkflowOp({ action: 'delete_transition', from: transition.from, to: transition.to });
+        }
         e.preventDefault();
         return;
     }
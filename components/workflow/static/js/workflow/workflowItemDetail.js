@@ -9,7 +9,7 @@ import { getWorkItem, transitionWorkItemState } from './items.js';
 import { createWorkflowVisualization } from './visualization.js';
 import { workflowEscapeHtml } from './workflowEscapeHtml.js';
 import { renderWorkflowItemsList } from './workflowItemsList.js';
-import { notifyWorkflowChange } from './notifyWorkflowChange.js';
+import { notifyWorkflowOp } from './notifyWorkflowChange.js';
 
 // Show work item detail view
 export function showWorkItemDetail(itemId) {
@@ -130,10 +130,10 @@ export function showWorkItemDetail(itemId) {
         newButton.addEventListener('click', (e) => {
             const itemId = e.target.dataset.itemId;
             const nextStateId = e.target.dataset.nextStateId;
-            transitionWorkItemState(itemId, nextStateId);
+            if (!transitionWorkItemState(itemId, nextStateId)) return;
             // Re-render the detail view to reflect the new state
             showWorkItemDetail(itemId);
-            notifyWorkflowChange(); // Notify about the change
+            notifyWorkflowOp({ action: 'transition_item', itemId, toStateId: nextStateId }); // Notify about the change
         });
     });
 
@@ -1,7 +1,7 @@
 // Add journal entries to workflow items
 import { addJournalEntryToItem } from './items.js';
 import { showWorkItemDetail } from './workflowItemDetail.js';
-import { notifyWorkflowChange } from './notifyWorkflowChange.js';
+import { notifyWorkflowOp } from './notifyWorkflowChange.js';
 
 // Add journal entry to a work item (called by form submission)
 export function addWorkflowJournalEntry() {
@@ -14,10 +14,10 @@ export function addWorkflowJournalEntry() {
     const text = textInput.value.trim();
 
     if (itemId && text) {
-        addJournalEntryToItem(itemId, text);
+        addJournalEntryToItem(itemId, { text });
         textInput.value = ''; // Clear the textarea
         // Re-render the detail view to show the new entry
         showWorkItemDetail(itemId);
-        notifyWorkflowChange(); // Notify about the change
+        notifyWorkflowOp({ action: 'add_journal_entry', itemId, text }); // Notify about the change
     }
 }
\ No newline at end of file
@@ -1,7 +1,7 @@
 // Save work item functionality for workflow UI
 import { updateWorkItem, addWorkItem } from './items.js';
 import { closeModalFromUI } from './closeModalFromUI.js';
-import { notifyWorkflowChange } from './notifyWorkflowChange.js';
+import { notifyWorkflowOp } from './notifyWorkflowChange.js';
 import { renderWorkflowItemsList } from './workflowItemsList.js';
 import { showWorkItemDetail } from './workflowItemDetail.js';
 import { workItemDetail } from './workflowDOMElements.js';
@@ -28,6 +28,7 @@ export function saveWorkItem() {
     // Check if this is a new item or an edit
     const isEdit = idInput && idInput.value !== '';
     let itemId = '';
+    let op;
     
     if (isEdit) {
         itemId = idInput.value;
@@ -36,9 +37,11 @@ export function saveWorkItem() {
             description,
             stateId
         });
+        op = { action: 'update_item', itemId, changes: { title, description, stateId } };
     } else {
         const newItem = addWorkItem(title, description, stateId);
         itemId = newItem.id;
+        op = { action: 'create_item', item: { id: itemId, title, description, stateId, created: newItem.created } };
     }
     
     // Close the modal
@@ -47,8 +50,8 @@ export function saveWorkItem() {
         closeModalFromUI(modal); // Use imported function
     }
     
-    // Update UI and send to server
-    notifyWorkflowChange();
+    // Update UI and send just this item's change to the server
+    notifyWorkflowOp(op);
     
     // If we're in the list view, render updated list
     if (workItemDetail.style.display !== 'block') {
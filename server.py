@@ -5,6 +5,7 @@ import json
 from collections import defaultdict
 import time
 import os
+import sys
 import logging
 
 # Configure logging
@@ -17,17 +18,19 @@ logging.info(f"Files in project root: {os.listdir(project_dir)}")
 logging.info(f"badges.html exists: {os.path.exists(os.path.join(project_dir, 'components', 'badges', 'index.html'))}")
 
 # Import the server state module first to ensure it's initialized
-from server.server_state import STORAGE_FILE, DEFAULT_RPS_STATE
+from server.server_state import STORAGE_FILE, DEFAULT_RPS_STATE, WORKER_PROCESSES, SERVER_PORT
 import server.server_state as server_state
 
 # Import all functions from their respective module files
 from server.server_create_default_room_state import server_create_default_room_state
 from server.server_load_room_states import server_load_room_states
 from server.server_save_room_states import server_save_room_states
+from server.server_persistence_engine import persistence_engine
+from server.server_room_evictor import room_evictor
 from server.server_timer_manager import ServerTimerManager as TimerManager
 from server.server_handle_room_deletion import server_handle_room_deletion
 from server.server_broadcast_timer_update import server_broadcast_timer_update
-from server.server_update_timer import server_update_timer
+from server.server_schedule_running_timers import server_schedule_running_timers
 from server.server_broadcast_room_list import server_broadcast_room_list
 from server.server_handle_message import server_handle_message
 from server.server_handle_get_workflow_data import server_handle_get_workflow_data
@@ -40,15 +43,18 @@ from server.server_handle_rps_join import server_handle_rps_join
 from server.server_determine_rps_winner import server_determine_rps_winner
 from server.server_handle_rps_choice import server_handle_rps_choice
 from server.server_reset_rps_game import server_reset_rps_game
-from server.server_websocket_handler import server_websocket_handler
+from server.server_add_api_routes import server_add_api_routes
+from server.server_start_router import server_start_router
+from server.server_room_bus import room_bus, server_create_bus_transport, server_room_bus_member
+from server.server_handle_room_bus_event import server_handle_room_bus_event
 from server.server_index_handler import server_index_handler
 # Commented out to avoid conflicts since we're redefining locally
 # from server.server_start_server import server_start_server
 from server.server_run_server import server_run_server
 
 # Import badge system handlers
-from server.server_badge_handler import handle_badge_data_request, handle_badge_update, load_badge_data
-from server.server_badge_websocket_handler import server_badge_websocket_handler
+from server.server_badge_handler import handle_badge_update
+from server.server_badge_store import badge_store
 from server.server_badge_page_handler import server_badge_page_handler
 
 # Initialize server state
@@ -59,12 +65,12 @@ try:
     logging.info(f"Room state loaded with {len(server_state.rooms_state)} rooms")
 except Exception as e:
     logging.error(f"Failed to initialize room state: {e}")
-    # We'll continue with the empty defaultdict initialized in server_state.py
+    # We'll continue with the empty dict initialized in server_state.py; rooms load on first join
 
 # Initialize badge data
 try:
-    load_badge_data()
-    logging.info("Badge data loaded successfully with {len(server_state.badge_data.get('badges', []))} badges")
+    badge_data = badge_store.load()
+    logging.info(f"Badge data loaded successfully with {len(badge_data.get('badges', []))} badges")
     logging.info("Badge data initialized")
 except Exception as e:
     logging.error(f"Failed to initialize badge data: {e}")
@@ -376,9 +382,41 @@ async def main_menu_handler(request):
     '''
     return web.Response(text=html_content, content_type='text/html')
 
+# Pages and static files - no room state, so in multi-process mode the router serves these itself
+def server_add_page_routes(app):
+    """Add the menu, component page and static file routes."""
+    # Global static files route - serve static files from the main static directory
+    static_path = os.path.join(project_dir, 'static')
+    if os.path.exists(static_path):
+        app.router.add_static('/static/', path=static_path, name='global_static')
+        logging.info(f"Added global static file route for /static/")
+    
+    # Component static file routes - serve static files directly from component directories
+    for component in ['kanban_pomodoro', 'workflow', 'rps', 'badges']:
+        static_path = os.path.join('components', component, 'static')
+        if os.path.exists(static_path):
+            app.router.add_static(f'/components/{component}/static/', 
+                                 path=static_path, 
+                                 name=f'{component}_static')
+            logging.info(f"Added static file route for {component}")
+    
+    # Add or update the routes for static files to properly handle component-specific static files
+    app.router.add_static('/static/', path='static', name='static')
+    app.router.add_static('/components/', path='components', name='components')
+    
+    # Route for the main menu
+    app.router.add_get('/', main_menu_handler)
+    
+    # Component routes
+    app.router.add_get('/kanban', serve_kanban_pomodoro)
+    app.router.add_get('/workflow', serve_workflow)
+    app.router.add_get('/rps', serve_rps)
+    app.router.add_get('/badges', serve_badges)
+
 # Update server_start_server function
-async def server_start_server():
+async def server_start_server(port=SERVER_PORT):
     """Start the web server with all routes configured."""
+    runner = None
     try:
         app = web.Application()
         
@@ -398,52 +436,33 @@ async def server_start_server():
         except ImportError:
             logging.warning("aiohttp_cors not installed, CORS support may be limited")
         
-        # WebSocket route
-        app.router.add_get('/ws', server_websocket_handler)
-        
-        # Badge WebSocket route - separate handler for badge functionality
-        app.router.add_get('/badge-ws', server_badge_websocket_handler)
-        
-        # Global static files route - serve static files from the main static directory
-        static_path = os.path.join(project_dir, 'static')
-        if os.path.exists(static_path):
-            app.router.add_static('/static/', path=static_path, name='global_static')
-            logging.info(f"Added global static file route for /static/")
-        
-        # Component static file routes - serve static files directly from component directories
-        for component in ['kanban_pomodoro', 'workflow', 'rps', 'badges']:
-            static_path = os.path.join('components', component, 'static')
-            if os.path.exists(static_path):
-                app.router.add_static(f'/components/{component}/static/', 
-                                     path=static_path, 
-                                     name=f'{component}_static')
-                logging.info(f"Added static file route for {component}")
-        
-        # Add or update the routes for static files to properly handle component-specific static files
-        app.router.add_static('/static/', path='static', name='static')
-        app.router.add_static('/components/', path='components', name='components')
+        # Pages and static files
+        server_add_page_routes(app)
         
-        # Route for the main menu
-        app.router.add_get('/', main_menu_handler)
-        
-        # Component routes
-        app.router.add_get('/kanban', serve_kanban_pomodoro)
-        app.router.add_get('/workflow', serve_workflow)
-        app.router.add_get('/rps', serve_rps)
-        app.router.add_get('/badges', serve_badges)
-        
-        # API route for badge data
-        app.router.add_get('/api/badges', handle_badge_data_request)
+        # WebSocket and API routes
+        server_add_api_routes(app)
         
         # Start the server
         runner = web.AppRunner(app)
         await runner.setup()
-        site = web.TCPSite(runner, 'localhost', 8080)
-        logging.info("Starting server at http://localhost:8080")
+        site = web.TCPSite(runner, 'localhost', port)
+        logging.info(f"Starting server at http://localhost:{port}")
         await site.start()
         
-        # Start the timer update task
-        asyncio.create_task(server_update_timer())
+        # Share rooms with other server instances (in-process only unless ROOM_BUS_BACKEND is 'socket')
+        try:
+            await room_bus.start(server_room_bus_member(), server_handle_room_bus_event, server_create_bus_transport())
+        except Exception as e:
+            logging.error(f"Could not join the room bus; serving rooms from this instance only: {e}")
+        
+        # Start the background room state writer
+        await persistence_engine.start()
+        
+        # Save and drop rooms that nobody has been in for a while
+        await room_evictor.start()
+        
+        # Schedule expiry callbacks for timers that were running when the rooms were saved
+        await server_schedule_running_timers()
         
         # Keep the server running
         while True:
@@ -452,17 +471,29 @@ async def server_start_server():
     except Exception as e:
         logging.error(f"Failed to start server: {e}")
         raise
+    finally:
+        # Flush pending room and badge saves before shutting down
+        await room_evictor.stop()
+        await persistence_engine.stop()
+        await badge_store.flush()
+        await room_bus.stop()
+        if runner is not None:
+            await runner.cleanup()
 
 # Update server_run_server function
-def server_run_server():
+def server_run_server(port=SERVER_PORT):
     """Run the server using asyncio."""
     try:
-        asyncio.run(server_start_server())
+        if WORKER_PROCESSES > 1:
+            # Rooms are spread over worker processes; this process only routes connections to them
+            asyncio.run(server_start_router(server_add_page_routes, port=port))
+        else:
+            asyncio.run(server_start_server(port))
     except KeyboardInterrupt:
         logging.info("Server stopped by user")
     except Exception as e:
         logging.error(f"Server error: {e}")
 
-# Use run_server function directly - this is the entry point
+# Use run_server function directly - this is the entry point (python server.py [port])
 if __name__ == '__main__':
-    server_run_server()
\ No newline at end of file
+    server_run_server(int(sys.argv[1]) if len(sys.argv) > 1 else SERVER_PORT)
\ No newline at end of file
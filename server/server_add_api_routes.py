@@ -0,0 +1,21 @@
+from server.server_websocket_handler import server_websocket_handler
+from server.server_badge_websocket_handler import server_badge_websocket_handler
+from server.server_badge_handler import handle_badge_data_request, handle_badge_feed_request
+from server.server_metrics_handler import handle_metrics_request
+from server.server_work_items_handler import handle_work_items_request
+
+def server_add_api_routes(app):
+    """Add the routes that use room or badge state (served by a worker process in multi-process mode)."""
+    # WebSocket routes
+    app.router.add_get('/ws', server_websocket_handler)
+    app.router.add_get('/badge-ws', server_badge_websocket_handler)
+
+    # API route for badge data
+    app.router.add_get('/api/badges', handle_badge_data_request)
+    app.router.add_get('/api/badges/feed', handle_badge_feed_request)
+
+    # API route for server metrics (outbound queue depths etc.)
+    app.router.add_get('/api/metrics', handle_metrics_request)
+
+    # API route for filtered, paged work item queries
+    app.router.add_get('/api/rooms/{room}/work-items', handle_work_items_request)
@@ -0,0 +1,121 @@
+import re
+
+BOARD_COLUMNS = ('todo', 'inProgress', 'done')
+
+def _find_card(board, card_id):
+    """Return (column, index) of a card, or (None, None) if it isn't on the board."""
+    for column in BOARD_COLUMNS:
+        for index, card in enumerate(board.get(column, [])):
+            if card.get('id') == card_id:
+                return column, index
+    return None, None
+
+def _clamp_index(index, length):
+    if not isinstance(index, int) or index < 0 or index > length:
+        return length
+    return index
+
+def _bump_task_id_counter(board, card_id):
+    """Keep taskIdCounter ahead of any numeric 'task-N' id on the board."""
+    match = re.fullmatch(r'task-(\d+)', str(card_id))
+    if match:
+        board['taskIdCounter'] = max(board.get('taskIdCounter', 0), int(match.group(1)) + 1)
+
+def server_apply_board_op(board, op):
+    """
+    Apply a single board operation in place.
+
+    Supported actions:
+        add    - {'card': {id, text, details}, 'column': str, 'index': int?}
+        move   - {'cardId': str, 'toColumn': str, 'toIndex': int?}
+        edit   - {'cardId': str, 'text': str?, 'details': str?}
+        delete - {'cardId': str}
+        clear  - {}
+
+    Returns:
+        tuple: (applied_op, error) - the op as it should be broadcast to peers
+        (with any server-assigned ids filled in), or None and an error message.
+    """
+    if not isinstance(op, dict):
+        return None, 'Operation must be an object'
+
+    for column in BOARD_COLUMNS:
+        board.setdefault(column, [])
+
+    action = op.get('action')
+
+    if action == 'add':
+        card = op.get('card')
+        column = op.get('column', 'todo')
+        if not isinstance(card, dict) or column not in BOARD_COLUMNS:
+            return None, 'Invalid add operation'
+
+        card = {
+            'id': card.get('id'),
+            'text': str(card.get('text', '')),
+            'details': str(card.get('details', ''))
+        }
+        applied = {'action': 'add', 'column': column, 'card': card}
+
+        # Assign a fresh id if the client's id is missing or already taken by another card
+        if not card['id'] or _find_card(board, card['id'])[0] is not None:
+            new_id = f"task-{board.get('taskIdCounter', 0)}"
+            while _find_card(board, new_id)[0] is not None:
+                board['taskIdCounter'] = board.get('taskIdCounter', 0) + 1
+                new_id = f"task-{board['taskIdCounter']}"
+            if card['id']:
+                applied['renamedFrom'] = card['id']
+            card['id'] = new_id
+
+        index = _clamp_index(op.get('index'), len(board[column]))
+        board[column].insert(index, card)
+        applied['index'] = index
+        _bump_task_id_counter(board, card['id'])
+        return applied, None
+
+    if action == 'move':
+        card_id = op.get('cardId')
+        to_column = op.get('toColumn')
+        if to_column not in BOARD_COLUMNS:
+            return None, 'Invalid move operation'
+
+        from_column, from_index = _find_card(board, card_id)
+        if from_column is None:
+            return None, f"Card '{card_id}' not found"
+
+        card = board[from_column].pop(from_index)
+        to_index = _clamp_index(op.get('toIndex'), len(board[to_column]))
+        board[to_column].insert(to_index, card)
+        return {'action': 'move', 'cardId': card_id, 'toColumn': to_column, 'toIndex': to_index}, None
+
+    if action == 'edit':
+        card_id = op.get('cardId')
+        column, index = _find_card(board, card_id)
+        if column is None:
+            return None, f"Card '{card_id}' not found"
+
+        card = board[column][index]
+        applied = {'action': 'edit', 'cardId': card_id}
+        for field in ('text', 'details'):
+            if field in op:
+                card[field] = str(op[field])
+                applied[field] = card[field]
+        return applied, None
+
+    if action == 'delete':
+        card_id = op.get('cardId')
+        column, index = _find_card(board, card_id)
+        if column is None:
+            return None, f"Card '{card_id}' not found"
+
+        board[column].pop(index)
+        return {'action': 'delete', 'cardId': card_id}, None
+
+    if action == 'clear':
+        for column in BOARD_COLUMNS:
+            board[column] = []
+        board['taskIdCounter'] = 0
+        board.pop('currentTask', None)
+        return {'action': 'clear'}, None
+
+    return None, f"Unknown board operation: {action}"
@@ -0,0 +1,316 @@
+import re
+from server.server_work_item_index import ServerWorkItemIndex, server_work_item_timestamp
+from server.server_workflow_graph import ServerWorkflowGraph
+
+# Ops whose patch carries the item as it is after the op
+WORKFLOW_ITEM_ACTIONS = ('create_item', 'update_item', 'transition_item', 'add_journal_entry')
+WORKFLOW_ITEM_FIELDS = ('title', 'description', 'assignee')
+WORKFLOW_STATE_FIELDS = ('name', 'color', 'position')
+
+def _find_index(entries, key, value):
+    for index, entry in enumerate(entries):
+        if isinstance(entry, dict) and entry.get(key) == value:
+            return index
+    return None
+
+def _work_item_number(item_id):
+    match = re.fullmatch(r'work-(\d+)', str(item_id))
+    return int(match.group(1)) if match else None
+
+def _work_item_id_counter(workflow, index):
+    """
+    The workflow's workItemIdCounter: one past every 'work-N' id the room has used, deleted items
+    included, so an id is never issued twice. Workflows saved before the counter was kept start
+    it after the highest id in use.
+    """
+    if 'workItemIdCounter' not in workflow:
+        numbers = (_work_item_number(item_id) for item_id in index.by_id)
+        workflow['workItemIdCounter'] = max((number + 1 for number in numbers if number is not None), default=0)
+    return workflow['workItemIdCounter']
+
+def _bump_work_item_id_counter(workflow, index, item_id):
+    """Keep workItemIdCounter ahead of a numeric 'work-N' id that is being used."""
+    counter = _work_item_id_counter(workflow, index)
+    number = _work_item_number(item_id)
+    if number is not None and number >= counter:
+        workflow['workItemIdCounter'] = number + 1
+
+def _next_state_id(graph, counter):
+    """First 'state-N' id (N >= counter) that no state uses, and the counter to keep after it."""
+    while graph.has_state(f'state-{counter}'):
+        counter += 1
+    return f'state-{counter}', counter + 1
+
+def _check_transition(graph, item, to_state):
+    """Return an error if the workflow doesn't allow moving the item to to_state."""
+    if not graph.has_state(to_state):
+        return f"Unknown state '{to_state}'"
+    from_state = item.get('stateId')
+    # Items left in a state that has since been deleted may move anywhere
+    if not graph.has_state(from_state):
+        return None
+    if not graph.allows(from_state, to_state):
+        return f"Transition from '{graph.state_name(from_state)}' to '{graph.state_name(to_state)}' is not allowed"
+    return None
+
+def _transition_entry(graph, item, to_state, timestamp):
+    """Journal entry recorded on an item when it changes state (same shape the client writes)."""
+    return {
+        'text': f"State changed from {graph.state_name(item.get('stateId'))} to {graph.state_name(to_state)}",
+        'stateId': to_state,
+        'transition': {'from': item.get('stateId'), 'to': to_state},
+        'timestamp': timestamp
+    }
+
+def server_apply_workflow_op(workflow, work_items, op, graph=None, index=None):
+    """
+    Validate one workflow operation and apply it in place.
+
+    graph is the room's compiled ServerWorkflowGraph (see workflow_graphs) and
+    index its ServerWorkItemIndex (see work_item_indexes); both are kept in step
+    with the op. Without them, they are built for this call.
+
+    Supported actions:
+        create_item       - {'item': {id?, title, description?, stateId, assignee?}}
+        update_item       - {'itemId': str, 'changes': {title?, description?, assignee?, stateId?}}
+        transition_item   - {'itemId': str, 'toStateId': str}
+        delete_item       - {'itemId': str}
+        add_journal_entry - {'itemId': str, 'text': str}
+        add_state         - {'state': {id?, name, color?}}
+        update_state      - {'stateId': str, 'changes': {name?, color?, position?}}
+        delete_state      - {'stateId': str}; refused while work items are in the state
+        add_transition    - {'from': str, 'to': str}
+        delete_transition - {'from': str, 'to': str}
+
+    State changes must follow the workflow's transitions.
+
+    Returns:
+        tuple: (applied_op, error) - the patch to journal and broadcast (see
+        server_apply_workflow_patch), or None and an error message.
+    """
+    if not isinstance(op, dict):
+        return None, 'Operation must be an object'
+
+    workflow.setdefault('states', [])
+    workflow.setdefault('transitions', [])
+    if graph is None:
+        graph = ServerWorkflowGraph(workflow, work_items)
+    if index is None:
+        index = ServerWorkItemIndex(work_items)
+    action = op.get('action')
+    now = server_work_item_timestamp()
+
+    if action == 'create_item':
+        item = op.get('item')
+        if not isinstance(item, dict) or not str(item.get('title', '')).strip():
+            return None, 'Work item needs a title'
+        state_id = item.get('stateId')
+        if not graph.has_state(state_id):
+            return None, f"Unknown state '{state_id}'"
+
+        new_item = {
+            'id': item.get('id'),
+            'title': str(item['title']).strip(),
+            'description': str(item.get('description', '')),
+            'stateId': state_id,
+            'created': item.get('created') or now,
+            'updated': now,
+            'journal': []
+        }
+        if item.get('assignee'):
+            new_item['assignee'] = str(item['assignee'])
+
+        applied = {'action': action, 'item': new_item}
+        # Assign a fresh id if the client's id is missing, already taken, or was a deleted item's
+        counter = _work_item_id_counter(workflow, index)
+        number = _work_item_number(new_item['id'])
+        if not new_item['id'] or new_item['id'] in index.by_id or (number is not None and number < counter):
+            # Items put in by a whole-list update may be ahead of the counter
+            while f'work-{counter}' in index.by_id:
+                counter += 1
+            if new_item['id']:
+                applied['renamedFrom'] = new_item['id']
+            new_item['id'] = f'work-{counter}'
+        server_apply_workflow_patch(workflow, work_items, applied, graph, index)
+        return applied, None
+
+    if action in ('update_item', 'transition_item', 'delete_item', 'add_journal_entry'):
+        item_id = op.get('itemId')
+        item = index.by_id.get(item_id)
+        if item is None:
+            return None, f"Work item '{item_id}' not found"
+
+        if action == 'delete_item':
+            applied = {'action': action, 'itemId': item_id}
+            server_apply_workflow_patch(workflow, work_items, applied, graph, index)
+            return applied, None
+
+        new_item = {**item, 'journal': list(item.get('journal') or []), 'updated': now}
+
+        if action == 'add_journal_entry':
+            text = str(op.get('text', '')).strip()
+            if not text:
+                return None, 'Journal entry needs text'
+            new_item['journal'].append({'text': text, 'timestamp': now, 'stateId': item.get('stateId')})
+
+        else:
+            if action == 'update_item':
+                changes = op.get('changes') or {}
+            else:
+                changes = {'stateId': op.get('toStateId')}
+            if not isinstance(changes, dict):
+                return None, 'Changes must be an object'
+
+            for field in WORKFLOW_ITEM_FIELDS:
+                if field in changes:
+                    new_item[field] = str(changes[field] if changes[field] is not None else '')
+            if 'title' in changes and not new_item['title'].strip():
+                return None, 'Work item needs a title'
+
+            to_state = changes.get('stateId')
+            if to_state is not None and to_state != item.get('stateId'):
+                error = _check_transition(graph, item, to_state)
+                if error:
+                    return None, error
+                new_item['journal'].append(_transition_entry(graph, item, to_state, now))
+                new_item['stateId'] = to_state
+
+        applied = {'action': action, 'item': new_item}
+        server_apply_workflow_patch(workflow, work_items, applied, graph, index)
+        return applied, None
+
+    if action == 'add_state':
+        state = op.get('state')
+        if not isinstance(state, dict) or not str(state.get('name', '')).strip():
+            return None, 'State needs a name'
+        new_state = {'id': state.get('id'), 'name': str(state['name']).strip(), 'color': state.get('color') or '#6c5ce7'}
+        applied = {'action': action, 'state': new_state}
+        if not new_state['id'] or graph.has_state(new_state['id']):
+            if new_state['id']:
+                applied['renamedFrom'] = new_state['id']
+            new_state['id'], workflow['stateIdCounter'] = _next_state_id(graph, workflow.get('stateIdCounter', 0))
+        server_apply_workflow_patch(workflow, work_items, applied, graph, index)
+        return applied, None
+
+    if action in ('update_state', 'delete_state'):
+        state_id = op.get('stateId')
+        if not graph.has_state(state_id):
+            return None, f"State '{state_id}' not found"
+
+        if action == 'delete_state':
+            if graph.item_count(state_id):
+                return None, f"State '{graph.state_name(state_id)}' still has work items"
+            applied = {'action': action, 'stateId': state_id}
+            server_apply_workflow_patch(workflow, work_items, applied, graph, index)
+            return applied, None
+
+        changes = op.get('changes')
+        if not isinstance(changes, dict):
+            return None, 'Changes must be an object'
+        new_state = dict(graph.states[state_id])
+        for field in WORKFLOW_STATE_FIELDS:
+            if field in changes:
+                if changes[field] is None:
+                    new_state.pop(field, None)
+                else:
+                    new_state[field] = changes[field]
+        if not str(new_state.get('name', '')).strip():
+            return None, 'State needs a name'
+        applied = {'action': action, 'state': new_state}
+        server_apply_workflow_patch(workflow, work_items, applied, graph, index)
+        return applied, None
+
+    if action in ('add_transition', 'delete_transition'):
+        from_state, to_state = op.get('from'), op.get('to')
+        exists = graph.allows(from_state, to_state)
+        if action == 'add_transition':
+            for state_id in (from_state, to_state):
+                if not graph.has_state(state_id):
+                    return None, f"Unknown state '{state_id}'"
+            if from_state == to_state:
+                return None, 'A transition needs two different states'
+            if exists:
+                return None, 'This transition already exists'
+        elif not exists:
+            return None, 'Transition not found'
+
+        applied = {'action': action, 'transition': {'from': from_state, 'to': to_state}}
+        server_apply_workflow_patch(workflow, work_items, applied, graph, index)
+        return applied, None
+
+    return None, f"Unknown workflow operation: {action}"
+
+def server_apply_workflow_patch(workflow, work_items, patch, graph=None, index=None):
+    """
+    Apply an already-validated workflow patch in place (also used for journal replay).
+
+    Item patches carry the whole item after the op and replace it by id; state
+    patches carry the whole state; transition patches carry the {from, to} pair.
+    A compiled graph for the workflow, if given, is updated to match, as is the
+    work item index (one is built for item patches if not given).
+    """
+    action = patch.get('action')
+    workflow.setdefault('states', [])
+    workflow.setdefault('transitions', [])
+
+    old_item = None
+
+    if action in WORKFLOW_ITEM_ACTIONS:
+        item = patch['item']
+        if index is None:
+            index = ServerWorkItemIndex(work_items)
+        _bump_work_item_id_counter(workflow, index, item['id'])
+        position = index.position.get(item['id'])
+        if position is None:
+            work_items.append(item)
+        else:
+            old_item = work_items[position]
+            work_items[position] = item
+        index.put(item)
+
+    elif action == 'delete_item':
+        item_id = patch.get('itemId')
+        if index is None:
+            index = ServerWorkItemIndex(work_items)
+        position = index.position.get(item_id)
+        if position is not None:
+            old_item = work_items.pop(position)
+            index.remove(item_id)
+
+    elif action in ('add_state', 'update_state'):
+        state = patch['state']
+        position = _find_index(workflow['states'], 'id', state['id'])
+        if position is None:
+            workflow['states'].append(state)
+        else:
+            workflow['states'][position] = state
+
+    elif action == 'delete_state':
+        state_id = patch.get('stateId')
+        workflow['states'] = [state for state in workflow['states'] if state.get('id') != state_id]
+        # Transitions to or from a deleted state go with it
+        workflow['transitions'] = [
+            transition for transition in workflow['transitions']
+            if transition.get('from') != state_id and transition.get('to') != state_id
+        ]
+
+    elif action == 'add_transition':
+        transition = patch['transition']
+        if not any(
+            existing.get('from') == transition['from'] and existing.get('to') == transition['to']
+            for existing in workflow['transitions']
+        ):
+            workflow['transitions'].append(dict(transition))
+
+    elif action == 'delete_transition':
+        transition = patch['transition']
+        workflow['transitions'] = [
+            existing for existing in workflow['transitions']
+            if existing.get('from') != transition['from'] or existing.get('to') != transition['to']
+        ]
+
+    else:
+        raise ValueError(f"Unknown workflow patch: {action}")
+
+    if graph is not None:
+        graph.apply_patch(patch, old_item)
@@ -0,0 +1,54 @@
+import logging
+import os
+import tempfile
+from server.server_state import STATE_FSYNC_FILE, STATE_FSYNC_DIR
+
+def server_atomic_write(file_path, data, fsync_file=STATE_FSYNC_FILE, fsync_dir=STATE_FSYNC_DIR):
+    """
+    Atomically replace file_path with data.
+
+    The data is written to a temp file in the same directory and renamed over
+    the target, so readers see either the old file or the new one, never a
+    truncated file.
+
+    Args:
+        file_path (str): Destination file
+        data (str | bytes): Text, or encoded bytes, to write
+        fsync_file (bool): fsync the temp file before the rename
+        fsync_dir (bool): fsync the directory after the rename so the rename itself is durable
+    """
+    directory = os.path.dirname(file_path) or '.'
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f'.{os.path.basename(file_path)}.', suffix='.tmp')
+    try:
+        # mkstemp creates files as 0600; keep the permissions the target already had
+        try:
+            mode = os.stat(file_path).st_mode & 0o777
+        except FileNotFoundError:
+            mode = 0o644
+        os.chmod(tmp_path, mode)
+
+        with os.fdopen(fd, 'wb' if isinstance(data, bytes) else 'w') as f:
+            f.write(data)
+            if fsync_file:
+                f.flush()
+                os.fsync(f.fileno())
+
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        # Don't leave half-written temp files behind
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+    # Directory fsync isn't available on every platform (e.g. Windows)
+    if fsync_dir and hasattr(os, 'O_DIRECTORY'):
+        try:
+            dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+        except OSError as e:
+            logging.warning(f"Could not fsync directory {directory}: {e}")
@@ -1,21 +1,22 @@
-import json
 import os
 import logging
 from aiohttp import web
+from server.server_state import BADGE_FEED_PAGE_SIZE
+from server.server_storage import storage, BADGE_DATA_FILE
+from server.server_json_codec import server_json_response
 
-# Badge data storage file
-BADGE_STORAGE_FILE = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'badges.json')
+# Badge data file used by the JSON storage backend
+BADGE_STORAGE_FILE = BADGE_DATA_FILE
 
 def load_badge_data():
-    """Load badge data from the JSON file."""
+    """Load badge data from the configured storage backend."""
     try:
-        if os.path.exists(BADGE_STORAGE_FILE):
-            with open(BADGE_STORAGE_FILE, 'r') as f:
-                badge_data = json.load(f)
-                logging.info(f"Badge data loaded successfully with {len(badge_data.get('badges', []))} badges")
-                return badge_data
+        badge_data = storage.load_badges()
+        if badge_data is not None:
+            logging.info(f"Badge data loaded successfully with {len(badge_data.get('badges', []))} badges")
+            return badge_data
         else:
-            # Create initial badge data structure if file doesn't exist
+            # Create initial badge data structure if nothing has been saved yet
             badge_data = create_default_badge_data()
             save_badge_data(badge_data)
             return badge_data
@@ -24,13 +25,9 @@ def load_badge_data():
         return create_default_badge_data()
 
 def save_badge_data(badge_data):
-    """Save badge data to the JSON file."""
+    """Save badge data to the configured storage backend."""
     try:
-        # Ensure the data directory exists
-        os.makedirs(os.path.dirname(BADGE_STORAGE_FILE), exist_ok=True)
-        
-        with open(BADGE_STORAGE_FILE, 'w') as f:
-            json.dump(badge_data, f, indent=2)
+        storage.write_badges(storage.encode_badges(badge_data))
         logging.info("Badge data saved successfully")
         return True
     except Exception as e:
@@ -147,168 +144,102 @@ async def handle_badge_request(request):
 
 async def handle_badge_data_request(request):
     """Handle HTTP requests for badge data."""
+    # Imported here because the badge store builds on the load/save helpers above
+    from server.server_badge_store import badge_store
     try:
-        badge_data = load_badge_data()
-        return web.json_response(badge_data)
+        return server_json_response(badge_store.snapshot())
     except Exception as e:
         logging.error(f"Error serving badge data: {e}")
         return web.Response(text="Error loading badge data", status=500)
 
+async def handle_badge_feed_request(request):
+    """Handle HTTP requests for a page of the activity feed: /api/badges/feed?before=<cursor>&limit=<n>."""
+    from server.server_badge_store import badge_store
+    try:
+        before = request.query.get('before')
+        before = int(before) if before not in (None, '') else None
+        limit = int(request.query.get('limit', BADGE_FEED_PAGE_SIZE))
+    except ValueError:
+        return server_json_response({'status': 'error', 'message': 'before and limit must be integers'}, status=400)
+    try:
+        badge_store.get_data()
+        return server_json_response(badge_store.feed_page(before, limit))
+    except Exception as e:
+        logging.error(f"Error serving activity feed: {e}")
+        return web.Response(text="Error loading activity feed", status=500)
+
 async def handle_badge_update(ws, data):
-    """Handle WebSocket messages for badge updates."""
+    """
+    Handle WebSocket messages for badge updates.
+
+    Changes are broadcast to every badge client as a small badge_event;
+    the reply to the sender only carries the status.
+    """
+    from server.server_badge_store import badge_store
+    from server.server_broadcast_badge_event import server_broadcast_badge_event
     try:
         action = data.get('action')
-        badge_data = load_badge_data()
+        badge_store.get_data()
+        event = None
         
         if action == 'award_badge':
             # Handle awarding a badge
-            badge_id = data.get('badgeId')
-            user_id = data.get('userId')
-            awarder_id = data.get('awarderId')
-            
-            # Find the user
-            user = next((u for u in badge_data['users'] if u['id'] == user_id), None)
-            if user:
-                # Check if user already has this badge
-                if not any(b['badgeId'] == badge_id for b in user['earnedBadges']):
-                    # Award the badge
-                    from datetime import datetime
-                    today = datetime.now().strftime('%Y-%m-%d')
-                    
-                    user['earnedBadges'].append({
-                        'badgeId': badge_id,
-                        'dateEarned': today,
-                        'awardedBy': awarder_id
-                    })
-                    
-                    # Add to activity feed
-                    badge_data['activityFeed'].insert(0, {
-                        'id': f"activity{len(badge_data['activityFeed'])+1}",
-                        'type': 'award',
-                        'date': today,
-                        'awarderId': awarder_id,
-                        'awardeeId': user_id,
-                        'badgeId': badge_id
-                    })
-                    
-                    save_badge_data(badge_data)
-                    
-                    # Broadcast update to all clients
-                    return {'status': 'success', 'badge_data': badge_data}
-            
-            return {'status': 'error', 'message': 'Failed to award badge'}
+            event = badge_store.award_badge(data.get('userId'), data.get('badgeId'), data.get('awarderId'))
+            if event is None:
+                return {'status': 'error', 'message': 'Failed to award badge'}
             
         elif action == 'add_badge':
             # Handle adding a new badge
-            new_badge = data.get('badge')
-            new_badge['id'] = f"badge{len(badge_data['badges'])+1}"
-            badge_data['badges'].append(new_badge)
-            save_badge_data(badge_data)
-            return {'status': 'success', 'badge_data': badge_data}
+            event = badge_store.add_badge(data.get('badge'))
             
         elif action == 'add_category':
             # Handle adding a new category
-            new_category = data.get('category')
-            new_category['id'] = f"cat{len(badge_data['categories'])+1}"
-            badge_data['categories'].append(new_category)
-            save_badge_data(badge_data)
-            return {'status': 'success', 'badge_data': badge_data}
+            event = badge_store.add_category(data.get('category'))
             
         elif action == 'update_badge':
             # Handle updating a badge
-            updated_badge = data.get('badge')
-            badge_id = updated_badge.get('id')
-            
-            for i, badge in enumerate(badge_data['badges']):
-                if badge['id'] == badge_id:
-                    badge_data['badges'][i] = updated_badge
-                    save_badge_data(badge_data)
-                    return {'status': 'success', 'badge_data': badge_data}
-            
-            return {'status': 'error', 'message': 'Badge not found'}
+            event = badge_store.update_badge(data.get('badge'))
+            if event is None:
+                return {'status': 'error', 'message': 'Badge not found'}
             
         elif action == 'update_category':
-            # Handle updating a category
-            updated_category = data.get('category')
-            category_id = updated_category.get('id')
-            
-            for i, category in enumerate(badge_data['categories']):
-                if category['id'] == category_id:
-                    old_name = category['name']
-                    badge_data['categories'][i] = updated_category
-                    
-                    # Update category name in badges
-                    if old_name != updated_category['name']:
-                        for badge in badge_data['badges']:
-                            if badge['category'] == old_name:
-                                badge['category'] = updated_category['name']
-                    
-                    save_badge_data(badge_data)
-                    return {'status': 'success', 'badge_data': badge_data}
-            
-            return {'status': 'error', 'message': 'Category not found'}
+            # Handle updating a category (and its name on badges)
+            event = badge_store.update_category(data.get('category'))
+            if event is None:
+                return {'status': 'error', 'message': 'Category not found'}
             
         elif action == 'delete_badge':
-            # Handle deleting a badge
-            badge_id = data.get('badgeId')
-            
-            # Remove badge from all users
-            for user in badge_data['users']:
-                user['earnedBadges'] = [b for b in user['earnedBadges'] if b['badgeId'] != badge_id]
-            
-            # Remove badge from list
-            badge_data['badges'] = [b for b in badge_data['badges'] if b['id'] != badge_id]
-            
-            # Remove related activities
-            badge_data['activityFeed'] = [a for a in badge_data['activityFeed'] if a.get('badgeId') != badge_id]
-            
-            save_badge_data(badge_data)
-            return {'status': 'success', 'badge_data': badge_data}
+            # Handle deleting a badge, including from users and the activity feed
+            event = badge_store.delete_badge(data.get('badgeId'))
+            if event is None:
+                return {'status': 'error', 'message': 'Badge not found'}
             
         elif action == 'delete_category':
             # Handle deleting a category
-            category_id = data.get('categoryId')
-            
-            # Find the category
-            category = next((c for c in badge_data['categories'] if c['id'] == category_id), None)
-            if category:
-                # Check if category is in use
-                if any(badge['category'] == category['name'] for badge in badge_data['badges']):
-                    return {'status': 'error', 'message': 'Category is in use by badges'}
-                
-                # Remove category
-                badge_data['categories'] = [c for c in badge_data['categories'] if c['id'] != category_id]
-                save_badge_data(badge_data)
-                return {'status': 'success', 'badge_data': badge_data}
-            
-            return {'status': 'error', 'message': 'Category not found'}
+            event, error = badge_store.delete_category(data.get('categoryId'))
+            if error:
+                return {'status': 'error', 'message': error}
             
         elif action == 'get_badge_data':
-            # Just return the current badge data
-            return {'status': 'success', 'badge_data': badge_data}
+            # Full snapshot, e.g. for a client that missed events
+            return {'status': 'success', 'badge_data': badge_store.snapshot(), 'version': badge_store.version}
+        
+        elif action == 'get_activity_feed':
+            # Older activity for infinite scroll; 'before' is the 'next' cursor of the previous page
+            page = badge_store.feed_page(data.get('before'), data.get('limit', BADGE_FEED_PAGE_SIZE))
+            return {'status': 'success', 'action': action, **page}
         
         elif action == 'login_user':
-            # Handle user login
-            username = data.get('username')
-            
-            # Check if user exists
-            user = next((u for u in badge_data['users'] if u['name'].lower() == username.lower()), None)
-            if user:
-                return {'status': 'success', 'user': user}
-            else:
-                # Create new user
-                new_user = {
-                    'id': f"user{len(badge_data['users'])+1}",
-                    'name': username,
-                    'role': "Team Member",
-                    'profilePicture': "",
-                    'earnedBadges': []
-                }
-                badge_data['users'].append(new_user)
-                save_badge_data(badge_data)
-                return {'status': 'success', 'user': new_user}
+            # Handle user login (creates the user on first login)
+            user, event = badge_store.login_user(data.get('username'))
+            await server_broadcast_badge_event(event)
+            return {'status': 'success', 'user': user}
+        
+        else:
+            return {'status': 'error', 'message': 'Unknown action'}
         
-        return {'status': 'error', 'message': 'Unknown action'}
+        await server_broadcast_badge_event(event)
+        return {'status': 'success', 'action': action, 'version': badge_store.version}
         
     except Exception as e:
         logging.error(f"Error handling badge update: {e}")
@@ -0,0 +1,338 @@
+import asyncio
+import bisect
+import logging
+from datetime import datetime
+from server.server_state import SAVE_COALESCE_WINDOW, BADGE_FEED_RETENTION, BADGE_FEED_PAGE_SIZE, BADGE_FEED_MAX_PAGE_SIZE
+from server.server_storage import storage
+from server.server_badge_handler import load_badge_data
+
+# Badge document kept in memory with dict indexes; saved to the storage backend in the background
+class ServerBadgeStore:
+    def __init__(self, storage=storage):
+        self.storage = storage
+        self.data = None           # users, badges and categories; the activity feed is kept in self._feed
+        self.version = 0           # bumped for every change event, so clients can spot missed events
+        self._dirty = False
+        self._save_task = None
+        self._save_lock = asyncio.Lock()
+
+    def load(self):
+        """Read the saved badge data once and build the indexes."""
+        self.data = load_badge_data()
+        for key in ('users', 'badges', 'categories', 'activityFeed'):
+            self.data.setdefault(key, [])
+        self._load_feed(self.data.pop('activityFeed'))
+        self._build_indexes()
+        return self.data
+
+    def get_data(self):
+        if self.data is None:
+            self.load()
+        return self.data
+
+    def _load_feed(self, activity_feed):
+        # Storage keeps the feed newest first; in memory it is an append-only log, oldest first
+        self._feed = list(reversed(activity_feed))
+        seqs = [activity.get('seq') for activity in self._feed]
+        if not all(isinstance(seq, int) for seq in seqs) or any(a >= b for a, b in zip(seqs, seqs[1:])):
+            # Older files have no (or unordered) sequence numbers; number them in feed order
+            for seq, activity in enumerate(self._feed, 1):
+                activity['seq'] = seq
+        self._feed_seq = self._feed[-1]['seq'] if self._feed else 0
+        self._trim_feed(BADGE_FEED_RETENTION)
+
+    def _trim_feed(self, keep):
+        if len(self._feed) > keep:
+            del self._feed[:len(self._feed) - keep]
+
+    def _build_indexes(self):
+        data = self.data
+        self._users_by_id = {}
+        self._users_by_name = {}
+        self._earned = {}          # user id -> set of badge ids
+        self._holders = {}         # badge id -> set of user ids
+        for user in data['users']:
+            user.setdefault('earnedBadges', [])
+            self._index_user(user)
+            for earned in user['earnedBadges']:
+                self._earned[user['id']].add(earned['badgeId'])
+                self._holders.setdefault(earned['badgeId'], set()).add(user['id'])
+
+        self._badges_by_id = {}
+        self._badge_positions = {}      # badge id -> position in data['badges']
+        self._badges_by_category = {}   # category name -> {badge id: badge}
+        for position, badge in enumerate(data['badges']):
+            self._index_badge(badge)
+            self._badge_positions[badge['id']] = position
+
+        self._categories_by_id = {}
+        self._category_positions = {}   # category id -> position in data['categories']
+        self._categories_by_name = {}
+        for position, category in enumerate(data['categories']):
+            self._index_category(category)
+            self._category_positions[category['id']] = position
+
+    def _index_user(self, user):
+        self._users_by_id[user['id']] = user
+        self._users_by_name.setdefault(user['name'].lower(), user)
+        self._earned.setdefault(user['id'], set())
+
+    def _index_badge(self, badge):
+        self._badges_by_id[badge['id']] = badge
+        self._badges_by_category.setdefault(badge.get('category'), {})[badge['id']] = badge
+
+    def _unindex_badge(self, badge):
+        self._badges_by_id.pop(badge['id'], None)
+        in_category = self._badges_by_category.get(badge.get('category'))
+        if in_category is not None:
+            in_category.pop(badge['id'], None)
+            if not in_category:
+                del self._badges_by_category[badge.get('category')]
+
+    def _index_category(self, category):
+        self._categories_by_id[category['id']] = category
+        self._categories_by_name[category['name']] = category
+
+    @staticmethod
+    def _next_id(prefix, count, index):
+        # Same "<prefix><n>" scheme as before, skipping numbers a deletion has freed up for reuse
+        number = count + 1
+        while f"{prefix}{number}" in index:
+            number += 1
+        return f"{prefix}{number}"
+
+    # Lookups
+
+    def get_user(self, user_id):
+        return self._users_by_id.get(user_id)
+
+    def find_user_by_name(self, name):
+        return self._users_by_name.get(name.lower())
+
+    def get_badge(self, badge_id):
+        return self._badges_by_id.get(badge_id)
+
+    def get_category(self, category_id):
+        return self._categories_by_id.get(category_id)
+
+    def find_category_by_name(self, name):
+        return self._categories_by_name.get(name)
+
+    def feed_page(self, before=None, limit=BADGE_FEED_PAGE_SIZE):
+        """
+        One page of the activity feed, newest first.
+
+        Args:
+            before (int, optional): Cursor; only activities with a lower seq are returned
+            limit (int): Page size, clamped to BADGE_FEED_MAX_PAGE_SIZE
+
+        Returns:
+            dict: {'activities': [...], 'next': cursor for the following page, or None at the end}
+        """
+        limit = max(1, min(int(limit), BADGE_FEED_MAX_PAGE_SIZE))
+        if before is None:
+            end = len(self._feed)
+        else:
+            end = bisect.bisect_left(self._feed, int(before), key=lambda a: a['seq'])
+        start = max(0, end - limit)
+        return {
+            'activities': self._feed[start:end][::-1],
+            'next': self._feed[start]['seq'] if start > 0 else None
+        }
+
+    def snapshot(self):
+        """Badge data for a new client: everything except the feed, which only gets its first page."""
+        if self.data is None:
+            self.load()
+        page = self.feed_page()
+        return {**self.data, 'activityFeed': page['activities'], 'activityFeedNext': page['next']}
+
+    # Mutations - each returns the change event to broadcast, or None if nothing changed
+
+    def _event(self, name, **fields):
+        self.version += 1
+        self.mark_dirty()
+        return {'type': 'badge_event', 'event': name, 'version': self.version, **fields}
+
+    def award_badge(self, user_id, badge_id, awarder_id):
+        """Give a user a badge."""
+        user = self._users_by_id.get(user_id)
+        if user is None or badge_id in self._earned[user_id]:
+            return None
+
+        today = datetime.now().strftime('%Y-%m-%d')
+        earned = {
+            'badgeId': badge_id,
+            'dateEarned': today,
+            'awardedBy': awarder_id
+        }
+        user['earnedBadges'].append(earned)
+        self._earned[user_id].add(badge_id)
+        self._holders.setdefault(badge_id, set()).add(user_id)
+
+        self._feed_seq += 1
+        activity = {
+            'id': f"activity{self._feed_seq}",
+            'seq': self._feed_seq,
+            'type': 'award',
+            'date': today,
+            'awarderId': awarder_id,
+            'awardeeId': user_id,
+            'badgeId': badge_id
+        }
+        self._feed.append(activity)
+        # Trim in batches so the O(n) delete runs once per tenth of the retention, not per award
+        if len(self._feed) > BADGE_FEED_RETENTION + BADGE_FEED_RETENTION // 10:
+            self._trim_feed(BADGE_FEED_RETENTION)
+        return self._event('badge_awarded', userId=user_id, earned=earned, activity=activity)
+
+    def add_badge(self, badge):
+        badge['id'] = self._next_id('badge', len(self.data['badges']), self._badges_by_id)
+        self._badge_positions[badge['id']] = len(self.data['badges'])
+        self.data['badges'].append(badge)
+        self._index_badge(badge)
+        return self._event('badge_added', badge=badge)
+
+    def add_category(self, category):
+        category['id'] = self._next_id('cat', len(self.data['categories']), self._categories_by_id)
+        self._category_positions[category['id']] = len(self.data['categories'])
+        self.data['categories'].append(category)
+        self._index_category(category)
+        return self._event('category_added', category=category)
+
+    def update_badge(self, updated_badge):
+        """Replace an existing badge."""
+        badge = self._badges_by_id.get(updated_badge.get('id'))
+        if badge is None:
+            return None
+
+        self.data['badges'][self._badge_positions[badge['id']]] = updated_badge
+        self._unindex_badge(badge)
+        self._index_badge(updated_badge)
+        return self._event('badge_updated', badge=updated_badge)
+
+    def update_category(self, updated_category):
+        """Replace an existing category, renaming it on its badges."""
+        category = self._categories_by_id.get(updated_category.get('id'))
+        if category is None:
+            return None
+
+        self.data['categories'][self._category_positions[category['id']]] = updated_category
+        if self._categories_by_name.get(category['name']) is category:
+            del self._categories_by_name[category['name']]
+        self._index_category(updated_category)
+
+        old_name = category['name']
+        new_name = updated_category['name']
+        if old_name != new_name:
+            for badge in list(self._badges_by_category.get(old_name, {}).values()):
+                self._unindex_badge(badge)
+                badge['category'] = new_name
+                self._index_badge(badge)
+
+        # Clients rename the category on their copies of the badges themselves
+        return self._event('category_updated', category=updated_category, oldName=old_name)
+
+    def delete_badge(self, badge_id):
+        badge = self._badges_by_id.get(badge_id)
+        if badge is None:
+            return None
+
+        # Only users who actually hold the badge need touching
+        for user_id in self._holders.pop(badge_id, ()):
+            user = self._users_by_id.get(user_id)
+            if user is not None:
+                user['earnedBadges'] = [b for b in user['earnedBadges'] if b['badgeId'] != badge_id]
+                self._earned[user_id].discard(badge_id)
+
+        badges = self.data['badges']
+        position = self._badge_positions.pop(badge_id)
+        del badges[position]
+        # Badges after the removed one each move up a place
+        for moved in range(position, len(badges)):
+            self._badge_positions[badges[moved]['id']] = moved
+        self._unindex_badge(badge)
+
+        self._feed = [a for a in self._feed if a.get('badgeId') != badge_id]
+        return self._event('badge_deleted', badgeId=badge_id)
+
+    def delete_category(self, category_id):
+        """Remove an unused category; returns (event, error message)."""
+        category = self._categories_by_id.get(category_id)
+        if category is None:
+            return None, 'Category not found'
+        if self._badges_by_category.get(category['name']):
+            return None, 'Category is in use by badges'
+
+        categories = self.data['categories']
+        position = self._category_positions.pop(category_id)
+        del categories[position]
+        # Categories after the removed one each move up a place
+        for moved in range(position, len(categories)):
+            self._category_positions[categories[moved]['id']] = moved
+        del self._categories_by_id[category_id]
+        if self._categories_by_name.get(category['name']) is category:
+            del self._categories_by_name[category['name']]
+        return self._event('category_deleted', categoryId=category_id), None
+
+    def login_user(self, username):
+        """Return (user, event) for this name (case-insensitive), creating the user if needed."""
+        user = self._users_by_name.get(username.lower())
+        if user is not None:
+            return user, None
+
+        user = {
+            'id': self._next_id('user', len(self.data['users']), self._users_by_id),
+            'name': username,
+            'role': "Team Member",
+            'profilePicture': "",
+            'earnedBadges': []
+        }
+        self.data['users'].append(user)
+        self._index_user(user)
+        return user, self._event('user_added', user=user)
+
+    # Persistence
+
+    def mark_dirty(self):
+        """Queue a background save; bursts of changes within the coalesce window share one write."""
+        self._dirty = True
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop (e.g. startup code) - write straight away
+            self._write(self._encode())
+            return
+        if self._save_task is None or self._save_task.done():
+            self._save_task = loop.create_task(self._delayed_save())
+
+    async def _delayed_save(self):
+        await asyncio.sleep(SAVE_COALESCE_WINDOW)
+        await self.flush()
+
+    def _encode(self):
+        self._dirty = False
+        self._trim_feed(BADGE_FEED_RETENTION)
+        # Same document layout as before: feed newest first
+        return self.storage.encode_badges({**self.data, 'activityFeed': self._feed[::-1]})
+
+    def _write(self, encoded):
+        try:
+            self.storage.write_badges(encoded)
+            logging.info("Badge data saved successfully")
+            return True
+        except Exception as e:
+            logging.error(f"Error saving badge data: {e}")
+            self._dirty = True
+            return False
+
+    async def flush(self):
+        """Write pending changes now (used by the background saver and at shutdown)."""
+        async with self._save_lock:
+            if not self._dirty:
+                return True
+            # Encoded on the loop so the document can't change mid-serialization; written off the loop
+            encoded = self._encode()
+            return await asyncio.to_thread(self._write, encoded)
+
+badge_store = ServerBadgeStore()
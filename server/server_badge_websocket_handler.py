@@ -1,28 +1,42 @@
 import logging
-import json
 import aiohttp
 from aiohttp import web
-from server.server_badge_handler import handle_badge_update, load_badge_data
+from server.server_state import badge_clients
+from server.server_badge_handler import handle_badge_update
+from server.server_badge_store import badge_store
+from server.server_outbound_queue import server_open_outbound_queue, server_close_outbound_queue
+from server.server_utils import encode_message, send_encoded
+from server.server_compressed_websocket import ServerWebSocketResponse
+from server.server_json_codec import json_decode, JSONDecodeError
 
 async def server_badge_websocket_handler(request):
     """Dedicated WebSocket handler for badge system."""
-    ws = web.WebSocketResponse()
+    ws = ServerWebSocketResponse()
     await ws.prepare(request)
     
     client_id = str(id(ws))
     logging.info(f"New badge client connected: {client_id}")
     
+    # Everything for this client goes through its outbound queue, so replies,
+    # the initial snapshot and broadcast badge events arrive in the order they were produced
+    async def send(message):
+        await send_encoded(ws, encode_message(message))
+    
+    server_open_outbound_queue(ws)
+    badge_clients.add(ws)
+    
     # Send initial badge data
     try:
-        badge_data = load_badge_data()
-        await ws.send_json({
+        badge_data = badge_store.snapshot()
+        await send({
             'type': 'badge_data_update',
             'status': 'success',
-            'badge_data': badge_data
+            'badge_data': badge_data,
+            'version': badge_store.version
         })
     except Exception as e:
         logging.error(f"Error sending initial badge data: {e}")
-        await ws.send_json({
+        await send({
             'type': 'badge_data_update',
             'status': 'error',
             'message': 'Failed to load badge data'
@@ -32,30 +46,30 @@ async def server_badge_websocket_handler(request):
         async for msg in ws:
             if msg.type == web.WSMsgType.TEXT:
                 try:
-                    data = json.loads(msg.data)
+                    data = json_decode(msg.data)
                     if data.get('type') == 'badge_update':
                         response = await handle_badge_update(ws, data)
-                        await ws.send_json({
+                        await send({
                             'type': 'badge_update_response',
                             **response
                         })
                     else:
                         logging.warning(f"Unknown badge message type: {data.get('type')}")
-                        await ws.send_json({
+                        await send({
                             'type': 'badge_update_response',
                             'status': 'error',
                             'message': 'Unknown message type'
                         })
-                except json.JSONDecodeError:
+                except JSONDecodeError:
                     logging.error(f"Failed to parse badge message: {msg.data}")
-                    await ws.send_json({
+                    await send({
                         'type': 'badge_update_response',
                         'status': 'error',
                         'message': 'Invalid JSON format'
                     })
                 except Exception as e:
                     logging.error(f"Error handling badge message: {e}")
-                    await ws.send_json({
+                    await send({
                         'type': 'badge_update_response',
                         'status': 'error',
                         'message': str(e)
@@ -64,6 +78,8 @@ async def server_badge_websocket_handler(request):
                 logging.error(f"Badge WebSocket connection closed with exception: {ws.exception()}")
                 break
     finally:
+        badge_clients.discard(ws)
+        server_close_outbound_queue(ws)
         logging.info(f"Badge client disconnected: {client_id}")
     
     return ws
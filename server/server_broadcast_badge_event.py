@@ -0,0 +1,13 @@
+import logging
+from server.server_state import badge_clients
+from server.server_utils import broadcast_message
+
+async def server_broadcast_badge_event(event):
+    """Send one badge change event to every badge subscriber, encoded once."""
+    if event is None:
+        return
+    try:
+        client_count = await broadcast_message(badge_clients, event)
+        logging.debug(f"Badge event '{event['event']}' v{event['version']} sent to {client_count} clients")
+    except Exception as e:
+        logging.error(f"Error broadcasting badge event: {e}")
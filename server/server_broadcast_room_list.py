@@ -1,28 +1,43 @@
+import asyncio
 import logging
-from server.server_state import rooms_state, clients, deleted_rooms
+from server.server_state import deleted_rooms, ROOM_LIST_BROADCAST_DELAY
+from server.server_room_directory import room_directory
+from server.server_connection_manager import connection_manager
+from server.server_utils import broadcast_message
+
+# Debounced room list broadcasts: a burst of room changes becomes one message to every client
+class ServerRoomListBroadcaster:
+    def __init__(self, delay=ROOM_LIST_BROADCAST_DELAY):
+        self.delay = delay
+        self.broadcast_count = 0
+        self._sent_version = 0
+        self._task = None
+
+    def request(self):
+        """Schedule a broadcast if the room list changed since the last one went out."""
+        if room_directory.version == self._sent_version:
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        # Keep going until clients have the latest version, in case the list changed mid-send
+        while room_directory.version != self._sent_version:
+            await asyncio.sleep(self.delay)
+
+            version = room_directory.version
+            recipients = connection_manager.all_connections(exclude_rooms=deleted_rooms)
+
+            # Encoded once per version, sent to every client in every room
+            client_count = await broadcast_message(recipients, room_directory.encoded_message(), coalesce_key='rooms')
+            self._sent_version = version
+            self.broadcast_count += 1
+            logging.debug(f"Broadcast room list version {version} to {client_count} client(s)")
+
+room_list_broadcaster = ServerRoomListBroadcaster()
 
 async def server_broadcast_room_list():
     try:
-        existing_rooms = set(['default'] + [
-            room for room in rooms_state.keys() 
-            if room != 'default' and room not in deleted_rooms
-        ])
-        room_list = sorted(list(existing_rooms))
-        
-        logging.debug(f"Broadcasting room list: {room_list}")
-        
-        room_data = {
-            'type': 'rooms',
-            'rooms': room_list
-        }
-        
-        for room in list(clients.keys()):
-            if room not in deleted_rooms:
-                for client in list(clients[room]):
-                    if not client.closed:
-                        try:
-                            await client.send_json(room_data)
-                        except Exception as e:
-                            logging.error(f"Error sending room list to client: {e}")
+        room_list_broadcaster.request()
     except Exception as e:
         logging.error(f"Error broadcasting room list: {e}")
@@ -0,0 +1,203 @@
+import inspect
+import logging
+import zlib
+import aiohttp
+from aiohttp import web, WSMsgType
+from server.server_state import WS_COMPRESSION, WS_COMPRESS_MIN_BYTES, WS_COMPRESS_LEVEL, WS_BINARY_PROTOCOL
+from server.server_json_codec import json_encode, json_encode_str, json_decode
+from server.server_msgpack_codec import msgpack_encode, MSGPACK_BACKEND
+
+# RSV1 marks a frame as deflated (RFC 7692); aiohttp writes the opcode bits it is given as-is
+WS_RSV1 = 0x40
+WS_DEFLATE_TRAILER = b'\x00\x00\xff\xff'
+
+# Older aiohttp always decodes text frames to str
+DECODE_TEXT_SUPPORTED = 'decode_text' in inspect.signature(web.WebSocketResponse.__init__).parameters
+
+def _json_keys(obj):
+    """A copy of obj with every dict key a string, as a JSON round trip would leave it (1 -> '1', True -> 'true')."""
+    if isinstance(obj, dict):
+        return {
+            (key if isinstance(key, str) else json_encode_str(key)): _json_keys(value)
+            for key, value in obj.items()
+        }
+    if isinstance(obj, (list, tuple)):
+        return [_json_keys(value) for value in obj]
+    return obj
+
+class _ProbeTransport:
+    def __init__(self):
+        self.data = bytearray()
+
+    def write(self, data):
+        self.data += data
+
+    def writelines(self, chunks):
+        for chunk in chunks:
+            self.data += chunk
+
+    def is_closing(self):
+        return False
+
+def _writer_sends_frames_as_given():
+    """
+    Check the aiohttp internals ServerWebSocketResponse relies on (requirements.txt pins the
+    versions they were checked against): setting the writer's compress to 0 turns its own
+    deflate off, and a frame whose opcode has RSV1 set is written unchanged.
+    """
+    try:
+        from aiohttp.http_websocket import WebSocketWriter
+        transport = _ProbeTransport()
+        writer = WebSocketWriter(object(), transport, compress=15)
+        writer.compress = 0
+        for opcode in (WSMsgType.TEXT | WS_RSV1, WSMsgType.TEXT):
+            send = writer.send_frame(b'x', opcode)
+            try:
+                send.send(None)
+            except StopIteration:
+                continue
+            # It waited on something; not the writer this was checked against
+            send.close()
+            return False
+        return bytes(transport.data) == bytes((0x80 | WS_RSV1 | WSMsgType.TEXT, 1)) + b'x' + bytes((0x80 | WSMsgType.TEXT, 1)) + b'x'
+    except Exception as e:
+        logging.debug(f"WebSocket writer probe failed: {e}")
+        return False
+
+# Only deflate large frames ourselves when this aiohttp's writer works as expected; otherwise
+# connections behave like a plain WebSocketResponse and aiohttp deflates every frame
+SELECTIVE_COMPRESSION = WS_COMPRESSION and _writer_sends_frames_as_given()
+if WS_COMPRESSION and not SELECTIVE_COMPRESSION:
+    logging.warning(f"aiohttp {aiohttp.__version__} doesn't write pre-compressed WebSocket frames as expected; "
+                    f"using its own permessage-deflate for every frame")
+
+# Totals across all connections, including ones that have since closed
+compression_totals = {
+    'connections': 0,          # connections that negotiated permessage-deflate
+    'compressedFrames': 0,
+    'uncompressedFrames': 0,   # frames under the threshold on those connections
+    'rawBytes': 0,             # size of the compressed frames before compression
+    'wireBytes': 0,            # ... and after
+    'deflates': 0              # compressions actually run (a broadcast shares one)
+}
+
+# Connections on the binary (MessagePack) subprotocol, and JSON messages converted for them
+binary_protocol_totals = {
+    'connections': 0,
+    'conversions': 0           # a broadcast is converted once for all binary clients
+}
+
+# An encoded message that keeps its deflated and MessagePack forms, so a broadcast is compressed
+# and converted once for every client
+class ServerFrame(bytes):
+    def deflated(self, window_bits):
+        cache = self.__dict__.setdefault('_deflated', {})
+        if window_bits not in cache:
+            cache[window_bits] = server_deflate(self, window_bits)
+        return cache[window_bits]
+
+    def packed(self):
+        # Converted from the encoded JSON, not the original object, which may have changed since.
+        # (orjson only reads exact bytes, not subclasses.)
+        if '_packed' not in self.__dict__:
+            self._packed = ServerFrame(msgpack_encode(json_decode(bytes(self))))
+            binary_protocol_totals['conversions'] += 1
+        return self._packed
+
+def server_deflate(payload, window_bits):
+    """Compress one message as a self-contained permessage-deflate frame payload."""
+    compressor = zlib.compressobj(WS_COMPRESS_LEVEL, zlib.DEFLATED, -window_bits)
+    compression_totals['deflates'] += 1
+    return (compressor.compress(payload) + compressor.flush(zlib.Z_SYNC_FLUSH)).removesuffix(WS_DEFLATE_TRAILER)
+
+# WebSocket response that only deflates frames above WS_COMPRESS_MIN_BYTES and encodes JSON with the server's codec.
+# Given a binary_protocol, clients that ask for it get every message as a MessagePack binary frame instead.
+class ServerWebSocketResponse(web.WebSocketResponse):
+    def __init__(self, *args, min_compress_bytes=WS_COMPRESS_MIN_BYTES, binary_protocol=None, **kwargs):
+        kwargs.setdefault('compress', WS_COMPRESSION)
+        if DECODE_TEXT_SUPPORTED:
+            # Text frames arrive as bytes, which json_decode reads without a str copy
+            kwargs.setdefault('decode_text', False)
+        if binary_protocol:
+            kwargs.setdefault('protocols', (binary_protocol,))
+        super().__init__(*args, **kwargs)
+        self.min_compress_bytes = min_compress_bytes
+        self.binary_protocol = binary_protocol
+        self.binary = False
+        self.window_bits = 0
+
+    async def prepare(self, request):
+        writer = await super().prepare(request)
+        self.binary = bool(self.binary_protocol) and self.ws_protocol == self.binary_protocol
+        if self.binary:
+            binary_protocol_totals['connections'] += 1
+            logging.debug(f"Binary subprotocol '{self.binary_protocol}' negotiated")
+        self.window_bits = int(self.compress or 0) if SELECTIVE_COMPRESSION else 0
+        if self.window_bits and not hasattr(getattr(self, '_writer', None), 'compress'):
+            # Not the writer the startup check saw; leave compression to aiohttp
+            logging.warning("WebSocket writer has no compress setting; falling back to aiohttp's own compression")
+            self.window_bits = 0
+        if self.window_bits:
+            # aiohttp would deflate every frame once the extension is negotiated; send_frame decides instead
+            self._writer.compress = 0
+            compression_totals['connections'] += 1
+            logging.debug(f"permessage-deflate negotiated ({self.window_bits} window bits)")
+        return writer
+
+    async def send_frame(self, message, opcode, compress=None):
+        if self.binary and opcode == WSMsgType.TEXT:
+            # The rest of the server sends JSON text; binary-protocol clients get it as MessagePack
+            message = (message if isinstance(message, ServerFrame) else ServerFrame(message)).packed()
+            opcode = WSMsgType.BINARY
+
+        if not self.window_bits or opcode not in (WSMsgType.TEXT, WSMsgType.BINARY):
+            await super().send_frame(message, opcode, compress)
+            return
+
+        if len(message) < self.min_compress_bytes:
+            compression_totals['uncompressedFrames'] += 1
+            await super().send_frame(message, opcode)
+            return
+
+        if isinstance(message, ServerFrame):
+            deflated = message.deflated(self.window_bits)
+        else:
+            deflated = server_deflate(message, self.window_bits)
+        compression_totals['compressedFrames'] += 1
+        compression_totals['rawBytes'] += len(message)
+        compression_totals['wireBytes'] += len(deflated)
+        # The writer sends control-range opcodes uncompressed, so the pre-deflated payload goes out untouched
+        await super().send_frame(deflated, opcode | WS_RSV1)
+
+    async def send_str(self, data, compress=None):
+        await self.send_frame(data.encode('utf-8'), WSMsgType.TEXT, compress)
+
+    async def send_bytes(self, data, compress=None):
+        await self.send_frame(data, WSMsgType.BINARY, compress)
+
+    async def send_json(self, data, compress=None, *, dumps=None):
+        if self.binary and dumps is None:
+            # Binary clients get the same message a text client would decode, int keys included
+            await self.send_frame(msgpack_encode(_json_keys(data)), WSMsgType.BINARY, compress)
+            return
+        # Straight to bytes with the server's JSON backend, skipping the str round trip
+        payload = dumps(data).encode('utf-8') if dumps is not None else json_encode(data)
+        await self.send_frame(payload, WSMsgType.TEXT, compress)
+
+def server_compression_stats():
+    raw_bytes = compression_totals['rawBytes']
+    return {
+        'enabled': WS_COMPRESSION,
+        'selective': SELECTIVE_COMPRESSION,
+        'minBytes': WS_COMPRESS_MIN_BYTES,
+        'level': WS_COMPRESS_LEVEL,
+        **compression_totals,
+        'ratio': round(compression_totals['wireBytes'] / raw_bytes, 3) if raw_bytes else None
+    }
+
+def server_binary_protocol_stats():
+    return {
+        'protocol': WS_BINARY_PROTOCOL,
+        'backend': MSGPACK_BACKEND,
+        **binary_protocol_totals
+    }
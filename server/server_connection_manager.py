@@ -0,0 +1,111 @@
+import logging
+from server.server_outbound_queue import server_open_outbound_queue, server_close_outbound_queue
+
+# Single registry of room WebSocket connections, indexed both ways
+class ServerConnectionManager:
+    def __init__(self):
+        self._rooms = {}          # room -> {ws: None} (insertion-ordered set)
+        self._conn_room = {}      # ws -> room
+        self._conn_player = {}    # ws -> RPS player name
+        self._room_players = {}   # (room, player name) -> ws
+
+    def add(self, ws, room):
+        """Register a connection in a room (moving it if it was in another room)."""
+        if ws in self._conn_room:
+            self.remove(ws)
+        self._rooms.setdefault(room, {})[ws] = None
+        self._conn_room[ws] = room
+        # Broadcasts to this client go through its own bounded queue and writer task
+        server_open_outbound_queue(ws)
+
+    def remove(self, ws):
+        """Unregister a connection; safe to call more than once."""
+        if ws not in self._conn_room:
+            return None
+
+        self.unbind_player(ws)
+        room = self._conn_room.pop(ws)
+        members = self._rooms.get(room)
+        if members is not None:
+            members.pop(ws, None)
+            if not members:
+                del self._rooms[room]
+
+        server_close_outbound_queue(ws)
+        return room
+
+    def room_of(self, ws):
+        return self._conn_room.get(ws)
+
+    def has_connections(self, room):
+        return bool(self._rooms.get(room))
+
+    def count(self, room):
+        return len(self._rooms.get(room, ()))
+
+    def rooms(self):
+        """Rooms that currently have at least one connection."""
+        return list(self._rooms)
+
+    def connections(self, room):
+        """Snapshot of a room's open connections; closed ones are dropped from the registry."""
+        members = self._rooms.get(room)
+        if not members:
+            return []
+
+        active = []
+        for ws in list(members):
+            if ws.closed:
+                self.remove(ws)
+            else:
+                active.append(ws)
+        return active
+
+    def all_connections(self, exclude_rooms=()):
+        """Snapshot of every open connection, optionally skipping some rooms."""
+        return [
+            ws
+            for room in list(self._rooms) if room not in exclude_rooms
+            for ws in self.connections(room)
+        ]
+
+    def close_room(self, room):
+        """Unregister every connection in a room and return them so the caller can close them."""
+        members = list(self._rooms.get(room, ()))
+        for ws in members:
+            self.remove(ws)
+        return members
+
+    def bind_player(self, ws, player_name):
+        """Associate a connection with an RPS player name in its room."""
+        room = self._conn_room.get(ws)
+        if room is None:
+            logging.warning(f"Cannot bind player '{player_name}' to an unregistered connection")
+            return
+        self.unbind_player(ws)
+        previous = self._room_players.get((room, player_name))
+        if previous is not None:
+            self._conn_player.pop(previous, None)
+        self._conn_player[ws] = player_name
+        self._room_players[(room, player_name)] = ws
+
+    def unbind_player(self, ws):
+        player_name = self._conn_player.pop(ws, None)
+        if player_name is None:
+            return
+        key = (self._conn_room.get(ws), player_name)
+        if self._room_players.get(key) is ws:
+            del self._room_players[key]
+
+    def unbind_room_players(self, room):
+        """Forget all RPS player bindings in a room (e.g. after a game reset)."""
+        for ws in list(self._rooms.get(room, ())):
+            self.unbind_player(ws)
+
+    def player_of(self, ws):
+        return self._conn_player.get(ws)
+
+    def player_connection(self, room, player_name):
+        return self._room_players.get((room, player_name))
+
+connection_manager = ServerConnectionManager()
@@ -6,7 +6,8 @@ def server_create_default_room_state():
             'todo': [],
             'inProgress': [],
             'done': [],
-            'taskIdCounter': 0
+            'taskIdCounter': 0,
+            'version': 0
         },
         'timer': {
             'endTime': None,
@@ -28,7 +29,8 @@ def server_create_default_room_state():
                 {'from': 'testing', 'to': 'implementing'},
                 {'from': 'implementing', 'to': 'open'}
             ],
-            'stateIdCounter': 4
+            'stateIdCounter': 4,
+            'workItemIdCounter': 0
         },
         'workItems': [],
         'rps_game': {
@@ -0,0 +1,45 @@
+import asyncio
+import logging
+import server.server_state as server_state
+from server.server_load_room_state import server_load_room_state
+from server.server_create_default_room_state import server_create_default_room_state
+from server.server_timer_scheduler import timer_scheduler
+from server.server_room_directory import room_directory
+from server.server_room_evictor import room_evictor
+from server.server_room_bus import room_bus
+
+async def server_get_room_state(room):
+    """
+    Return the in-memory state for a room, loading it from disk only on a cache miss.
+
+    rooms_state is the authoritative copy of every loaded room; saved state is
+    only read when the room isn't in memory yet (never joined, or evicted while idle).
+    """
+    room_state = server_state.rooms_state.get(room)
+    if room_state is not None:
+        return room_state
+
+    try:
+        loaded_state = await asyncio.to_thread(server_load_room_state, room)
+    except Exception as e:
+        logging.error(f"Error loading state for room '{room}' from file: {e}")
+        loaded_state = None
+
+    # Another connection may have populated the room while we were reading the file
+    room_state = server_state.rooms_state.get(room)
+    if room_state is not None:
+        return room_state
+
+    if loaded_state is None:
+        logging.info(f"No saved state for room '{room}', using default state")
+        loaded_state = server_create_default_room_state()
+
+    server_state.rooms_state[room] = loaded_state
+    if room_directory.add(room):
+        # Other server processes list the room too
+        room_bus.publish({'kind': 'room_added', 'room': room})
+    room_evictor.check_budget()
+
+    # A room loaded from disk may have a timer that is still running
+    timer_scheduler.sync_room(room, loaded_state.get('timer'))
+    return loaded_state
@@ -0,0 +1,49 @@
+import logging
+from server.server_apply_board_op import server_apply_board_op
+from server.server_journal_room_change import server_journal_board_op
+from server.server_utils import broadcast_to_room, encode_message, send_encoded
+
+async def server_handle_board_op(ws, data, room, room_state):
+    """Apply one versioned board operation and broadcast it to the room as a patch."""
+    try:
+        op = data.get('op')
+        op_id = data.get('opId')
+
+        board = room_state.setdefault('board', {})
+        applied_op, error = server_apply_board_op(board, op)
+
+        if error:
+            logging.warning(f"Rejected board op in room '{room}': {error}")
+            # Send the authoritative board back so the client can resync
+            await send_encoded(ws, encode_message({
+                'type': 'board_op_rejected',
+                'room': room,
+                'opId': op_id,
+                'message': error,
+                'version': board.get('version', 0),
+                'board': board
+            }))
+            return
+
+        version = board.get('version', 0) + 1
+        board['version'] = version
+
+        # Append the op to the room's journal rather than rewriting the whole room
+        server_journal_board_op(room, applied_op)
+
+        patch = {
+            'type': 'board_patch',
+            'room': room,
+            'version': version,
+            'baseVersion': data.get('baseVersion'),
+            'opId': op_id,
+            'op': applied_op
+        }
+
+        # Everyone in the room gets the patch (on every instance); the originator uses it as its acknowledgement
+        await broadcast_to_room(room, patch, publish=True)
+
+        logging.debug(f"Applied board op {applied_op.get('action')} in room '{room}' (version {version})")
+
+    except Exception as e:
+        logging.exception(f"Error handling board op in room '{room}': {e}")
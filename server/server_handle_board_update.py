@@ -1,7 +1,8 @@
 import json
 import logging
 from server.server_state import rooms_state
-from server.server_save_room_states import server_save_room_states
+from server.server_journal_room_change import server_journal_room_change
+from server.server_utils import broadcast_to_room, encode_message, send_encoded
 
 async def server_handle_board_update(ws, data, room, room_state):
     """Handles board state updates from clients."""
@@ -25,38 +26,40 @@ async def server_handle_board_update(ws, data, room, room_state):
         if 'board' not in current_room_state:
             current_room_state['board'] = {}
         
-        # Update with new board data
+        # Update with new board data; a full replace still advances the board version
+        version = current_room_state['board'].get('version', 0) + 1
         current_room_state['board'].update(board_data)
+        current_room_state['board']['version'] = version
         
-        # Force immediate save to file system to ensure isolation
-        await server_save_room_states()
-        logging.debug(f"Successfully saved state for room '{room}' to file")
+        # Journal the new board for the write-behind saver
+        server_journal_room_change(room, 'board', current_room_state['board'])
+        logging.debug(f"Queued state save for room '{room}'")
         
         # Send confirmation back to the originating client
-        await ws.send_json({
+        await send_encoded(ws, encode_message({
             'type': 'update_confirmation',
             'success': True,
-            'message': 'Board state updated and saved to file',
-            'room': room
-        })
+            'message': 'Board state updated',
+            'room': room,
+            'version': version
+        }))
         
-        # Notify other clients in THIS ROOM ONLY to reload their state from server
+        # Push the new board to other clients in THIS ROOM ONLY as a replace patch
+        # (they may be on other server instances, so this doesn't check for local clients first)
         try:
-            from server.server_state import clients
-            if room in clients:
-                for client in clients[room]:
-                    if client != ws:  # Don't send to the originator
-                        await client.send_json({
-                            'type': 'reload_state_request',
-                            'room': room  # Include the room ID so client knows which state to reload
-                        })
-                
-                logging.debug(f"Notified all clients in room '{room}' to reload their state")
-            else:
-                logging.debug(f"No other clients in room '{room}' to notify")
+            patch = {
+                'type': 'board_patch',
+                'room': room,
+                'version': version,
+                'op': {'action': 'replace', 'board': current_room_state['board']}
+            }
+            # Don't send to the originator
+            await broadcast_to_room(room, patch, exclude=ws, publish=True)
+            
+            logging.debug(f"Sent board replace patch to clients in room '{room}'")
                 
         except Exception as e:
-            logging.error(f"Error notifying clients to reload state: {e}")
+            logging.error(f"Error sending board patch to clients: {e}")
             
         logging.debug(f"Board update fully processed for room '{room}'")
             
@@ -1,5 +1,6 @@
 import logging
 from server.server_handle_room_deletion import server_handle_room_deletion
+from server.server_utils import encode_message, send_encoded
 
 async def server_handle_delete_room_request(ws, data, *args):
     logging.debug(f"[DEBUG] server_handle_delete_room_request called with ws={ws}, data={data}, extra args={args}")
@@ -9,16 +10,16 @@ async def server_handle_delete_room_request(ws, data, *args):
 
     try:
         if not room:
-            await ws.send_json({'type': 'error', 'message': 'No room specified for deletion'})
+            await send_encoded(ws, encode_message({'type': 'error', 'message': 'No room specified for deletion'}))
             return
             
         success, error = await server_handle_room_deletion(room)
         logging.debug(f"[DEBUG] server_handle_room_deletion result: success={success}, error={error}")
         
         if success:
-            await ws.send_json({'type': 'room_deleted', 'room': room})
+            await send_encoded(ws, encode_message({'type': 'room_deleted', 'room': room}))
         else:
-            await ws.send_json({'type': 'error', 'message': error or 'Unknown error deleting room'})
+            await send_encoded(ws, encode_message({'type': 'error', 'message': error or 'Unknown error deleting room'}))
     except Exception as e:
         logging.exception(f"[DEBUG] Exception in server_handle_delete_room_request: {e}")
-        await ws.send_json({'type': 'error', 'message': str(e)})
+        await send_encoded(ws, encode_message({'type': 'error', 'message': str(e)}))
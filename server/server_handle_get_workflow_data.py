@@ -1,6 +1,6 @@
-import json
 import logging
 import server.server_state as server_state
+from server.server_utils import encode_message, send_encoded
 
 async def server_handle_get_workflow_data(ws, msg, room, room_state):
     """Handle request for workflow data."""
@@ -19,7 +19,7 @@ async def server_handle_get_workflow_data(ws, msg, room, room_state):
             'data': workflow_data
         }
         
-        await ws.send_str(json.dumps(response))
+        await send_encoded(ws, encode_message(response))
         logging.info(f"Sent workflow data for room {room}")
         
     except Exception as e:
@@ -28,4 +28,4 @@ async def server_handle_get_workflow_data(ws, msg, room, room_state):
             'type': 'error',
             'message': 'Failed to retrieve workflow data'
         }
-        await ws.send_str(json.dumps(error_response))
+        await send_encoded(ws, encode_message(error_response))
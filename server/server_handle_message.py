@@ -1,11 +1,14 @@
 import json
 import logging
 from server.server_handle_board_update import server_handle_board_update
+from server.server_handle_board_op import server_handle_board_op
 from server.server_handle_timer_update import server_handle_timer_update
 from server.server_rps_websocket_handler import server_handle_rps_message
 from server.server_handle_delete_room_request import server_handle_delete_room_request
 from server.server_handle_workflow_update import server_handle_workflow_update
+from server.server_handle_workflow_op import server_handle_workflow_op
 from server.server_handle_get_workflow_data import server_handle_get_workflow_data
+from server.server_handle_query_work_items import server_handle_query_work_items
 from server.server_handle_get_rooms import server_handle_get_rooms
 from server.server_handle_rps_claim import server_handle_rps_claim
 
@@ -25,6 +28,10 @@ async def server_handle_message(ws, msg, room, room_state):
     elif message_type == 'update':
         await server_handle_board_update(ws, msg, room, room_state)
     
+    # Versioned single-card board operations
+    elif message_type == 'board_op':
+        await server_handle_board_op(ws, msg, room, room_state)
+    
     # Timer updates - NOTE: Fixed parameter count to match function signature
     elif message_type == 'timer':
         await server_handle_timer_update(ws, msg, room)
@@ -37,10 +44,18 @@ async def server_handle_message(ws, msg, room, room_state):
     elif message_type == 'workflow_update':
         await server_handle_workflow_update(ws, msg, room, room_state)
     
+    # Single work item / workflow structure operations
+    elif message_type == 'workflow_op':
+        await server_handle_workflow_op(ws, msg, room, room_state)
+    
     # Get workflow data
     elif message_type == 'get_workflow_data':
         await server_handle_get_workflow_data(ws, msg, room, room_state)
     
+    # Filtered, paged work item queries
+    elif message_type == 'query_work_items':
+        await server_handle_query_work_items(ws, msg, room, room_state)
+    
     # Get rooms list
     elif message_type == 'get_rooms':
         await server_handle_get_rooms(ws)
@@ -0,0 +1,22 @@
+import logging
+from server.server_query_work_items import server_query_work_items
+from server.server_utils import encode_message, send_encoded
+
+async def server_handle_query_work_items(ws, msg, room, room_state):
+    """Handle a query_work_items request: send back one page of the room's matching work items."""
+    response = {
+        'type': 'work_items',
+        'room': room,
+        'requestId': msg.get('requestId')
+    }
+
+    try:
+        response.update(server_query_work_items(room, room_state, msg.get('query')))
+        response['status'] = 'success'
+    except (ValueError, TypeError) as e:
+        response.update(status='error', message=f"Invalid work item query: {e}")
+    except Exception as e:
+        logging.error(f"Error querying work items in room '{room}': {e}", exc_info=True)
+        response.update(status='error', message='Failed to query work items')
+
+    await send_encoded(ws, encode_message(response))
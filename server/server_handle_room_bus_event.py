@@ -0,0 +1,138 @@
+import asyncio
+import logging
+import server.server_state as server_state
+from server.server_room_directory import room_directory
+from server.server_room_locks import room_locks
+from server.server_room_bus import room_bus
+from server.server_persistence_engine import persistence_engine
+from server.server_timer_scheduler import timer_scheduler
+from server.server_work_item_index import work_item_indexes
+from server.server_workflow_graph import workflow_graphs
+from server.server_room_journal import server_apply_journal_record, JOURNAL_SET_KEYS
+from server.server_broadcast_room_list import server_broadcast_room_list
+from server.server_handle_room_deletion import server_handle_room_deletion
+from server.server_websocket_handler import create_serializable_state
+from server.server_utils import broadcast_to_room
+
+# Rooms whose copy is being replaced by another instance's; their room_change events are skipped meanwhile
+_resyncing_rooms = set()
+# Running resync tasks; the event loop only keeps weak references to tasks
+_resync_tasks = set()
+
+def _room_changed(room, room_state, kinds):
+    # Derived structures follow the room's workflow and items; the timer needs re-arming
+    if 'workflow' in kinds:
+        work_item_indexes.invalidate(room)
+        workflow_graphs.invalidate(room)
+    elif 'workflow_op' in kinds:
+        # The work item index followed the op as it was applied
+        workflow_graphs.invalidate(room)
+    if 'timer' in kinds:
+        timer_scheduler.sync_room(room, room_state.get('timer'))
+
+async def _resync_room(room, member):
+    """Replace this instance's copy of a room with member's and send it to the room's clients."""
+    try:
+        snapshot = await room_bus.request(member, {'kind': 'room_snapshot', 'room': room})
+        async with room_locks.hold(room):
+            room_state = server_state.rooms_state.get(room)
+            if room_state is None:
+                return
+            if snapshot is None:
+                # The other instance no longer has the room loaded; reload it from storage
+                del server_state.rooms_state[room]
+                work_item_indexes.invalidate(room)
+                workflow_graphs.invalidate(room)
+                timer_scheduler.cancel(room)
+                logging.warning(f"Dropped out-of-sync copy of room '{room}'; it reloads from storage")
+                return
+
+            room_state.update(snapshot)
+            _room_changed(room, room_state, ('workflow', 'timer'))
+            # Our own conflicting changes may be in storage; a fresh snapshot supersedes them
+            persistence_engine.notify(room)
+            await broadcast_to_room(room, create_serializable_state(room_state, room))
+        logging.warning(f"Resynced room '{room}' from '{member}' at journal record {snapshot.get('journalSeq')}")
+    except Exception as e:
+        logging.error(f"Error resyncing room '{room}' from '{member}': {e}")
+    finally:
+        _resyncing_rooms.discard(room)
+
+async def _apply_room_change(room, record, member):
+    room_state = server_state.rooms_state.get(room)
+    # Not loaded here: it loads from storage, where the sender journaled the change, on first join
+    if room_state is None or room in _resyncing_rooms:
+        return
+
+    seq = record.get('seq')
+    local_seq = room_state.get('journalSeq', 0)
+    if seq is None or seq == local_seq + 1:
+        # Not journaled here: the sender already appended it to the storage both instances share.
+        # Our later snapshots include it; compaction only drops records a snapshot covers.
+        index = work_item_indexes.get(room, room_state) if record.get('kind') == 'workflow_op' else None
+        server_apply_journal_record(room_state, record, index)
+        if seq is not None:
+            room_state['journalSeq'] = seq
+        kind = record.get('key') if record.get('kind') == 'set' else record.get('kind')
+        _room_changed(room, room_state, ('workflow',) if kind == 'workItems' else (kind,))
+        return
+
+    # Both instances changed the room at once (seq <= local_seq) or we missed records (seq > local_seq + 1).
+    # On a conflict the member with the lower name wins, so exactly one side resyncs.
+    if seq <= local_seq and str(room_bus.member) < str(member):
+        logging.warning(f"Conflicting change to room '{room}' from '{member}'; keeping ours")
+        return
+    _resyncing_rooms.add(room)
+    task = asyncio.create_task(_resync_room(room, member))
+    _resync_tasks.add(task)
+    task.add_done_callback(_resync_tasks.discard)
+
+async def server_handle_room_bus_event(event):
+    """
+    Handle an event another server process sent over the room bus.
+
+    Events:
+        room_added    - {'room'}; the sender created or loaded a room
+        room_removed  - {'room'}; the sender deleted a room
+        delete_room   - {'room'}; request to delete a room this worker owns;
+                        returns {'success', 'error'}
+        room_change   - {'room', 'record'}; a journal record the sender applied to
+                        a room both instances serve
+        room_message  - {'room', 'message', 'coalesceKey'}; a broadcast for this
+                        instance's clients in the room
+        room_snapshot - {'room'}; request for this instance's copy of a room;
+                        returns its board, timer, workflow and items, or None
+    """
+    kind = event.get('kind')
+    room = event.get('room')
+
+    if kind == 'room_added':
+        if room_directory.add(room):
+            await server_broadcast_room_list()
+
+    elif kind == 'room_removed':
+        # Clients here hear about the deletion just like the sender's clients do
+        await server_handle_room_deletion(room, from_bus=True)
+
+    elif kind == 'delete_room':
+        success, error = await server_handle_room_deletion(room)
+        return {'success': success, 'error': error}
+
+    elif kind == 'room_change':
+        async with room_locks.hold(room):
+            await _apply_room_change(room, event.get('record') or {}, event.get('from'))
+
+    elif kind == 'room_message':
+        # Encoded once here for all of this instance's clients in the room
+        await broadcast_to_room(room, event.get('message'), coalesce_key=event.get('coalesceKey'))
+
+    elif kind == 'room_snapshot':
+        room_state = server_state.rooms_state.get(room)
+        if room_state is None:
+            return None
+        snapshot = {key: room_state[key] for key in JOURNAL_SET_KEYS if key in room_state}
+        return {**snapshot, 'journalSeq': room_state.get('journalSeq', 0)}
+
+    else:
+        logging.warning(f"Unknown room bus event: {kind}")
+    return None
@@ -1,46 +1,69 @@
 import logging
-import os
-from server.server_state import rooms_state, clients, deleted_rooms
-from server.server_save_room_states import server_save_room_states
+from server.server_state import rooms_state, deleted_rooms
+from server.server_connection_manager import connection_manager
+from server.server_room_locks import room_locks
+from server.server_persistence_engine import persistence_engine
+from server.server_timer_scheduler import timer_scheduler
+from server.server_room_directory import room_directory
+from server.server_work_item_index import work_item_indexes
+from server.server_workflow_graph import workflow_graphs
 from server.server_broadcast_room_list import server_broadcast_room_list
+from server.server_room_shards import room_shards
+from server.server_room_bus import room_bus
+from server.server_utils import broadcast_message
 
-async def server_handle_room_deletion(room):
+async def server_handle_room_deletion(room, from_bus=False):
+    """
+    Delete a room, its saved state and its connections.
+
+    from_bus is set when another server process already deleted the room and
+    this process is only dropping its own copy and telling its clients.
+    """
     if room == 'default':
         return False, "Cannot delete the default room"
     
+    # In multi-process mode only the room's own worker can delete it
+    if not from_bus and not room_shards.owns(room):
+        try:
+            result = await room_bus.request(room_shards.owner(room), {'kind': 'delete_room', 'room': room})
+            return result['success'], result['error']
+        except Exception as e:
+            logging.error(f"Error asking worker {room_shards.owner(room)} to delete room '{room}': {e}")
+            return False, f"Could not reach the worker for room '{room}'"
+    
     try:
-        deleted_rooms.add(room)
-        
-        if room in rooms_state:
-            del rooms_state[room]
-            # Delete the saved JSON file
+        # Wait for any in-flight message in the room to finish before tearing it down
+        async with room_locks.hold(room):
+            deleted_rooms.add(room)
+            timer_scheduler.cancel(room)
+            
+            rooms_state.pop(room, None)
+            work_item_indexes.invalidate(room)
+            workflow_graphs.invalidate(room)
+            room_directory.discard(room)
+            # Drop any pending save and delete the saved state (the room may be saved but not loaded)
             try:
-                file_path = f'states/{room}.json'
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-                    logging.info(f"[DEBUG] Deleted state file for room '{room}'")
+                await persistence_engine.forget_room(room)
             except Exception as e:
                 logging.error(f"[DEBUG] Error deleting state file for room '{room}': {e}")
-            await server_save_room_states()
+            
+            room_clients = connection_manager.close_room(room)
         
-        if room in clients:
-            for client in list(clients[room]):
-                if not client.closed:
-                    await client.close()
-            del clients[room]
+        for client in room_clients:
+            if not client.closed:
+                await client.close()
         
         deletion_message = {
             'type': 'room_deleted',
             'room': room
         }
         
-        for client_room in list(clients.keys()):
-            for client in list(clients[client_room]):
-                if not client.closed:
-                    try:
-                        await client.send_json(deletion_message)
-                    except:
-                        pass
+        await broadcast_message(
+            connection_manager.all_connections(),
+            deletion_message
+        )
+        if not from_bus:
+            room_bus.publish({'kind': 'room_removed', 'room': room})
         
         await server_broadcast_room_list()
         
@@ -5,8 +5,8 @@ import os
 
 # Add the root directory to the path so we can import from server.py
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-import server.server_state as server_state
-from server.server_utils import broadcast_to_room
+from server.server_connection_manager import connection_manager
+from server.server_utils import broadcast_to_room, encode_message, send_encoded
 from server.server_determine_rps_winner import server_determine_rps_winner
 
 async def server_handle_rps_choice(ws, data, room, room_state):
@@ -26,25 +26,24 @@ async def server_handle_rps_choice(ws, data, room, room_state):
     # Make sure choice is valid
     if choice not in ['rock', 'paper', 'scissors']:
         logging.warning(f"Invalid RPS choice: {choice}")
-        await ws.send_json({
+        await send_encoded(ws, encode_message({
             'type': 'rps_update',
             'data': {
                 'event': 'error',
                 'message': 'Invalid choice'
             }
-        })
+        }))
         return
     
     # Initialize RPS state if not exists
     if 'rps' not in room_state:
-        room_state['rps'] = {'players': [], 'choices': {}, 'result': None, 'positions': {1: None, 2: None}, 'player_connections': {}}
+        room_state['rps'] = {'players': [], 'choices': {}, 'result': None, 'positions': {1: None, 2: None}}
     
     # Find which player position this websocket connection belongs to
     player_position = None
     for pos, player_name in room_state['rps']['positions'].items():
         if player_name is not None:
-            conn = room_state['rps']['player_connections'].get(player_name)
-            if conn is ws:
+            if connection_manager.player_connection(room, player_name) is ws:
                 player_position = pos
                 player = player_name  # Use the stored player name
                 break
@@ -52,13 +51,13 @@ async def server_handle_rps_choice(ws, data, room, room_state):
     # If not a recognized player in a position, reject the choice
     if player_position is None:
         logging.warning(f"Choice from unrecognized player connection: {player}")
-        await ws.send_json({
+        await send_encoded(ws, encode_message({
             'type': 'rps_update',
             'data': {
                 'event': 'error',
                 'message': 'You are not an active player in this game'
             }
-        })
+        }))
         return
     
     # Store the choice by position, not just by player name
@@ -74,20 +73,29 @@ async def server_handle_rps_choice(ws, data, room, room_state):
     
     logging.info(f"Player {player} (position {player_position}) chose {choice}")
     
+    # Spectators all get the same message, so encode it once
+    spectator_payload = encode_message({
+        'type': 'rps_update',
+        'data': {
+            'event': 'spectate_update',
+            'message': f'Player {player_position} has made a choice'
+        }
+    })
+    
     # Notify all clients about the choice (without revealing it)
-    for client in server_state.connections[room]:
+    for client in connection_manager.connections(room):
         try:
             # Find if this client is a player
             client_position = None
             for pos, pname in room_state['rps']['positions'].items():
-                if pname is not None and room_state['rps']['player_connections'].get(pname) is client:
+                if pname is not None and connection_manager.player_connection(room, pname) is client:
                     client_position = pos
                     break
             
             if client_position:
                 # This is a player, so tell them about the opponent's choice
                 opponent_chosen = client_position != player_position
-                await client.send_json({
+                await send_encoded(client, encode_message({
                     'type': 'rps_update',
                     'data': {
                         'event': 'opponent_chosen' if opponent_chosen else 'choice_confirmed',
@@ -95,16 +103,10 @@ async def server_handle_rps_choice(ws, data, room, room_state):
                         'choiceMade': opponent_chosen,
                         'message': 'Opponent has chosen' if opponent_chosen else 'Your choice was received'
                     }
-                })
+                }))
             else:
                 # This is a spectator
-                await client.send_json({
-                    'type': 'rps_update',
-                    'data': {
-                        'event': 'spectate_update',
-                        'message': f'Player {player_position} has made a choice'
-                    }
-                })
+                await send_encoded(client, spectator_payload)
         except Exception as e:
             logging.error(f"Error notifying client about choice: {e}")
     
@@ -1,7 +1,7 @@
 import json
 import logging
-import server.server_state as server_state
-from server.server_utils import broadcast_to_room
+from server.server_connection_manager import connection_manager
+from server.server_utils import broadcast_to_room, encode_message, send_encoded
 
 async def server_handle_rps_claim(ws, data, room, room_state):
     """Handle a player claiming a specific position (Player 1 or Player 2) in the RPS game."""
@@ -14,13 +14,13 @@ async def server_handle_rps_claim(ws, data, room, room_state):
     # Ensure valid position
     if position not in [1, 2]:
         logging.warning(f"Invalid position claim: {position}")
-        await ws.send_json({
+        await send_encoded(ws, encode_message({
             'type': 'rps_update',
             'data': {
                 'event': 'error',
                 'message': 'Invalid position. Choose 1 or 2.'
             }
-        })
+        }))
         return
     
     # If player name is empty, generate one
@@ -33,7 +33,6 @@ async def server_handle_rps_claim(ws, data, room, room_state):
             'players': [], 
             'choices': {}, 
             'result': None, 
-            'player_connections': {},
             'positions': {1: None, 2: None},  # Store which player is in which position
             'connection_to_position': {}  # NEW: Map websocket connection ID to position
         }
@@ -60,13 +59,13 @@ async def server_handle_rps_claim(ws, data, room, room_state):
         # Check if it's the same client trying to reclaim
         existing_id = room_state['rps']['connection_to_position'].get(position)
         if existing_id != client_id:
-            await ws.send_json({
+            await send_encoded(ws, encode_message({
                 'type': 'rps_update',
                 'data': {
                     'event': 'error',
                     'message': f'Position {position} is already taken.'
                 }
-            })
+            }))
             return
     
     # IMPORTANT: Check if this client was already assigned to another position
@@ -83,7 +82,7 @@ async def server_handle_rps_claim(ws, data, room, room_state):
     room_state['rps']['positions'][position] = player_name
     
     # Store connection and map connection ID to position
-    room_state['rps']['player_connections'][player_name] = ws
+    connection_manager.bind_player(ws, player_name)
     room_state['rps']['connection_to_position'][position] = client_id
     
     # Update player list if needed
@@ -91,17 +90,8 @@ async def server_handle_rps_claim(ws, data, room, room_state):
         if len(room_state['rps']['players']) < 2:
             room_state['rps']['players'].append(player_name)
     
-    # Clean up stale connections before counting clients
-    active_connections = []
-    for client in server_state.connections[room]:
-        try:
-            if not client.closed:
-                active_connections.append(client)
-        except:
-            pass
-    
-    # Update the connections list with only active connections
-    server_state.connections[room] = active_connections
+    # Open connections in this room (closed ones are pruned by the connection manager)
+    active_connections = connection_manager.connections(room)
     
     # Determine if game can start
     both_positions_filled = (1 in room_state['rps']['positions'] and 
@@ -116,7 +106,7 @@ async def server_handle_rps_claim(ws, data, room, room_state):
     serializable_positions = {str(k): v for k, v in room_state['rps']['positions'].items()}
     
     # First, notify the player who just claimed a position
-    await ws.send_json({
+    await send_encoded(ws, encode_message({
         'type': 'rps_update',
         'data': {
             'event': 'position_update',
@@ -125,13 +115,24 @@ async def server_handle_rps_claim(ws, data, room, room_state):
             'connectedClients': client_names,
             'gameActive': both_positions_filled
         }
-    })
+    }))
     
     # If both positions are filled, start the game for both players
     if both_positions_filled:
         player1_name = room_state['rps']['positions'][1]
         player2_name = room_state['rps']['positions'][2]
         
+        # Spectators all get the same message, so encode it once
+        spectator_payload = encode_message({
+            'type': 'rps_update',
+            'data': {
+                'event': 'spectate',
+                'players': [player1_name, player2_name],
+                'choices': {},
+                'result': None
+            }
+        })
+        
         # For each active connection
         for client in active_connections:
             client_id = id(client) % 10000
@@ -146,7 +147,7 @@ async def server_handle_rps_claim(ws, data, room, room_state):
             # Send appropriate message
             if client_position:
                 # This client is a player
-                await client.send_json({
+                await send_encoded(client, encode_message({
                     'type': 'rps_update',
                     'data': {
                         'event': 'game_start',
@@ -155,19 +156,11 @@ async def server_handle_rps_claim(ws, data, room, room_state):
                         'choices': {},
                         'result': None
                     }
-                })
+                }))
                 logging.info(f"Sent game_start to player {client_id} at position {client_position}")
             else:
                 # This client is a spectator
-                await client.send_json({
-                    'type': 'rps_update',
-                    'data': {
-                        'event': 'spectate',
-                        'players': [player1_name, player2_name],
-                        'choices': {},
-                        'result': None
-                    }
-                })
+                await send_encoded(client, spectator_payload)
     else:
         # Otherwise, update all other clients with new position data
         for client in active_connections:
@@ -182,7 +175,7 @@ async def server_handle_rps_claim(ws, data, room, room_state):
                     elif room_state['rps']['connection_to_position'].get(2) == client_id:
                         client_position = 2
                     
-                    await client.send_json({
+                    await send_encoded(client, encode_message({
                         'type': 'rps_update',
                         'data': {
                             'event': 'position_update',
@@ -190,7 +183,7 @@ async def server_handle_rps_claim(ws, data, room, room_state):
                             'playerNumber': client_position,
                             'connectedClients': client_names
                         }
-                    })
+                    }))
                 except Exception as e:
                     logging.error(f"Error sending RPS position update to client: {e}")
     
@@ -1,7 +1,7 @@
 import json
 import logging
-import server.server_state as server_state
-from server.server_utils import broadcast_to_room
+from server.server_connection_manager import connection_manager
+from server.server_utils import broadcast_to_room, encode_message, send_encoded
 
 async def server_handle_rps_join(ws, data, room, room_state):
     """Handle a player joining the RPS game."""
@@ -24,29 +24,15 @@ async def server_handle_rps_join(ws, data, room, room_state):
             'players': [], 
             'choices': {}, 
             'result': None, 
-            'player_connections': {},
             'positions': {1: None, 2: None}  # Track which positions are taken
         }
     
-    # Initialize player_connections if not exists
-    if 'player_connections' not in room_state['rps']:
-        room_state['rps']['player_connections'] = {}
-    
     # Initialize positions if not exists
     if 'positions' not in room_state['rps']:
         room_state['rps']['positions'] = {1: None, 2: None}
     
-    # Clean up stale connections
-    active_connections = []
-    for client in server_state.connections[room]:
-        try:
-            if not client.closed:
-                active_connections.append(client)
-        except:
-            pass
-    
-    # Update connections list with only active connections
-    server_state.connections[room] = active_connections
+    # Open connections in this room (closed ones are pruned by the connection manager)
+    active_connections = connection_manager.connections(room)
     
     # Get list of connected clients
     client_names = [f"Player-{id(client) % 10000}" for client in active_connections]
@@ -55,8 +41,7 @@ async def server_handle_rps_join(ws, data, room, room_state):
     current_player_number = None
     for pos, pname in room_state['rps']['positions'].items():
         if pname is not None:
-            conn = room_state['rps']['player_connections'].get(pname)
-            if conn is ws:
+            if connection_manager.player_connection(room, pname) is ws:
                 current_player_number = pos
                 break
     
@@ -75,7 +60,7 @@ async def server_handle_rps_join(ws, data, room, room_state):
         player1_name = room_state['rps']['positions'][1]
         player2_name = room_state['rps']['positions'][2]
         
-        await ws.send_json({
+        await send_encoded(ws, encode_message({
             'type': 'rps_update',
             'data': {
                 'event': 'game_start',
@@ -84,13 +69,13 @@ async def server_handle_rps_join(ws, data, room, room_state):
                 'choices': {},
                 'result': None
             }
-        })
+        }))
     elif both_positions_filled:
         # Both positions are filled, but this connection isn't one of them - spectate
         player1_name = room_state['rps']['positions'][1]
         player2_name = room_state['rps']['positions'][2]
         
-        await ws.send_json({
+        await send_encoded(ws, encode_message({
             'type': 'rps_update',
             'data': {
                 'event': 'spectate',
@@ -98,17 +83,17 @@ async def server_handle_rps_join(ws, data, room, room_state):
                 'choices': {},
                 'result': None
             }
-        })
+        }))
     else:
         # Send the position selection screen to the joining client
-        await ws.send_json({
+        await send_encoded(ws, encode_message({
             'type': 'rps_update',
             'data': {
                 'event': 'position_selection',
                 'positions': serializable_positions,
                 'connectedClients': client_names
             }
-        })
+        }))
     
     # Also update all other clients with the new connected clients list
     for client in active_connections:
@@ -117,11 +102,11 @@ async def server_handle_rps_join(ws, data, room, room_state):
                 # Determine player number for this client
                 player_number = None
                 for pos, name in room_state['rps']['positions'].items():
-                    if name is not None and room_state['rps']['player_connections'].get(name) == client:
+                    if name is not None and connection_manager.player_connection(room, name) is client:
                         player_number = pos
                         break
                         
-                await client.send_json({
+                await send_encoded(client, encode_message({
                     'type': 'rps_update',
                     'data': {
                         'event': 'position_update',
@@ -129,7 +114,7 @@ async def server_handle_rps_join(ws, data, room, room_state):
                         'playerNumber': player_number,
                         'connectedClients': client_names
                     }
-                })
+                }))
             except Exception as e:
                 logging.error(f"Error sending RPS update to client: {e}")
     
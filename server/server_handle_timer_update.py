@@ -1,7 +1,9 @@
 import logging
 from server.server_timer_manager import ServerTimerManager
-from server.server_state import rooms_state, clients
-from server.server_save_room_states import server_save_room_states
+from server.server_state import rooms_state
+from server.server_journal_room_change import server_journal_room_change
+from server.server_utils import broadcast_to_room
+from server.server_timer_scheduler import timer_scheduler
 
 async def server_handle_timer_update(ws, data, room):
     try:
@@ -42,38 +44,25 @@ async def server_handle_timer_update(ws, data, room):
         # Update room state with new timer state
         room_state['timer'] = new_timer_state
         
+        # Arm (or cancel) the expiry callback for this room's timer
+        timer_scheduler.sync_room(room, new_timer_state)
+        
         # Log whether the timer is now running
         is_running = new_timer_state.get('isRunning', False)
         end_time = new_timer_state.get('endTime')
         logging.info(f"Updated timer state for room '{room}': running={is_running}, endTime={end_time}")
         
-        # Always save to disk for consistency
-        await server_save_room_states()
-        logging.info(f"Saved timer state for room '{room}' to file")
+        # Always persist for consistency (written in the background)
+        server_journal_room_change(room, 'timer', new_timer_state)
+        logging.info(f"Queued timer state save for room '{room}'")
         
-        # Notify all clients in this room to reload their state from the JSON file
-        if clients.get(room):
-            for client in clients[room]:
-                if not client.closed:
-                    try:
-                        # First, send the timer update directly for immediate response
-                        await client.send_json({
-                            'type': 'timer',
-                            'data': new_timer_state,
-                            'room': room
-                        })
-                        logging.debug(f"Sent direct timer update to client in room '{room}'")
-                        
-                        # Then tell clients to reload state to ensure consistency
-                        await client.send_json({
-                            'type': 'reload_state_request',
-                            'room': room
-                        })
-                        logging.debug(f"Sent reload request to client in room '{room}'")
-                    except Exception as e:
-                        logging.error(f"Error notifying client to reload timer state: {e}")
-        else:
-            logging.warning(f"No clients found in room '{room}' to notify of timer update")
+        # Send the new timer state to all clients in this room, on every instance; they count down from endTime locally
+        await broadcast_to_room(room, {
+            'type': 'timer',
+            'data': new_timer_state,
+            'room': room
+        }, coalesce_key='timer', publish=True)
+        logging.debug(f"Sent timer update to clients in room '{room}'")
             
     except Exception as e:
         logging.exception(f"Error handling timer update: {e}")
@@ -0,0 +1,55 @@
+import logging
+from server.server_apply_workflow_op import server_apply_workflow_op
+from server.server_journal_room_change import server_journal_workflow_op
+from server.server_work_item_index import work_item_indexes
+from server.server_workflow_graph import workflow_graphs
+from server.server_utils import broadcast_to_room, encode_message, send_encoded
+
+async def server_handle_workflow_op(ws, data, room, room_state):
+    """Apply one workflow operation and broadcast it to the room as a patch."""
+    try:
+        op = data.get('op')
+        op_id = data.get('opId')
+
+        workflow = room_state.setdefault('workflow', {})
+        work_items = room_state.setdefault('workItems', [])
+        graph = workflow_graphs.get(room, room_state)
+        index = work_item_indexes.get(room, room_state)
+        applied_op, error = server_apply_workflow_op(workflow, work_items, op, graph, index)
+
+        if error:
+            logging.warning(f"Rejected workflow op in room '{room}': {error}")
+            # Send the authoritative workflow back so the client can resync
+            await send_encoded(ws, encode_message({
+                'type': 'workflow_op_rejected',
+                'room': room,
+                'opId': op_id,
+                'message': error,
+                'version': workflow.get('version', 0),
+                'workflow': workflow,
+                'workItems': work_items
+            }))
+            return
+
+        version = workflow.get('version', 0) + 1
+        workflow['version'] = version
+
+        # Append the patch to the room's journal rather than rewriting the workflow and every item
+        server_journal_workflow_op(room, applied_op)
+
+        patch = {
+            'type': 'workflow_patch',
+            'room': room,
+            'version': version,
+            'baseVersion': data.get('baseVersion'),
+            'opId': op_id,
+            'op': applied_op
+        }
+
+        # Everyone in the room gets the patch (on every instance); the originator uses it as its acknowledgement
+        await broadcast_to_room(room, patch, publish=True)
+
+        logging.debug(f"Applied workflow op {applied_op.get('action')} in room '{room}' (version {version})")
+
+    except Exception as e:
+        logging.exception(f"Error handling workflow op in room '{room}': {e}")
@@ -1,6 +1,8 @@
 import logging
-from server.server_state import clients, rooms_state  # Added import for rooms_state
-from server.server_save_room_states import server_save_room_states
+from server.server_state import rooms_state  # Added import for rooms_state
+from server.server_journal_room_change import server_journal_room_change
+from server.server_utils import broadcast_to_room
+from server.server_work_item_index import server_stamp_changed_work_items
 
 async def server_handle_workflow_update(ws, data, room, room_state):
     """Handles workflow state updates from clients."""
@@ -8,37 +10,33 @@ async def server_handle_workflow_update(ws, data, room, room_state):
         if 'data' in data and isinstance(data['data'], dict):
             workflow_data = data['data']
             
-            # Update workflow state
+            # Update workflow state (and journal it to be saved to disk)
             if 'workflow' in workflow_data:
-                room_state['workflow'] = workflow_data['workflow']
+                # A full replace moves past every op the clients have seen
+                version = room_state.get('workflow', {}).get('version', 0) + 1
+                room_state['workflow'] = {**workflow_data['workflow'], 'version': version}
+                server_journal_room_change(room, 'workflow', room_state['workflow'])
                 logging.info(f"Updated workflow state in room '{room}'")
             
             # Update work items
             if 'workItems' in workflow_data:
+                if 'workflow' not in workflow_data:
+                    workflow = room_state.setdefault('workflow', {})
+                    workflow['version'] = workflow.get('version', 0) + 1
+                    server_journal_room_change(room, 'workflow', workflow)
+                # Track when each item last changed, for updatedSince queries
+                server_stamp_changed_work_items(room_state.get('workItems'), workflow_data['workItems'])
                 room_state['workItems'] = workflow_data['workItems']
+                server_journal_room_change(room, 'workItems', room_state['workItems'])
                 logging.info(f"Updated {len(workflow_data['workItems'])} work items in room '{room}'")
             
-            try:
-                # Save changes to disk
-                await server_save_room_states()
-            except Exception as e:
-                logging.error(f"Error saving room states: {e}")
-            
             # Safely broadcast the update to all other clients in the room
-            if room in clients:
-                for client in clients[room]:
-                    if client != ws and not client.closed:
-                        try:
-                            await client.send_json({
-                                'type': 'workflow_update',
-                                'data': {
-                                    'workflow': room_state['workflow'],
-                                    'workItems': room_state['workItems']
-                                }
-                            })
-                        except Exception as e:
-                            logging.error(f"Error broadcasting workflow update: {e}")
-            else:
-                logging.warning(f"Room '{room}' not found in clients dictionary, cannot broadcast updates")
+            await broadcast_to_room(room, {
+                'type': 'workflow_update',
+                'data': {
+                    'workflow': room_state['workflow'],
+                    'workItems': room_state['workItems']
+                }
+            }, exclude=ws, coalesce_key='workflow_update', publish=True)
     except Exception as e:
         logging.exception(f"Error handling workflow update in room '{room}': {e}")
@@ -0,0 +1,33 @@
+import logging
+from server.server_persistence_engine import persistence_engine
+from server.server_room_bus import room_bus
+
+def server_journal_board_op(room, applied_op):
+    """Journal a board operation so the room's snapshot doesn't have to be rewritten for it."""
+    if room is None:
+        return
+    record = persistence_engine.record(room, {'kind': 'board_op', 'op': applied_op})
+    room_bus.publish_room_change(room, record)
+    logging.debug(f"Journaled board op '{applied_op.get('action')}' for room '{room}'")
+
+def server_journal_workflow_op(room, applied_op):
+    """Journal a workflow operation (its patch) instead of the whole workflow and workItems."""
+    if room is None:
+        return
+    record = persistence_engine.record(room, {'kind': 'workflow_op', 'op': applied_op})
+    room_bus.publish_room_change(room, record)
+    logging.debug(f"Journaled workflow op '{applied_op.get('action')}' for room '{room}'")
+
+def server_journal_room_change(room, key, value, publish=True):
+    """
+    Journal a replacement of one top-level room field ('board', 'timer', 'workflow' or 'workItems').
+
+    publish=False keeps the change to this instance, for changes every instance
+    serving the room makes by itself (such as a timer expiring).
+    """
+    if room is None:
+        return
+    record = persistence_engine.record(room, {'kind': 'set', 'key': key, 'value': value})
+    if publish:
+        room_bus.publish_room_change(room, record)
+    logging.debug(f"Journaled '{key}' change for room '{room}'")
@@ -0,0 +1,55 @@
+import json
+import logging
+from aiohttp import web
+
+# JSON encoding and decoding for the whole server. The fastest installed backend is picked at
+# import time: orjson, then ujson, then the standard library. Every backend writes compact
+# UTF-8 (no indentation, no spaces, non-ASCII left as-is) and reads str or bytes.
+try:
+    import orjson
+
+    JSON_BACKEND = 'orjson'
+    JSONDecodeError = orjson.JSONDecodeError
+
+    def json_encode(obj):
+        # Non-string keys are turned into strings, as the standard library does
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+
+    def json_encode_str(obj):
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+
+    json_decode = orjson.loads
+
+except ImportError:
+    try:
+        import ujson
+
+        JSON_BACKEND = 'ujson'
+        JSONDecodeError = ujson.JSONDecodeError
+
+        def json_encode(obj):
+            return ujson.dumps(obj, ensure_ascii=False, escape_forward_slashes=False).encode('utf-8')
+
+        def json_encode_str(obj):
+            return ujson.dumps(obj, ensure_ascii=False, escape_forward_slashes=False)
+
+        json_decode = ujson.loads
+
+    except ImportError:
+        JSON_BACKEND = 'json'
+        JSONDecodeError = json.JSONDecodeError
+        _encoder = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False)
+
+        def json_encode(obj):
+            return _encoder.encode(obj).encode('utf-8')
+
+        def json_encode_str(obj):
+            return _encoder.encode(obj)
+
+        json_decode = json.loads
+
+logging.debug(f"Using the {JSON_BACKEND} JSON backend")
+
+def server_json_response(data, status=200):
+    """web.json_response, encoded with the server's JSON backend."""
+    return web.Response(body=json_encode(data), status=status, content_type='application/json')
@@ -0,0 +1,61 @@
+import logging
+from server.server_create_default_room_state import server_create_default_room_state
+from server.server_room_journal import server_replay_room_journal
+from server.server_state import dirty_rooms
+from server.server_storage import storage
+
+# Load a single room's saved snapshot, merged over a fresh default state, then replay its journal
+def server_load_room_state(room_name):
+    """Load one room's state from its snapshot and journal; returns None if the room has neither."""
+    snapshot, journal_lines = storage.read_room(room_name)
+    has_snapshot = snapshot is not None
+    if not has_snapshot and not journal_lines:
+        return None
+
+    room_data = snapshot or {}
+
+    # Create a fresh state and update it with file data
+    state = server_create_default_room_state()
+
+    # Update default state with loaded data
+    if 'board' in room_data:
+        state['board'] = room_data['board']
+
+    if 'timer' in room_data:
+        timer = room_data['timer']
+        # Convert legacy timer format if needed
+        if 'timeLeft' in timer and timer['isRunning'] and timer.get('lastUpdate'):
+            end_time = timer['lastUpdate'] + timer['timeLeft']
+            timer['endTime'] = end_time
+            if 'timeLeft' in timer:
+                del timer['timeLeft']
+            if 'lastUpdate' in timer:
+                del timer['lastUpdate']
+        elif not timer['isRunning']:
+            timer['endTime'] = None
+            if 'timeLeft' in timer:
+                del timer['timeLeft']
+            if 'lastUpdate' in timer:
+                del timer['lastUpdate']
+        state['timer'] = timer
+
+    if 'workflow' in room_data:
+        state['workflow'] = room_data['workflow']
+
+    if 'workItems' in room_data:
+        state['workItems'] = room_data['workItems']
+
+    if 'rps_game' in room_data:
+        state['rps_game'] = room_data['rps_game']
+
+    # Journal records up to this sequence number are already in the snapshot
+    state['journalSeq'] = room_data.get('journalSeq', 0)
+
+    if has_snapshot:
+        logging.info(f"Loaded state for room '{room_name}' from {storage.name} storage")
+
+    if server_replay_room_journal(room_name, state, journal_lines):
+        # Fold the replayed records into a fresh snapshot on the next write-behind cycle
+        dirty_rooms.add(room_name)
+
+    return state
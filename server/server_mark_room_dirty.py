@@ -0,0 +1,9 @@
+import logging
+from server.server_persistence_engine import persistence_engine
+
+def server_mark_room_dirty(room):
+    """Flag a room so the persistence engine writes its state file."""
+    if room is None:
+        return
+    persistence_engine.notify(room)
+    logging.debug(f"Marked room '{room}' as dirty")
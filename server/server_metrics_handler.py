@@ -0,0 +1,39 @@
+import logging
+from aiohttp import web
+from server.server_outbound_queue import server_outbound_queue_stats
+from server.server_timer_scheduler import timer_scheduler
+from server.server_persistence_engine import persistence_engine
+from server.server_room_evictor import room_evictor
+from server.server_room_directory import room_directory
+from server.server_broadcast_room_list import room_list_broadcaster
+from server.server_room_shards import room_shards
+from server.server_room_bus import room_bus
+from server.server_compressed_websocket import server_compression_stats, server_binary_protocol_stats
+from server.server_json_codec import server_json_response
+
+async def handle_metrics_request(request):
+    """Handle HTTP requests for server metrics."""
+    try:
+        return server_json_response({
+            'outbound': server_outbound_queue_stats(),
+            'compression': server_compression_stats(),
+            'binaryProtocol': server_binary_protocol_stats(),
+            'timers': {
+                'scheduled': timer_scheduler.scheduled_count
+            },
+            'journal': persistence_engine.journal_stats(),
+            'rooms': {
+                **room_evictor.stats(),
+                'known': room_directory.count,
+                'directoryVersion': room_directory.version,
+                'listBroadcasts': room_list_broadcaster.broadcast_count
+            },
+            'worker': {
+                'index': room_shards.worker_index,
+                'count': room_shards.worker_count
+            },
+            'bus': room_bus.stats()
+        })
+    except Exception as e:
+        logging.error(f"Error serving metrics: {e}")
+        return web.Response(text="Error collecting metrics", status=500)
@@ -0,0 +1,184 @@
+import struct
+
+# MessagePack encoding for binary snapshots and the binary WebSocket subprotocol. Uses the msgpack
+# package when it is installed and a pure-Python codec otherwise; both read and write the same
+# subset - nil, booleans, integers, floats, strings, bytes, arrays and maps - so files written by
+# one load with the other.
+
+# Raised for input that isn't valid MessagePack (a ValueError, like JSONDecodeError)
+class MsgpackDecodeError(ValueError):
+    pass
+
+def _pack(obj, chunks):
+    if obj is None:
+        chunks.append(b'\xc0')
+    elif obj is True:
+        chunks.append(b'\xc3')
+    elif obj is False:
+        chunks.append(b'\xc2')
+    elif isinstance(obj, int):
+        if 0 <= obj < 0x80:
+            chunks.append(bytes((obj,)))
+        elif -0x20 <= obj < 0:
+            chunks.append(bytes((obj & 0xff,)))
+        elif obj >= 0:
+            if obj <= 0xff:
+                chunks.append(b'\xcc' + struct.pack('>B', obj))
+            elif obj <= 0xffff:
+                chunks.append(b'\xcd' + struct.pack('>H', obj))
+            elif obj <= 0xffffffff:
+                chunks.append(b'\xce' + struct.pack('>I', obj))
+            elif obj <= 0xffffffffffffffff:
+                chunks.append(b'\xcf' + struct.pack('>Q', obj))
+            else:
+                raise OverflowError(f"Integer too large for MessagePack: {obj}")
+        elif obj >= -0x80:
+            chunks.append(b'\xd0' + struct.pack('>b', obj))
+        elif obj >= -0x8000:
+            chunks.append(b'\xd1' + struct.pack('>h', obj))
+        elif obj >= -0x80000000:
+            chunks.append(b'\xd2' + struct.pack('>i', obj))
+        elif obj >= -0x8000000000000000:
+            chunks.append(b'\xd3' + struct.pack('>q', obj))
+        else:
+            raise OverflowError(f"Integer too large for MessagePack: {obj}")
+    elif isinstance(obj, float):
+        chunks.append(b'\xcb' + struct.pack('>d', obj))
+    elif isinstance(obj, str):
+        data = obj.encode('utf-8')
+        size = len(data)
+        if size < 0x20:
+            chunks.append(bytes((0xa0 | size,)))
+        elif size <= 0xff:
+            chunks.append(b'\xd9' + struct.pack('>B', size))
+        elif size <= 0xffff:
+            chunks.append(b'\xda' + struct.pack('>H', size))
+        else:
+            chunks.append(b'\xdb' + struct.pack('>I', size))
+        chunks.append(data)
+    elif isinstance(obj, (bytes, bytearray, memoryview)):
+        data = bytes(obj)
+        size = len(data)
+        if size <= 0xff:
+            chunks.append(b'\xc4' + struct.pack('>B', size))
+        elif size <= 0xffff:
+            chunks.append(b'\xc5' + struct.pack('>H', size))
+        else:
+            chunks.append(b'\xc6' + struct.pack('>I', size))
+        chunks.append(data)
+    elif isinstance(obj, (list, tuple)):
+        size = len(obj)
+        if size < 0x10:
+            chunks.append(bytes((0x90 | size,)))
+        elif size <= 0xffff:
+            chunks.append(b'\xdc' + struct.pack('>H', size))
+        else:
+            chunks.append(b'\xdd' + struct.pack('>I', size))
+        for value in obj:
+            _pack(value, chunks)
+    elif isinstance(obj, dict):
+        size = len(obj)
+        if size < 0x10:
+            chunks.append(bytes((0x80 | size,)))
+        elif size <= 0xffff:
+            chunks.append(b'\xde' + struct.pack('>H', size))
+        else:
+            chunks.append(b'\xdf' + struct.pack('>I', size))
+        for key, value in obj.items():
+            _pack(key, chunks)
+            _pack(value, chunks)
+    else:
+        raise TypeError(f"Object of type {type(obj).__name__} can't be encoded as MessagePack")
+
+# Fixed-size formats: first byte -> (struct format, size)
+_FIXED_FORMATS = {
+    0xca: ('>f', 4), 0xcb: ('>d', 8),
+    0xcc: ('>B', 1), 0xcd: ('>H', 2), 0xce: ('>I', 4), 0xcf: ('>Q', 8),
+    0xd0: ('>b', 1), 0xd1: ('>h', 2), 0xd2: ('>i', 4), 0xd3: ('>q', 8)
+}
+# Length-prefixed formats: first byte -> (kind, struct format of the length, its size)
+_SIZED_FORMATS = {
+    0xd9: ('str', '>B', 1), 0xda: ('str', '>H', 2), 0xdb: ('str', '>I', 4),
+    0xc4: ('bin', '>B', 1), 0xc5: ('bin', '>H', 2), 0xc6: ('bin', '>I', 4),
+    0xdc: ('array', '>H', 2), 0xdd: ('array', '>I', 4),
+    0xde: ('map', '>H', 2), 0xdf: ('map', '>I', 4)
+}
+
+def _unpack(data, offset):
+    """Decode the value at offset; returns (value, offset just past it)."""
+    code = data[offset]
+    offset += 1
+    if code < 0x80:
+        return code, offset
+    if code >= 0xe0:
+        return code - 0x100, offset
+    if 0xa0 <= code <= 0xbf:
+        kind, size = 'str', code & 0x1f
+    elif 0x90 <= code <= 0x9f:
+        kind, size = 'array', code & 0x0f
+    elif 0x80 <= code <= 0x8f:
+        kind, size = 'map', code & 0x0f
+    elif code == 0xc0:
+        return None, offset
+    elif code == 0xc2:
+        return False, offset
+    elif code == 0xc3:
+        return True, offset
+    elif code in _FIXED_FORMATS:
+        fmt, width = _FIXED_FORMATS[code]
+        return struct.unpack_from(fmt, data, offset)[0], offset + width
+    elif code in _SIZED_FORMATS:
+        kind, fmt, width = _SIZED_FORMATS[code]
+        size = struct.unpack_from(fmt, data, offset)[0]
+        offset += width
+    else:
+        raise MsgpackDecodeError(f"Unsupported MessagePack type 0x{code:02x} at byte {offset - 1}")
+
+    if kind == 'str' or kind == 'bin':
+        end = offset + size
+        if end > len(data):
+            raise MsgpackDecodeError("Truncated MessagePack data")
+        raw = data[offset:end]
+        return (str(raw, 'utf-8') if kind == 'str' else bytes(raw)), end
+    if kind == 'array':
+        items = []
+        for _ in range(size):
+            value, offset = _unpack(data, offset)
+            items.append(value)
+        return items, offset
+    mapping = {}
+    for _ in range(size):
+        key, offset = _unpack(data, offset)
+        mapping[key], offset = _unpack(data, offset)
+    return mapping, offset
+
+try:
+    import msgpack
+
+    MSGPACK_BACKEND = 'msgpack'
+
+    def msgpack_encode(obj):
+        return msgpack.packb(obj, use_bin_type=True)
+
+    def msgpack_decode(data):
+        try:
+            return msgpack.unpackb(data, raw=False, strict_map_key=False)
+        except (ValueError, TypeError) as e:
+            raise MsgpackDecodeError(str(e)) from e
+
+except ImportError:
+    MSGPACK_BACKEND = 'python'
+
+    def msgpack_encode(obj):
+        chunks = []
+        _pack(obj, chunks)
+        return b''.join(chunks)
+
+    def msgpack_decode(data):
+        try:
+            value, offset = _unpack(memoryview(data), 0)
+        except (IndexError, struct.error, UnicodeDecodeError, TypeError) as e:
+            raise MsgpackDecodeError(f"Invalid MessagePack data: {e}") from e
+        if offset != len(data):
+            raise MsgpackDecodeError(f"Extra data after MessagePack value at byte {offset}")
+        return value
@@ -0,0 +1,148 @@
+import asyncio
+import logging
+from collections import deque
+from aiohttp import WSMsgType, WSCloseCode
+from server.server_state import outbound_queues, OUTBOUND_QUEUE_SIZE, OUTBOUND_FULL_POLICY
+
+# Totals across all connections, including ones that have since closed
+outbound_totals = {
+    'sent': 0,
+    'dropped': 0,
+    'coalesced': 0,
+    'evicted': 0
+}
+
+# Closes of evicted connections still in progress; the event loop only keeps weak references to tasks
+_close_tasks = set()
+
+# Bounded per-connection send queue drained by its own writer task
+class ServerOutboundQueue:
+    def __init__(self, ws, maxsize=OUTBOUND_QUEUE_SIZE, policy=OUTBOUND_FULL_POLICY):
+        self.ws = ws
+        self.maxsize = maxsize
+        self.policy = policy
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.max_depth = 0
+        self.closed = False
+        self._queue = deque()      # entries are [coalesce_key, payload]
+        self._keyed = {}           # coalesce_key -> queued entry
+        self._ready = asyncio.Event()
+        self._task = asyncio.create_task(self._writer())
+
+    @property
+    def depth(self):
+        return len(self._queue)
+
+    def enqueue(self, payload, coalesce_key=None):
+        """
+        Queue an encoded text frame without waiting for the socket.
+
+        Args:
+            payload (bytes): Encoded message
+            coalesce_key (str, optional): Messages with the same key supersede each other
+                (e.g. 'timer'), so only the latest one needs to reach a slow client
+
+        Returns:
+            bool: False if the message was dropped or the connection was evicted
+        """
+        if self.closed:
+            return False
+
+        if self.policy == 'coalesce' and coalesce_key is not None:
+            entry = self._keyed.get(coalesce_key)
+            if entry is not None:
+                # Replace the queued message in place; it keeps its position in the queue
+                entry[1] = payload
+                self.coalesced += 1
+                outbound_totals['coalesced'] += 1
+                return True
+
+        if len(self._queue) >= self.maxsize:
+            # Keyed messages (timer transitions, workflow and room list snapshots) are state the client
+            # can't get back later, so under 'coalesce' a message that doesn't fit never just vanishes:
+            # the client is disconnected, reconnects and reloads full state
+            if self.policy in ('disconnect', 'coalesce'):
+                self.evict()
+            else:
+                self.dropped += 1
+                outbound_totals['dropped'] += 1
+            return False
+
+        entry = [coalesce_key, payload]
+        self._queue.append(entry)
+        if coalesce_key is not None:
+            self._keyed[coalesce_key] = entry
+
+        self.max_depth = max(self.max_depth, len(self._queue))
+        self._ready.set()
+        return True
+
+    async def _writer(self):
+        try:
+            while True:
+                await self._ready.wait()
+                while self._queue:
+                    entry = self._queue.popleft()
+                    coalesce_key, payload = entry
+                    if coalesce_key is not None and self._keyed.get(coalesce_key) is entry:
+                        del self._keyed[coalesce_key]
+                    await self.ws.send_frame(payload, WSMsgType.TEXT)
+                    self.sent += 1
+                    outbound_totals['sent'] += 1
+                self._ready.clear()
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logging.debug(f"Outbound writer stopped: {e}")
+            self.closed = True
+
+    def evict(self):
+        """Disconnect a client that can't keep up."""
+        if self.closed:
+            return
+        logging.warning(f"Evicting slow client {id(self.ws)} with {len(self._queue)} queued messages")
+        outbound_totals['evicted'] += 1
+        self.close()
+        task = asyncio.create_task(self._close_connection())
+        _close_tasks.add(task)
+        task.add_done_callback(_close_tasks.discard)
+
+    async def _close_connection(self):
+        try:
+            await self.ws.close(code=WSCloseCode.TRY_AGAIN_LATER, message=b'Outbound queue full')
+        except Exception as e:
+            logging.warning(f"Error closing evicted client {id(self.ws)}: {e}")
+
+    def close(self):
+        """Stop the writer task and drop anything still queued."""
+        self.closed = True
+        self._task.cancel()
+        self._queue.clear()
+        self._keyed.clear()
+
+def server_open_outbound_queue(ws):
+    """Create and register the outbound queue for a new connection."""
+    queue = ServerOutboundQueue(ws)
+    outbound_queues[ws] = queue
+    return queue
+
+def server_close_outbound_queue(ws):
+    """Stop and unregister a connection's outbound queue."""
+    queue = outbound_queues.pop(ws, None)
+    if queue is not None:
+        queue.close()
+
+def server_outbound_queue_stats():
+    """Current queue depths and lifetime counters for all connections."""
+    depths = [queue.depth for queue in outbound_queues.values()]
+    return {
+        'connections': len(depths),
+        'queuedMessages': sum(depths),
+        'maxQueueDepth': max(depths, default=0),
+        'maxQueueDepthSeen': max((queue.max_depth for queue in outbound_queues.values()), default=0),
+        'queueSize': OUTBOUND_QUEUE_SIZE,
+        'policy': OUTBOUND_FULL_POLICY,
+        **outbound_totals
+    }
@@ -0,0 +1,186 @@
+import asyncio
+import logging
+import time
+from server.server_state import (
+    rooms_state, dirty_rooms, SAVE_COALESCE_WINDOW,
+    JOURNAL_ENABLED, JOURNAL_COMPACT_RECORDS, JOURNAL_COMPACT_INTERVAL
+)
+from server.server_save_room_states import server_save_room_states
+from server.server_storage import storage
+from server.server_json_codec import json_encode_str
+
+# Write-behind persistence for room state: journal appends plus periodic snapshot files
+class ServerPersistenceEngine:
+    def __init__(self, coalesce_window=SAVE_COALESCE_WINDOW, journal_enabled=JOURNAL_ENABLED):
+        self.coalesce_window = coalesce_window
+        self.journal_enabled = journal_enabled
+        self._wakeup = None
+        self._lock = None
+        self._task = None
+        self._journal_buffers = {}    # room -> (seq, encoded record) not yet appended
+        self._journal_counts = {}     # room -> records since the last snapshot
+        self._journal_since = {}      # room -> time of the oldest record since the last snapshot
+
+    @property
+    def running(self):
+        return self._task is not None and not self._task.done()
+
+    def notify(self, room):
+        """Record that a room changed; the background task will write it within the coalesce window."""
+        dirty_rooms.add(room)
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def record(self, room, record):
+        """
+        Journal one mutation of a room instead of rewriting its whole snapshot.
+
+        The record is encoded now, since the state it describes may change before
+        the next write, and appended to the room's journal in the next group write.
+
+        Returns:
+            dict: The record with its journal sequence number (none if journaling is off)
+        """
+        room_state = rooms_state.get(room)
+        if not self.journal_enabled or room_state is None:
+            self.notify(room)
+            return record
+
+        seq = room_state.get('journalSeq', 0) + 1
+        room_state['journalSeq'] = seq
+        record = {'seq': seq, **record}
+        line = json_encode_str(record) + '\n'
+
+        self._journal_buffers.setdefault(room, []).append((seq, line))
+        self._journal_counts[room] = self._journal_counts.get(room, 0) + 1
+        self._journal_since.setdefault(room, time.monotonic())
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return record
+
+    def journal_stats(self):
+        return {
+            'enabled': self.journal_enabled,
+            'bufferedRecords': sum(len(records) for records in self._journal_buffers.values()),
+            'uncompactedRecords': sum(self._journal_counts.values()),
+            'rooms': len(self._journal_counts)
+        }
+
+    async def start(self):
+        """Start the background writer on the running event loop."""
+        if self.running:
+            return
+
+        self._wakeup = asyncio.Event()
+        self._lock = asyncio.Lock()
+
+        # Pick up anything that was marked before the loop was running
+        if dirty_rooms or self._journal_buffers:
+            self._wakeup.set()
+
+        self._task = asyncio.create_task(self._run())
+        logging.info(f"Persistence engine started (coalesce window {self.coalesce_window}s, journal {'on' if self.journal_enabled else 'off'})")
+
+    async def _run(self):
+        while True:
+            try:
+                # Wake up now and then even when idle so old journals still get compacted
+                await asyncio.wait_for(self._wakeup.wait(), timeout=JOURNAL_COMPACT_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+            # Let the burst settle so repeated changes to the same room become one write
+            await asyncio.sleep(self.coalesce_window)
+            self._wakeup.clear()
+
+            try:
+                await self.flush()
+            except Exception as e:
+                logging.error(f"Persistence engine flush error: {e}")
+
+    def _drop_journal_backlog(self, room):
+        # Called as a room's snapshot is encoded: the snapshot includes every record so far
+        self._journal_buffers.pop(room, None)
+        self._journal_counts.pop(room, None)
+        self._journal_since.pop(room, None)
+
+    def _rooms_due_for_compaction(self, compact_all=False):
+        now = time.monotonic()
+        return [
+            room for room, count in self._journal_counts.items()
+            if compact_all
+            or count >= JOURNAL_COMPACT_RECORDS
+            or now - self._journal_since.get(room, now) >= JOURNAL_COMPACT_INTERVAL
+        ]
+
+    async def _write(self, compact_all=False):
+        # Group commit: every buffered record in one append call
+        if self._journal_buffers:
+            batches = list(self._journal_buffers.items())
+            self._journal_buffers = {}
+            failed_rooms = await asyncio.to_thread(storage.append_journal, batches)
+
+            # Put failed records back in front of anything recorded since, to retry in order
+            for room_name, records in batches:
+                if room_name in failed_rooms and room_name in rooms_state:
+                    self._journal_buffers[room_name] = records + self._journal_buffers.get(room_name, [])
+
+        # Snapshots fold the journal into the room's saved state and drop the covered records
+        dirty_rooms.update(self._rooms_due_for_compaction(compact_all))
+        await server_save_room_states(on_snapshot=self._drop_journal_backlog)
+
+    async def flush(self, compact_all=False):
+        """Append buffered journal records and write every room whose snapshot is due."""
+        if self._lock is None:
+            await self._write(compact_all)
+            return
+
+        async with self._lock:
+            await self._write(compact_all)
+
+    async def release_room(self, room):
+        """
+        Write a room's buffered journal records and a fresh snapshot so it can be dropped from memory.
+
+        Returns:
+            bool: True if nothing for the room is left unsaved
+        """
+        if room in self._journal_counts or room in self._journal_buffers:
+            dirty_rooms.add(room)
+        if room in dirty_rooms:
+            await self.flush()
+        return room not in dirty_rooms and room not in self._journal_buffers and room not in self._journal_counts
+
+    async def forget_room(self, room):
+        """Drop any pending save for a room and remove its saved state and journal."""
+        dirty_rooms.discard(room)
+        self._drop_journal_backlog(room)
+
+        # Hold the lock so an in-flight write can't recreate the room after it's removed
+        if self._lock is None:
+            storage.delete_room(room)
+            return
+
+        async with self._lock:
+            await asyncio.to_thread(storage.delete_room, room)
+
+    async def stop(self):
+        """Stop the background writer and flush whatever is still pending, compacting every journal."""
+        if self._task is None:
+            await self.flush(compact_all=True)
+            return
+
+        # Take the lock first so the task is never cancelled halfway through a write
+        async with self._lock:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+            await self._write(compact_all=True)
+
+        logging.info("Persistence engine stopped and flushed")
+
+persistence_engine = ServerPersistenceEngine()
@@ -0,0 +1,104 @@
+from server.server_state import WORK_ITEM_PAGE_SIZE, WORK_ITEM_MAX_PAGE_SIZE
+from server.server_work_item_index import work_item_indexes, server_work_item_updated
+from server.server_workflow_graph import workflow_graphs
+
+WORK_ITEM_SORT_KEYS = {
+    'updated': server_work_item_updated,
+    'created': lambda item: item.get('created') or '',
+    'title': lambda item: str(item.get('title', '')).lower()
+}
+
+def server_query_work_items(room, room_state, query):
+    """
+    Filter, sort and page a room's work items using its indexes.
+
+    Query fields (all optional):
+        stateId      - a state id or list of state ids
+        reachableFrom - a state id; items in states that can be reached from it
+        assignee     - the item's assignee (case-insensitive)
+        text         - text in the item's title, description or id (case-insensitive)
+        updatedSince - ISO timestamp; items changed at or after it
+        sort         - 'position' (default, the list order), 'updated', 'created' or 'title';
+                       prefix with '-' for descending
+        offset       - items to skip
+        limit        - page size, up to WORK_ITEM_MAX_PAGE_SIZE
+
+    Returns:
+        dict: {'items', 'total', 'offset', 'limit', 'next', 'stateCounts'}; next is the
+            offset of the following page, or None on the last page, and stateCounts
+            is the number of items in each state (before filtering)
+
+    Raises:
+        ValueError: If the query is malformed
+    """
+    query = query or {}
+    index = work_item_indexes.get(room, room_state)
+    graph = workflow_graphs.get(room, room_state)
+
+    offset = int(query.get('offset') or 0)
+    limit = int(query.get('limit') or WORK_ITEM_PAGE_SIZE)
+    if offset < 0 or limit < 1:
+        raise ValueError("offset must be >= 0 and limit >= 1")
+    limit = min(limit, WORK_ITEM_MAX_PAGE_SIZE)
+
+    sort = query.get('sort') or 'position'
+    descending = sort.startswith('-')
+    sort_field = sort.lstrip('-')
+    if sort_field != 'position' and sort_field not in WORK_ITEM_SORT_KEYS:
+        raise ValueError(f"Unknown sort field: {sort_field}")
+
+    # Narrow with the indexes first, then filter what's left
+    candidate_ids = None
+    state_ids = query.get('stateId')
+    if state_ids:
+        if isinstance(state_ids, str):
+            state_ids = [state_ids]
+        candidate_ids = set()
+        for state_id in state_ids:
+            candidate_ids.update(index.state_ids(state_id))
+
+    reachable_from = query.get('reachableFrom')
+    if reachable_from:
+        reachable_ids = set()
+        for state_id in graph.reachable_states(reachable_from):
+            reachable_ids.update(index.state_ids(state_id))
+        candidate_ids = reachable_ids if candidate_ids is None else candidate_ids & reachable_ids
+
+    updated_since = query.get('updatedSince')
+    if updated_since:
+        recent_ids = index.updated_since(str(updated_since))
+        candidate_ids = set(recent_ids) if candidate_ids is None else candidate_ids.intersection(recent_ids)
+
+    if candidate_ids is None:
+        items = [item for item in index.work_items if isinstance(item, dict)]
+    else:
+        items = [index.by_id[item_id] for item_id in sorted(candidate_ids, key=index.position.__getitem__)]
+
+    assignee = query.get('assignee')
+    if assignee:
+        assignee = str(assignee).lower()
+        items = [item for item in items if str(item.get('assignee') or '').lower() == assignee]
+
+    text = query.get('text')
+    if text:
+        text = str(text).lower()
+        items = [
+            item for item in items
+            if any(text in str(item.get(field) or '').lower() for field in ('title', 'description', 'id'))
+        ]
+
+    # Items are in list order here, so ties keep that order
+    if sort_field != 'position':
+        items.sort(key=WORK_ITEM_SORT_KEYS[sort_field], reverse=descending)
+    elif descending:
+        items.reverse()
+
+    total = len(items)
+    return {
+        'items': items[offset:offset + limit],
+        'total': total,
+        'offset': offset,
+        'limit': limit,
+        'next': offset + limit if offset + limit < total else None,
+        'stateCounts': dict(graph.item_counts)
+    }
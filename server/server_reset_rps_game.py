@@ -1,6 +1,6 @@
 import json
 import logging
-import server.server_state as server_state
+from server.server_connection_manager import connection_manager
 from server.server_utils import broadcast_to_room
 
 async def server_reset_rps_game(ws, data, room, room_state):
@@ -12,21 +12,14 @@ async def server_reset_rps_game(ws, data, room, room_state):
         'players': [],
         'choices': {},
         'result': None,
-        'player_connections': {},
         'positions': {1: None, 2: None}  # Reset position assignments with integer keys
     }
     
-    # Clean up stale connections
-    active_connections = []
-    for client in server_state.connections[room]:
-        try:
-            if not client.closed:
-                active_connections.append(client)
-        except:
-            pass
+    # Positions are cleared, so no connection is bound to a player any more
+    connection_manager.unbind_room_players(room)
     
-    # Update connections list with only active connections
-    server_state.connections[room] = active_connections
+    # Open connections in this room (closed ones are pruned by the connection manager)
+    active_connections = connection_manager.connections(room)
     
     # Broadcast the reset game state to all clients in the room
     # Send connected client information for position selection
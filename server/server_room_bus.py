@@ -0,0 +1,400 @@
+import asyncio
+import copy
+import itertools
+import logging
+import os
+import socket
+from collections import deque
+from server.server_state import ROOM_BUS_BACKEND, ROOM_BUS_ADDRESS, ROOM_BUS_INSTANCE, ROOM_BUS_QUEUE_SIZE, WORKER_BUS_TIMEOUT
+from server.server_json_codec import json_encode, json_decode, JSONDecodeError
+
+# Seconds between attempts to reach the broker after losing it
+BUS_RECONNECT_DELAY = 1
+
+def _parse_address(address):
+    """Split 'unix:/path/to.sock' or 'tcp:host:port' into ('unix', path) or ('tcp', (host, port))."""
+    scheme, _, target = address.partition(':')
+    if scheme == 'unix' and target:
+        return 'unix', target
+    if scheme == 'tcp':
+        host, _, port = target.rpartition(':')
+        if host and port.isdigit():
+            return 'tcp', (host, int(port))
+    raise ValueError(f"Invalid bus address '{address}' (expected unix:/path or tcp:host:port)")
+
+def _encode(event):
+    """
+    Encode an event as one bus line.
+
+    A 'message' that is already encoded (bytes) is spliced into the line as-is,
+    so a broadcast isn't decoded and encoded again just to cross the bus.
+    """
+    message = event.get('message')
+    if isinstance(message, bytes):
+        head = json_encode({key: value for key, value in event.items() if key != 'message'})
+        return head[:-1] + b',"message":' + message + b'}\n'
+    return json_encode(event) + b'\n'
+
+# Bounded send queue for one bus connection, drained by its own writer task (as ServerOutboundQueue
+# does for WebSocket clients), so sending never waits and a stuck peer can't grow the buffers forever
+class ServerBusWriter:
+    def __init__(self, writer, peer, maxsize=ROOM_BUS_QUEUE_SIZE):
+        self.writer = writer
+        self.peer = peer
+        self.maxsize = maxsize
+        self.closed = False
+        self._queue = deque()
+        self._ready = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    def send(self, line):
+        """Queue an encoded line; returns False if the connection is closed or was closed for falling behind."""
+        if self.closed:
+            return False
+        if len(self._queue) >= self.maxsize:
+            # The other end reconnects; rooms it missed changes for resync from the journal sequence gap
+            logging.warning(f"Room bus connection to '{self.peer}' is {len(self._queue)} lines behind; closing it")
+            self.close()
+            return False
+        self._queue.append(line)
+        self._ready.set()
+        return True
+
+    async def _run(self):
+        try:
+            while True:
+                await self._ready.wait()
+                while self._queue:
+                    self.writer.write(self._queue.popleft())
+                    await self.writer.drain()
+                self._ready.clear()
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logging.warning(f"Room bus writer to '{self.peer}' stopped: {e}")
+        finally:
+            self.closed = True
+            self.writer.close()
+
+    def close(self):
+        """Stop the writer task, drop anything still queued and close the connection."""
+        self.closed = True
+        self._queue.clear()
+        self._task.cancel()
+
+# Relays bus events between members (one JSON object per line); runs in the router, or on its own
+class ServerRoomBusBroker:
+    def __init__(self):
+        self.relayed_count = 0
+        self._writers = {}   # member -> ServerBusWriter
+        self._server = None
+        self._address = None
+
+    async def start(self, address):
+        scheme, target = _parse_address(address)
+        if scheme == 'unix':
+            if os.path.exists(target):
+                os.remove(target)
+            self._server = await asyncio.start_unix_server(self._serve, path=target)
+        else:
+            self._server = await asyncio.start_server(self._serve, *target)
+        self._address = address
+        logging.info(f"Room bus broker listening on {address}")
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+            scheme, target = _parse_address(self._address)
+            if scheme == 'unix' and os.path.exists(target):
+                os.remove(target)
+        for bus_writer in self._writers.values():
+            bus_writer.close()
+        self._writers.clear()
+
+    @property
+    def member_count(self):
+        return len(self._writers)
+
+    async def _serve(self, reader, writer):
+        member = None
+        bus_writer = None
+        try:
+            hello = json_decode(await reader.readline() or b'{}')
+            member = hello.get('member')
+            if hello.get('kind') != 'hello' or member is None:
+                return
+            bus_writer = ServerBusWriter(writer, member)
+            self._writers[member] = bus_writer
+            logging.info(f"'{member}' joined the room bus")
+
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    target = json_decode(line).get('to')
+                except JSONDecodeError:
+                    logging.warning(f"Dropped malformed bus message from '{member}'")
+                    continue
+                self._relay(member, target, line)
+        except (ConnectionError, asyncio.IncompleteReadError) as e:
+            logging.warning(f"Room bus connection to '{member}' lost: {e}")
+        finally:
+            if bus_writer is not None and self._writers.get(member) is bus_writer:
+                del self._writers[member]
+                logging.info(f"'{member}' left the room bus")
+            if bus_writer is not None:
+                bus_writer.close()
+            else:
+                writer.close()
+
+    def _relay(self, sender, target, line):
+        # Addressed messages go to one member; everything else to every other member
+        if target is not None:
+            targets = [self._writers[target]] if target in self._writers else []
+        else:
+            targets = [bus_writer for member, bus_writer in self._writers.items() if member != sender]
+        for bus_writer in targets:
+            bus_writer.send(line)
+        self.relayed_count += 1
+
+# Transport to a ServerRoomBusBroker over a Unix or TCP socket; reconnects if the broker goes away
+class ServerSocketBusTransport:
+    def __init__(self, address):
+        _parse_address(address)
+        self.address = address
+        self._writer = None
+        self._task = None
+
+    @property
+    def connected(self):
+        return self._writer is not None
+
+    async def _connect(self, member):
+        scheme, target = _parse_address(self.address)
+        if scheme == 'unix':
+            reader, writer = await asyncio.open_unix_connection(target)
+        else:
+            reader, writer = await asyncio.open_connection(*target)
+        self._writer = ServerBusWriter(writer, 'broker')
+        self._writer.send(_encode({'kind': 'hello', 'member': member}))
+        return reader
+
+    async def open(self, member, deliver):
+        reader = await self._connect(member)
+        self._task = asyncio.create_task(self._run(member, deliver, reader))
+
+    async def _run(self, member, deliver, reader):
+        while True:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    event = json_decode(line)
+                except JSONDecodeError:
+                    logging.warning(f"Dropped malformed room bus line for '{member}'")
+                    continue
+                # Delivered in order, one at a time, so events about the same room can't overtake each other
+                await deliver(event)
+
+            self._writer.close()
+            self._writer = None
+            logging.error(f"'{member}' lost its room bus connection; reconnecting")
+            while self._writer is None:
+                await asyncio.sleep(BUS_RECONNECT_DELAY)
+                try:
+                    reader = await self._connect(member)
+                    logging.info(f"'{member}' reconnected to the room bus")
+                except OSError as e:
+                    logging.debug(f"Room bus at {self.address} still unavailable: {e}")
+
+    def send(self, event):
+        if self._writer is not None:
+            self._writer.send(_encode(event))
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+# In-process broker: members are transports in this process, each with its own event queue
+class ServerLocalBusBroker:
+    def __init__(self):
+        self.relayed_count = 0
+        self._queues = {}   # member -> asyncio.Queue
+
+    def join(self, member):
+        queue = asyncio.Queue()
+        self._queues[member] = queue
+        return queue
+
+    def leave(self, member, queue):
+        if self._queues.get(member) is queue:
+            del self._queues[member]
+
+    def route(self, event):
+        target = event.get('to')
+        if target is not None:
+            targets = [self._queues[target]] if target in self._queues else []
+        else:
+            targets = [queue for member, queue in self._queues.items() if member != event.get('from')]
+        # Copied per member, as if it had crossed a socket, so members never share state objects
+        for queue in targets:
+            queue.put_nowait(copy.deepcopy(event))
+        self.relayed_count += 1
+
+local_bus_broker = ServerLocalBusBroker()
+
+# Transport to a broker in this process (a single instance, or several buses in one test process)
+class ServerLocalBusTransport:
+    def __init__(self, broker=None):
+        self.broker = broker if broker is not None else local_bus_broker
+        self._member = None
+        self._queue = None
+        self._task = None
+
+    @property
+    def connected(self):
+        return self._queue is not None
+
+    async def open(self, member, deliver):
+        self._member = member
+        self._queue = self.broker.join(member)
+        self._task = asyncio.create_task(self._run(deliver))
+
+    async def _run(self, deliver):
+        while True:
+            await deliver(await self._queue.get())
+
+    def send(self, event):
+        if self._queue is not None:
+            self.broker.route(event)
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._queue is not None:
+            self.broker.leave(self._member, self._queue)
+            self._queue = None
+
+def server_create_bus_transport(backend=ROOM_BUS_BACKEND, address=ROOM_BUS_ADDRESS):
+    """Build the transport ROOM_BUS_BACKEND asks for."""
+    if backend == 'socket':
+        return ServerSocketBusTransport(address)
+    if backend == 'local':
+        return ServerLocalBusTransport()
+    raise ValueError(f"Unknown room bus backend: {backend}")
+
+def server_room_bus_member():
+    """This instance's name on the bus."""
+    return ROOM_BUS_INSTANCE or f'{socket.gethostname()}-{os.getpid()}'
+
+# Publishes this process's room events and hands other processes' events to a handler
+class ServerRoomBus:
+    def __init__(self, timeout=WORKER_BUS_TIMEOUT):
+        self.timeout = timeout
+        self.member = None
+        self.shares_rooms = False
+        self.sent_count = 0
+        self.received_count = 0
+        self._transport = None
+        self._handler = None
+        self._pending = {}   # requestId -> Future for the reply
+        self._request_ids = itertools.count(1)
+
+    @property
+    def connected(self):
+        return self._transport is not None and self._transport.connected
+
+    async def start(self, member, handler, transport, shares_rooms=True):
+        """
+        Join the bus as member.
+
+        handler(event) is awaited for every event from another member; its return
+        value is sent back when the event was a request. shares_rooms says whether
+        other members serve the same rooms (separate instances) or different ones
+        (worker processes, which only need room list and deletion events).
+        """
+        self.member = member
+        self.shares_rooms = shares_rooms
+        self._handler = handler
+        await transport.open(member, self._deliver)
+        self._transport = transport
+        logging.info(f"Joined the room bus as '{member}' via {type(transport).__name__}")
+
+    def publish(self, event):
+        """Send an event to every other member (no-op when not on a bus)."""
+        if not self.connected:
+            return
+        self._transport.send({**event, 'from': self.member})
+        self.sent_count += 1
+
+    def publish_room_change(self, room, record):
+        """Let instances serving the same room apply a journal record this instance just applied."""
+        if self.shares_rooms and record is not None:
+            self.publish({'kind': 'room_change', 'room': room, 'record': record})
+
+    def publish_room_message(self, room, payload, coalesce_key=None):
+        """Let instances serving the same room send an encoded broadcast to their clients in it."""
+        if self.shares_rooms:
+            self.publish({'kind': 'room_message', 'room': room, 'coalesceKey': coalesce_key, 'message': payload})
+
+    async def request(self, member, event):
+        """Send an event to one member and wait for its handler's result."""
+        if not self.connected:
+            raise ConnectionError("Not connected to the room bus")
+        request_id = next(self._request_ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        try:
+            self._transport.send({**event, 'from': self.member, 'to': member, 'requestId': request_id})
+            self.sent_count += 1
+            return await asyncio.wait_for(future, timeout=self.timeout)
+        finally:
+            self._pending.pop(request_id, None)
+
+    async def _deliver(self, event):
+        self.received_count += 1
+        try:
+            if event.get('kind') == 'reply':
+                future = self._pending.get(event.get('requestId'))
+                if future is not None and not future.done():
+                    future.set_result(event.get('result'))
+                return
+
+            result = await self._handler(event)
+            if 'requestId' in event:
+                self.publish({'kind': 'reply', 'to': event.get('from'), 'requestId': event['requestId'], 'result': result})
+        except Exception as e:
+            logging.error(f"Error handling room bus event '{event.get('kind')}' from '{event.get('from')}': {e}")
+
+    async def stop(self):
+        if self._transport is not None:
+            await self._transport.close()
+            self._transport = None
+
+    def stats(self):
+        return {
+            'member': self.member,
+            'connected': self.connected,
+            'sharesRooms': self.shares_rooms,
+            'sent': self.sent_count,
+            'received': self.received_count
+        }
+
+room_bus = ServerRoomBus()
@@ -0,0 +1,68 @@
+import bisect
+import logging
+from server.server_state import deleted_rooms
+from server.server_storage import storage
+from server.server_utils import encode_message
+
+# Sorted names of every room, loaded or not, so the room list never needs room states in memory
+class ServerRoomDirectory:
+    def __init__(self):
+        self._names = ['default']   # kept sorted; 'default' is always listed
+        self.version = 0            # bumped whenever the list changes
+        self._encoded = None        # cached 'rooms' message for the current version
+
+    def load(self):
+        """Index every room the storage backend has saved (call after storage.prepare())."""
+        for room in storage.list_rooms():
+            self.add(room)
+        logging.info(f"Room directory indexed {len(self._names)} room(s)")
+
+    def add(self, room):
+        """List a room; returns True if the list changed. Deleted rooms stay hidden even if re-created."""
+        if room in deleted_rooms:
+            return False
+        position = bisect.bisect_left(self._names, room)
+        if position < len(self._names) and self._names[position] == room:
+            return False
+        self._names.insert(position, room)
+        self._changed()
+        return True
+
+    def discard(self, room):
+        """Stop listing a room; returns True if the list changed."""
+        if room == 'default':
+            return False
+        position = bisect.bisect_left(self._names, room)
+        if position == len(self._names) or self._names[position] != room:
+            return False
+        del self._names[position]
+        self._changed()
+        return True
+
+    def _changed(self):
+        self.version += 1
+        self._encoded = None
+
+    def __contains__(self, room):
+        position = bisect.bisect_left(self._names, room)
+        return position < len(self._names) and self._names[position] == room
+
+    @property
+    def count(self):
+        return len(self._names)
+
+    def names(self):
+        """Sorted room list for clients."""
+        return list(self._names)
+
+    def encoded_message(self):
+        """The 'rooms' message for the current list, encoded once per version."""
+        if self._encoded is None:
+            self._encoded = encode_message({
+                'type': 'rooms',
+                'rooms': self._names,
+                'version': self.version
+            })
+        return self._encoded
+
+room_directory = ServerRoomDirectory()
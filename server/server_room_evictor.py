@@ -0,0 +1,129 @@
+import asyncio
+import logging
+import time
+from server.server_state import rooms_state, ROOM_IDLE_EVICT_SECONDS, ROOM_CACHE_MAX_ROOMS, ROOM_EVICT_INTERVAL
+from server.server_connection_manager import connection_manager
+from server.server_room_locks import room_locks
+from server.server_persistence_engine import persistence_engine
+from server.server_timer_scheduler import timer_scheduler
+from server.server_work_item_index import work_item_indexes
+from server.server_workflow_graph import workflow_graphs
+
+# Drops idle rooms from memory once they're saved; they load again from storage on the next join
+class ServerRoomEvictor:
+    def __init__(self, idle_seconds=ROOM_IDLE_EVICT_SECONDS, max_rooms=ROOM_CACHE_MAX_ROOMS,
+                 interval=ROOM_EVICT_INTERVAL):
+        self.idle_seconds = idle_seconds
+        self.max_rooms = max_rooms
+        self.interval = interval
+        self.evicted_count = 0
+        self._idle_since = {}   # room -> monotonic time it was last seen without connections
+        self._wakeup = None
+        self._task = None
+
+    def mark_active(self, room):
+        self._idle_since.pop(room, None)
+
+    def mark_idle(self, room):
+        """Start a room's idle clock (its last connection just left)."""
+        self._idle_since[room] = time.monotonic()
+
+    def check_budget(self):
+        """Wake the evictor early when more rooms are loaded than the cache allows."""
+        if len(rooms_state) > self.max_rooms and self._wakeup is not None:
+            self._wakeup.set()
+
+    def stats(self):
+        return {
+            'loaded': len(rooms_state),
+            'idle': len(self._idle_since),
+            'evicted': self.evicted_count,
+            'maxLoaded': self.max_rooms
+        }
+
+    async def start(self):
+        if self._task is not None and not self._task.done():
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+        logging.info(f"Room evictor started (idle {self.idle_seconds}s, max {self.max_rooms} loaded rooms)")
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            try:
+                await self.sweep()
+            except Exception as e:
+                logging.error(f"Room eviction error: {e}")
+
+    def _candidates(self):
+        """Idle rooms to evict: every room past the idle limit, plus the least recently used over budget."""
+        now = time.monotonic()
+
+        # Forget rooms that were deleted or evicted since the last sweep
+        for room in [room for room in self._idle_since if room not in rooms_state]:
+            del self._idle_since[room]
+
+        idle_rooms = []
+        for room in rooms_state:
+            if room == 'default' or connection_manager.has_connections(room):
+                self._idle_since.pop(room, None)
+                continue
+            idle_rooms.append((self._idle_since.setdefault(room, now), room))
+
+        idle_rooms.sort()
+        over_budget = len(rooms_state) - self.max_rooms
+        return [
+            room for position, (idle_since, room) in enumerate(idle_rooms)
+            if position < over_budget or now - idle_since >= self.idle_seconds
+        ]
+
+    async def sweep(self):
+        evicted = 0
+        for room in self._candidates():
+            if await self.evict(room):
+                evicted += 1
+        if evicted:
+            logging.info(f"Evicted {evicted} idle room(s); {len(rooms_state)} room(s) loaded")
+        return evicted
+
+    async def evict(self, room):
+        """Save a room and drop it from memory; returns False if it's busy or couldn't be saved."""
+        async with room_locks.hold(room):
+            if room not in rooms_state or connection_manager.has_connections(room):
+                return False
+
+            if not await persistence_engine.release_room(room):
+                logging.warning(f"Keeping room '{room}' in memory: its latest changes are not saved yet")
+                return False
+
+            # Someone may have joined while the save was running
+            if connection_manager.has_connections(room):
+                return False
+
+            # A running timer is re-armed from the saved endTime when the room loads again
+            timer_scheduler.cancel(room)
+            del rooms_state[room]
+            work_item_indexes.invalidate(room)
+            workflow_graphs.invalidate(room)
+            self._idle_since.pop(room, None)
+            self.evicted_count += 1
+            logging.debug(f"Evicted idle room '{room}' from memory")
+            return True
+
+room_evictor = ServerRoomEvictor()
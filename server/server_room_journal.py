@@ -0,0 +1,81 @@
+import logging
+from server.server_apply_board_op import server_apply_board_op
+from server.server_apply_workflow_op import server_apply_workflow_patch
+from server.server_json_codec import json_decode, JSONDecodeError
+from server.server_work_item_index import ServerWorkItemIndexes
+
+# Room fields a 'set' record may replace wholesale
+JOURNAL_SET_KEYS = ('board', 'timer', 'workflow', 'workItems')
+
+def server_apply_journal_record(state, record, index=None):
+    """
+    Re-apply one journal record to a room state.
+
+    index, if given, is the room's ServerWorkItemIndex; workflow_op records keep it in step.
+
+    Record kinds:
+        board_op    - {'op': applied board op}; replayed through server_apply_board_op
+        workflow_op - {'op': workflow patch}; replayed through server_apply_workflow_patch
+        set         - {'key': field, 'value': new value}; replaces one top-level field
+    """
+    kind = record.get('kind')
+
+    if kind == 'board_op':
+        board = state.setdefault('board', {})
+        _, error = server_apply_board_op(board, record.get('op'))
+        if error:
+            raise ValueError(error)
+        board['version'] = board.get('version', 0) + 1
+
+    elif kind == 'workflow_op':
+        workflow = state.setdefault('workflow', {})
+        server_apply_workflow_patch(workflow, state.setdefault('workItems', []), record.get('op') or {}, index=index)
+        workflow['version'] = workflow.get('version', 0) + 1
+
+    elif kind == 'set' and record.get('key') in JOURNAL_SET_KEYS:
+        state[record['key']] = record.get('value')
+
+    else:
+        raise ValueError(f"Unknown journal record: {kind}")
+
+def server_replay_room_journal(room_name, state, journal_lines):
+    """
+    Apply the journal records that are newer than a room's snapshot.
+
+    Args:
+        journal_lines (list): Encoded records, oldest first, as returned by storage.read_room
+
+    Returns:
+        int: Number of records applied
+    """
+    records = []
+    for line_number, line in enumerate(journal_lines, 1):
+        try:
+            records.append(json_decode(line))
+        except JSONDecodeError:
+            # A crash mid-append leaves a torn line; the records around it are intact
+            logging.warning(f"Ignoring incomplete journal record {line_number} for room '{room_name}'")
+
+    # Instances sharing a room append to one journal, so records can be out of order, and two
+    # conflicting changes can share a seq; apply each seq once (the first one written wins)
+    records.sort(key=lambda record: record.get('seq', 0))
+
+    # One work item index for the whole replay (rebuilt if a record replaces workItems)
+    indexes = ServerWorkItemIndexes()
+    applied = 0
+    for record in records:
+        seq = record.get('seq', 0)
+        if seq <= state.get('journalSeq', 0):
+            continue
+
+        try:
+            index = indexes.get(room_name, state) if record.get('kind') == 'workflow_op' else None
+            server_apply_journal_record(state, record, index)
+        except Exception as e:
+            logging.error(f"Skipping journal record {seq} for room '{room_name}': {e}")
+        state['journalSeq'] = seq
+        applied += 1
+
+    if applied:
+        logging.info(f"Replayed {applied} journal record(s) for room '{room_name}'")
+    return applied
@@ -0,0 +1,39 @@
+import asyncio
+import contextlib
+
+# One asyncio.Lock per room so a room's mutations never interleave across awaits,
+# while different rooms still run concurrently
+class ServerRoomLocks:
+    def __init__(self):
+        self._locks = {}   # room -> [asyncio.Lock, number of holders and waiters]
+
+    @property
+    def active_count(self):
+        return len(self._locks)
+
+    def locked(self, room):
+        entry = self._locks.get(room)
+        return entry is not None and entry[0].locked()
+
+    @contextlib.asynccontextmanager
+    async def hold(self, room):
+        """
+        Serialize access to one room's state.
+
+        The lock is not reentrant: code running under a room's lock must not
+        call anything that takes the same room's lock again.
+        """
+        entry = self._locks.get(room)
+        if entry is None:
+            entry = self._locks[room] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            # Drop the lock once nobody holds or waits for it, so idle rooms cost nothing
+            if entry[1] == 0 and self._locks.get(room) is entry:
+                del self._locks[room]
+
+room_locks = ServerRoomLocks()
@@ -0,0 +1,50 @@
+import bisect
+import hashlib
+import os
+from server.server_state import SHARD_VIRTUAL_NODES, WORKER_SOCKET_DIR
+
+# The router's room bus broker, which worker processes join to hear about each other's rooms
+WORKER_BUS_SOCKET = os.path.join(WORKER_SOCKET_DIR, 'bus.sock')
+
+def server_worker_socket_path(worker_index):
+    """Unix socket a worker process serves HTTP and WebSocket requests on."""
+    return os.path.join(WORKER_SOCKET_DIR, f'worker-{worker_index}.sock')
+
+def _hash(key):
+    return int.from_bytes(hashlib.md5(key.encode('utf-8')).digest()[:8], 'big')
+
+# Which worker process owns each room: a consistent hash ring, so adding a worker only moves ~1/N of the rooms
+class ServerRoomShards:
+    def __init__(self):
+        self.worker_index = 0
+        self.worker_count = 1
+        self._points = []    # sorted hash points on the ring
+        self._owners = []    # worker index for each point
+
+    def configure(self, worker_index, worker_count, virtual_nodes=SHARD_VIRTUAL_NODES):
+        """Set up the ring for worker_count workers; this process is worker_index."""
+        self.worker_index = worker_index
+        self.worker_count = worker_count
+        ring = sorted(
+            (_hash(f'worker-{worker}#{point}'), worker)
+            for worker in range(worker_count)
+            for point in range(virtual_nodes)
+        )
+        self._points = [point for point, _ in ring]
+        self._owners = [worker for _, worker in ring]
+
+    @property
+    def enabled(self):
+        return self.worker_count > 1
+
+    def owner(self, room):
+        """Index of the worker that owns a room."""
+        if not self.enabled:
+            return 0
+        position = bisect.bisect(self._points, _hash(room)) % len(self._points)
+        return self._owners[position]
+
+    def owns(self, room):
+        return self.owner(room) == self.worker_index
+
+room_shards = ServerRoomShards()
@@ -2,6 +2,7 @@ import logging
 import json
 from aiohttp import web
 import server.server_state as server_state
+from server.server_utils import encode_message, send_encoded
 
 async def server_handle_rps_message(ws, data, room_name, room_state):
     """Handle RPS game specific websocket messages."""
@@ -21,7 +22,7 @@ async def server_handle_rps_message(ws, data, room_name, room_state):
     
     else:
         logging.warning(f"Unknown RPS message type: {message_type}")
-        await ws.send_json({
+        await send_encoded(ws, encode_message({
             'type': 'error',
             'message': f'Unknown RPS message type: {message_type}'
-        })
+        }))
@@ -0,0 +1,26 @@
+import asyncio
+import logging
+import sys
+from server.server_state import ROOM_BUS_ADDRESS
+from server.server_room_bus import ServerRoomBusBroker
+
+async def server_start_bus_broker(address):
+    """Relay room bus events between server instances until cancelled."""
+    broker = ServerRoomBusBroker()
+    await broker.start(address)
+    try:
+        while True:
+            await asyncio.sleep(3600)
+    finally:
+        await broker.stop()
+
+def server_run_bus_broker(address=ROOM_BUS_ADDRESS):
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - broker - %(levelname)s - %(message)s')
+    try:
+        asyncio.run(server_start_bus_broker(address))
+    except KeyboardInterrupt:
+        logging.info("Room bus broker stopped")
+
+# For ROOM_BUS_BACKEND = 'socket': python -m server.server_run_bus_broker [address]
+if __name__ == '__main__':
+    server_run_bus_broker(sys.argv[1] if len(sys.argv) > 1 else ROOM_BUS_ADDRESS)
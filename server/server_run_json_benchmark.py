@@ -0,0 +1,69 @@
+import importlib
+import json
+import sys
+import timeit
+from server.server_create_default_room_state import server_create_default_room_state
+from server.server_json_codec import JSON_BACKEND
+
+def _sample_room(cards=300, items=200):
+    """A busy room: a full board, and work items with journals, in the default workflow."""
+    room_state = server_create_default_room_state()
+    room_state.pop('rps_game')
+    board = room_state['board']
+    for i in range(cards):
+        column = ('todo', 'inProgress', 'done')[i % 3]
+        board[column].append({'id': f'task-{i}', 'text': f'Card {i}: tidy up the release notes', 'details': 'Needs a second pair of eyes ' * 3})
+    board['taskIdCounter'] = cards
+    board['version'] = cards
+
+    state_ids = [state['id'] for state in room_state['workflow']['states']]
+    for i in range(items):
+        room_state['workItems'].append({
+            'id': f'item-{i}',
+            'title': f'Work item {i} – café menu translation',
+            'description': 'Describe the change, the risk and how it was verified. ' * 4,
+            'stateId': state_ids[i % len(state_ids)],
+            'assignee': f'user{i % 7}',
+            'journal': [{'text': f'Moved along ({n})', 'timestamp': 1760000000 + n} for n in range(3)]
+        })
+    return room_state
+
+def _sample_payloads():
+    room_state = _sample_room()
+    full_update = {'type': 'full_update', 'data': room_state, 'room': 'default', 'rooms': ['default']}
+    patch = {
+        'type': 'board_patch', 'room': 'default', 'version': 301, 'baseVersion': 300, 'opId': 'op-1',
+        'op': {'action': 'move', 'cardId': 'task-7', 'toColumn': 'done', 'toIndex': 0}
+    }
+    return {'room snapshot': room_state, 'full_update': full_update, 'board_patch': patch}
+
+def _backends():
+    """(name, encode, decode) for every JSON backend installed here."""
+    encoder = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False)
+    backends = [('json', lambda obj: encoder.encode(obj).encode('utf-8'), json.loads)]
+    for name in ('orjson', 'ujson'):
+        try:
+            module = importlib.import_module(name)
+        except ImportError:
+            continue
+        if name == 'orjson':
+            backends.append((name, module.dumps, module.loads))
+        else:
+            backends.append((name, lambda obj, dumps=module.dumps: dumps(obj, ensure_ascii=False).encode('utf-8'), module.loads))
+    return backends
+
+def server_run_json_benchmark(number=200):
+    """Time encoding and decoding real room payloads with each installed JSON backend."""
+    print(f"Server JSON backend: {JSON_BACKEND}")
+    for label, payload in _sample_payloads().items():
+        encoded = json.dumps(payload, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+        count = number if len(encoded) > 1024 else number * 50
+        print(f"\n{label} ({len(encoded)} bytes, {count} runs)")
+        for name, encode, decode in _backends():
+            encode_time = timeit.timeit(lambda: encode(payload), number=count) / count
+            decode_time = timeit.timeit(lambda: decode(encoded), number=count) / count
+            print(f"  {name:<7} encode {encode_time * 1e6:9.1f} µs   decode {decode_time * 1e6:9.1f} µs")
+
+# python -m server.server_run_json_benchmark [runs]
+if __name__ == '__main__':
+    server_run_json_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -1,5 +1,10 @@
 import asyncio
-from server.server_start_server import server_start_server
+from server.server_state import WORKER_PROCESSES, SERVER_PORT
+from server.server_start_server import server_start_server, server_add_page_routes
+from server.server_start_router import server_start_router
 
-def server_run_server():
-    asyncio.run(server_start_server())
+def server_run_server(port=SERVER_PORT):
+    if WORKER_PROCESSES > 1:
+        asyncio.run(server_start_router(server_add_page_routes, port=port))
+    else:
+        asyncio.run(server_start_server(port))
@@ -0,0 +1,80 @@
+import asyncio
+import logging
+import os
+import signal
+import sys
+from aiohttp import web
+import server.server_state as server_state
+from server.server_room_shards import room_shards, server_worker_socket_path, WORKER_BUS_SOCKET
+from server.server_load_room_states import server_load_room_states
+from server.server_badge_store import badge_store
+from server.server_add_api_routes import server_add_api_routes
+from server.server_persistence_engine import persistence_engine
+from server.server_room_evictor import room_evictor
+from server.server_schedule_running_timers import server_schedule_running_timers
+from server.server_room_bus import room_bus, ServerSocketBusTransport
+from server.server_handle_room_bus_event import server_handle_room_bus_event
+
+async def server_start_worker(worker_index, worker_count):
+    """Serve the rooms this worker owns on its Unix socket until cancelled."""
+    room_shards.configure(worker_index, worker_count)
+
+    # The router prepared storage before starting the workers
+    server_state.rooms_state.update(server_load_room_states(prepare_storage=False))
+    try:
+        badge_store.load()
+    except Exception as e:
+        logging.error(f"Failed to initialize badge data: {e}")
+
+    app = web.Application()
+    server_add_api_routes(app)
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    socket_path = server_worker_socket_path(worker_index)
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+
+    # Stop cleanly (flushing saves) when the router terminates us
+    main_task = asyncio.current_task()
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, main_task.cancel)
+
+    try:
+        # Workers serve different rooms, so only room list and deletion events cross the bus
+        await room_bus.start(worker_index, server_handle_room_bus_event,
+                             ServerSocketBusTransport(f'unix:{WORKER_BUS_SOCKET}'), shares_rooms=False)
+
+        await persistence_engine.start()
+        await room_evictor.start()
+        await server_schedule_running_timers()
+
+        # The socket appears last: the router treats it as the worker being ready
+        site = web.UnixSite(runner, socket_path)
+        await site.start()
+        logging.info(f"Worker {worker_index}/{worker_count} serving on {socket_path}")
+
+        while True:
+            await asyncio.sleep(3600)
+    finally:
+        await room_evictor.stop()
+        await persistence_engine.stop()
+        await badge_store.flush()
+        await room_bus.stop()
+        await runner.cleanup()
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+
+def server_run_worker(worker_index, worker_count):
+    # force: importing the server modules may already have set up default logging
+    logging.basicConfig(level=logging.DEBUG, format=f'%(asctime)s - worker {worker_index} - %(levelname)s - %(message)s', force=True)
+    try:
+        asyncio.run(server_start_worker(worker_index, worker_count))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
+    except Exception as e:
+        logging.error(f"Worker {worker_index} error: {e}")
+        raise
+
+# Started by the router: python -m server.server_run_worker <index> <count>
+if __name__ == '__main__':
+    server_run_worker(int(sys.argv[1]), int(sys.argv[2]))
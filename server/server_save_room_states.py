@@ -1,51 +1,76 @@
-import json
+import asyncio
 import logging
-import os
-from server.server_state import rooms_state
+from server.server_state import rooms_state, dirty_rooms
+from server.server_storage import storage
 
-async def server_save_room_states():
-    """Save each room's state to its own file."""
+def server_serialize_room_state(state):
+    """Build a JSON-serializable copy of a room state, dropping live connection objects."""
+    serializable_state = {}
+
+    # Only copy JSON-serializable parts
+    if 'workflow' in state:
+        serializable_state['workflow'] = state['workflow']
+
+    if 'workItems' in state:
+        serializable_state['workItems'] = state['workItems']
+
+    if 'board' in state:
+        serializable_state['board'] = state['board']
+
+    if 'timer' in state:
+        serializable_state['timer'] = state['timer']
+
+    # Lets startup skip journal records this snapshot already contains
+    serializable_state['journalSeq'] = state.get('journalSeq', 0)
+
+    if 'rps_game' in state:
+        # Ensure RPS state is serializable (exclude any websocket objects)
+        serializable_rps = {k: v for k, v in state.get('rps_game', {}).items()
+                        if k not in ('connections', 'websockets', 'player_connections')}
+        serializable_state['rps_game'] = serializable_rps
+
+    return serializable_state
+
+async def server_save_room_states(on_snapshot=None):
+    """
+    Save a snapshot of every dirty room to the storage backend.
+
+    Args:
+        on_snapshot (callable, optional): Called with each room name as its snapshot is
+            encoded, so journal records the snapshot already covers can be dropped
+    """
     try:
-        # Create the states directory if it doesn't exist
-        os.makedirs('states', exist_ok=True)
-        
-        # Save each room state to a separate file
-        for room_name, state in rooms_state.items():
+        # Drain the dirty set up front so rooms marked during the save are kept for the next one
+        pending_rooms = list(dirty_rooms)
+        dirty_rooms.clear()
+
+        if not pending_rooms:
+            logging.debug("No dirty rooms to save")
+            return
+
+        # Encode on the event loop so the snapshot can't change underneath the writer thread
+        encoded_rooms = []
+        for room_name in pending_rooms:
+            state = rooms_state.get(room_name)
+            if state is None:
+                # Room was deleted (or never created) since it was marked
+                continue
+
             try:
-                # Create a serializable copy of the state
-                serializable_state = {}
-                
-                # Only copy JSON-serializable parts
-                if 'workflow' in state:
-                    serializable_state['workflow'] = state['workflow']
-                
-                if 'workItems' in state:
-                    serializable_state['workItems'] = state['workItems']
-                
-                if 'board' in state:
-                    serializable_state['board'] = state['board']
-                
-                if 'timer' in state:
-                    serializable_state['timer'] = state['timer']
-                
-                if 'rps_game' in state:
-                    # Ensure RPS state is serializable (exclude any websocket objects)
-                    serializable_rps = {k: v for k, v in state.get('rps_game', {}).items() 
-                                    if k not in ('connections', 'websockets', 'player_connections')}
-                    serializable_state['rps_game'] = serializable_rps
-                
-                # Write to file - using room name as filename
-                file_path = f'states/{room_name}.json'
-                with open(file_path, 'w') as f:
-                    json.dump(serializable_state, f, indent=2)
-                
-                logging.debug(f"Saved state for room '{room_name}' to {file_path}")
-                
+                encoded_rooms.append((room_name, storage.encode_room_snapshot(server_serialize_room_state(state))))
+                if on_snapshot is not None:
+                    on_snapshot(room_name)
             except Exception as e:
-                logging.error(f"Error saving state for room '{room_name}': {e}")
-        
-        logging.debug("All room states saved successfully")
-        
+                logging.error(f"Error serializing state for room '{room_name}': {e}")
+
+        # Do the blocking I/O off the event loop
+        failed_rooms = await asyncio.to_thread(storage.write_room_snapshots, encoded_rooms)
+
+        # Keep failed rooms dirty so the next save retries them
+        dirty_rooms.update(failed_rooms)
+
+        logging.debug(f"Saved {len(encoded_rooms) - len(failed_rooms)} dirty room state(s)")
+
     except Exception as e:
         logging.error(f"Error in save_room_states: {e}", exc_info=True)
         raise
@@ -0,0 +1,28 @@
+import logging
+from server.server_state import rooms_state, deleted_rooms
+from server.server_timer_scheduler import timer_scheduler
+
+async def server_schedule_running_timers():
+    """
+    Schedule expiry for the room timers already running at startup.
+
+    Called once, after rooms are loaded. From then on timer_scheduler keeps each
+    room's expiry in step as timers are started, stopped or changed; each running
+    timer gets one callback at its endTime instead of being polled. Clients count
+    down from endTime themselves, so nothing is broadcast until a timer expires.
+    """
+    try:
+        scheduled = 0
+        for room in list(rooms_state.keys()):
+            room_state = rooms_state[room]
+            if room in deleted_rooms or not room_state:
+                continue
+
+            timer_state = room_state.get('timer')
+            if timer_state and timer_state.get('isRunning'):
+                timer_scheduler.sync_room(room, timer_state)
+                scheduled += 1
+
+        logging.info(f"Scheduled {scheduled} running room timer(s)")
+    except Exception as e:
+        logging.error(f"Timer scheduling error: {e}")
@@ -0,0 +1,359 @@
+import logging
+import os
+import sqlite3
+import threading
+from server.server_state import SQLITE_DB_FILE, STATE_FSYNC_FILE, SNAPSHOT_FORMAT
+from server.server_json_codec import json_encode_str, json_decode, JSONDecodeError
+from server.server_msgpack_codec import msgpack_encode, msgpack_decode
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rooms (
+    name TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    journal_seq INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS work_items (
+    room TEXT NOT NULL,
+    id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (room, id)
+);
+CREATE TABLE IF NOT EXISTS room_journal (
+    room TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    record TEXT NOT NULL,
+    PRIMARY KEY (room, seq)
+);
+CREATE TABLE IF NOT EXISTS badge_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS badge_users (
+    id TEXT PRIMARY KEY,
+    name_lower TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS badge_users_name ON badge_users (name_lower);
+CREATE TABLE IF NOT EXISTS badges (
+    id TEXT PRIMARY KEY,
+    category TEXT,
+    position INTEGER NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS badges_category ON badges (category);
+CREATE TABLE IF NOT EXISTS badge_categories (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS badge_activity (
+    seq INTEGER PRIMARY KEY,
+    data TEXT NOT NULL
+);
+"""
+
+# Row tables for the badge document: list key -> (table, indexed column, how to read it from a row)
+BADGE_TABLES = {
+    'users': ('badge_users', 'name_lower', lambda row: str(row.get('name', '')).lower()),
+    'badges': ('badges', 'category', lambda row: row.get('category')),
+    'categories': ('badge_categories', 'name', lambda row: str(row.get('name', '')))
+}
+
+def _decode_value(data):
+    # MessagePack values are stored as BLOBs and JSON as TEXT, so rows in either format can be read
+    return msgpack_decode(data) if isinstance(data, bytes) else json_decode(data)
+
+def _row_key(row, position, seen):
+    # Rows are keyed by their id; a missing or repeated id falls back to the list position
+    key = row.get('id') if isinstance(row, dict) else None
+    key = str(key) if key is not None else f'#{position}'
+    if key in seen:
+        key = f'#{position}'
+    seen.add(key)
+    return key
+
+class ServerSqliteStorage:
+    """
+    Optional backend: one SQLite database in WAL mode with a row per room, work item,
+    journal record, badge user, badge, category and activity.
+
+    Saves only touch rows whose encoded JSON changed since the last save, inside one
+    transaction per room (or per badge save). With SNAPSHOT_FORMAT = 'msgpack' rows are
+    MessagePack BLOBs instead; journal records stay JSON.
+    """
+    name = 'sqlite'
+
+    def __init__(self, db_file=SQLITE_DB_FILE, snapshot_format=SNAPSHOT_FORMAT):
+        from server.server_storage import server_snapshot_format
+        self.db_file = db_file
+        self._encode = msgpack_encode if server_snapshot_format(snapshot_format) == 'msgpack' else json_encode_str
+        self._conn = None
+        # Calls arrive from asyncio.to_thread workers; the connection is used by one at a time
+        self._lock = threading.RLock()
+        self._row_cache = {}   # (table, scope) -> {key: (position, data)} as last written
+
+    def _connect(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_file) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.db_file, check_same_thread=False, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(f"PRAGMA synchronous={'FULL' if STATE_FSYNC_FILE else 'NORMAL'}")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def prepare(self):
+        with self._lock:
+            conn = self._connect()
+            empty = conn.execute('SELECT NOT EXISTS (SELECT 1 FROM rooms) AND NOT EXISTS (SELECT 1 FROM room_journal)').fetchone()[0]
+            has_badges = conn.execute("SELECT 1 FROM badge_meta WHERE key = 'document'").fetchone()
+        if empty or not has_badges:
+            self._import_json_files(import_rooms=bool(empty), import_badges=not has_badges)
+
+    def _import_json_files(self, import_rooms, import_badges):
+        """First start on SQLite: bring over whatever the JSON backend had saved."""
+        from server.server_storage import ServerJsonStorage
+        json_storage = ServerJsonStorage()
+        if import_rooms and os.path.isdir(json_storage.states_dir):
+            for room_name in json_storage.list_rooms():
+                try:
+                    snapshot, journal_lines = json_storage.read_room(room_name)
+                    if snapshot is not None:
+                        self.write_room_snapshots([(room_name, self.encode_room_snapshot(snapshot))])
+                    records = []
+                    for line in journal_lines:
+                        try:
+                            records.append((json_decode(line)['seq'], line))
+                        except (JSONDecodeError, KeyError):
+                            break
+                    self.append_journal([(room_name, records)])
+                    logging.info(f"Imported room '{room_name}' into {self.db_file}")
+                except Exception as e:
+                    logging.error(f"Error importing room '{room_name}' into SQLite: {e}")
+        if import_badges:
+            try:
+                badge_data = json_storage.load_badges()
+                if badge_data is not None:
+                    self.write_badges(self.encode_badges(badge_data))
+                    logging.info(f"Imported badge data into {self.db_file}")
+            except Exception as e:
+                logging.error(f"Error importing badge data into SQLite: {e}")
+
+    # Rooms
+
+    def list_rooms(self):
+        with self._lock:
+            rows = self._connect().execute(
+                'SELECT name FROM rooms UNION SELECT DISTINCT room FROM room_journal'
+            ).fetchall()
+        return [name for (name,) in rows]
+
+    def read_room(self, room_name):
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute('SELECT state, journal_seq FROM rooms WHERE name = ?', (room_name,)).fetchone()
+            items = conn.execute(
+                'SELECT id, position, data FROM work_items WHERE room = ? ORDER BY position', (room_name,)
+            ).fetchall()
+            journal = conn.execute(
+                'SELECT record FROM room_journal WHERE room = ? ORDER BY seq', (room_name,)
+            ).fetchall()
+
+        snapshot = None
+        if row is not None:
+            snapshot = _decode_value(row[0])
+            snapshot['journalSeq'] = row[1]
+            snapshot['workItems'] = [_decode_value(data) for _, _, data in items]
+            # Remember what's on disk so the next save only writes what changed
+            self._row_cache[('work_items', room_name)] = {key: (position, data) for key, position, data in items}
+
+        return snapshot, [record + '\n' for (record,) in journal]
+
+    def encode_room_snapshot(self, state):
+        state = dict(state)
+        work_items = state.pop('workItems', None) or []
+        journal_seq = state.pop('journalSeq', 0)
+        seen = set()
+        items = [
+            (_row_key(item, position, seen), position, self._encode(item))
+            for position, item in enumerate(work_items)
+        ]
+        return self._encode(state), items, journal_seq
+
+    def _sync_rows(self, conn, table, scope_column, scope, rows, extra_column=None):
+        """Upsert rows whose position or data changed and delete rows that are gone."""
+        cache_key = (table, scope)
+        cached = self._row_cache.get(cache_key)
+        if cached is None:
+            where = f' WHERE {scope_column} = ?' if scope_column else ''
+            params = (scope,) if scope_column else ()
+            cached = {key: (position, data) for key, position, data in
+                      conn.execute(f'SELECT id, position, data FROM {table}{where}', params)}
+
+        current = {}
+        changed = []
+        for row in rows:
+            key, position, data = row[0], row[1], row[2]
+            current[key] = (position, data)
+            if cached.get(key) != (position, data):
+                changed.append(row)
+
+        removed = [key for key in cached if key not in current]
+
+        columns = ['id', 'position', 'data'] + ([extra_column] if extra_column else [])
+        if scope_column:
+            columns.insert(0, scope_column)
+            changed = [(scope, *row) for row in changed]
+            removed = [(scope, key) for key in removed]
+            delete_sql = f'DELETE FROM {table} WHERE {scope_column} = ? AND id = ?'
+        else:
+            removed = [(key,) for key in removed]
+            delete_sql = f'DELETE FROM {table} WHERE id = ?'
+
+        placeholders = ', '.join('?' for _ in columns)
+        if changed:
+            conn.executemany(f'INSERT OR REPLACE INTO {table} ({", ".join(columns)}) VALUES ({placeholders})', changed)
+        if removed:
+            conn.executemany(delete_sql, removed)
+        return cache_key, current
+
+    def write_room_snapshots(self, encoded_rooms):
+        failed_rooms = []
+        with self._lock:
+            conn = self._connect()
+            for room_name, (state_json, items, journal_seq) in encoded_rooms:
+                try:
+                    conn.execute('BEGIN')
+                    saved = conn.execute('SELECT journal_seq FROM rooms WHERE name = ?', (room_name,)).fetchone()
+                    if saved is not None and saved[0] > journal_seq:
+                        # Another instance sharing the room saved a newer snapshot; its rows may differ from our cache
+                        conn.execute('ROLLBACK')
+                        self._row_cache.pop(('work_items', room_name), None)
+                        logging.info(f"Kept saved state for room '{room_name}': it is newer (journal record {saved[0]} > {journal_seq})")
+                        continue
+                    conn.execute(
+                        'INSERT OR REPLACE INTO rooms (name, state, journal_seq) VALUES (?, ?, ?)',
+                        (room_name, state_json, journal_seq)
+                    )
+                    cache_key, rows = self._sync_rows(conn, 'work_items', 'room', room_name, items)
+                    # The snapshot covers these journal records
+                    conn.execute('DELETE FROM room_journal WHERE room = ? AND seq <= ?', (room_name, journal_seq))
+                    conn.execute('COMMIT')
+                    self._row_cache[cache_key] = rows
+                    logging.debug(f"Saved state for room '{room_name}' to {self.db_file}")
+                except Exception as e:
+                    if conn.in_transaction:
+                        conn.execute('ROLLBACK')
+                    self._row_cache.pop(('work_items', room_name), None)
+                    failed_rooms.append(room_name)
+                    logging.error(f"Error saving state for room '{room_name}': {e}")
+        return failed_rooms
+
+    def append_journal(self, batches):
+        failed_rooms = []
+        with self._lock:
+            conn = self._connect()
+            try:
+                # One transaction (and one WAL sync) for the whole group
+                conn.execute('BEGIN')
+                for room_name, records in batches:
+                    conn.executemany(
+                        'INSERT OR REPLACE INTO room_journal (room, seq, record) VALUES (?, ?, ?)',
+                        [(room_name, seq, line.rstrip('\n')) for seq, line in records]
+                    )
+                conn.execute('COMMIT')
+            except Exception as e:
+                if conn.in_transaction:
+                    conn.execute('ROLLBACK')
+                failed_rooms = [room_name for room_name, _ in batches]
+                logging.error(f"Error appending to room journal: {e}")
+        return failed_rooms
+
+    def delete_room(self, room_name):
+        with self._lock:
+            conn = self._connect()
+            conn.execute('BEGIN')
+            for table, column in (('rooms', 'name'), ('work_items', 'room'), ('room_journal', 'room')):
+                conn.execute(f'DELETE FROM {table} WHERE {column} = ?', (room_name,))
+            conn.execute('COMMIT')
+            self._row_cache.pop(('work_items', room_name), None)
+        logging.info(f"Deleted saved state for room '{room_name}' from {self.db_file}")
+
+    # Badges
+
+    def load_badges(self):
+        with self._lock:
+            conn = self._connect()
+            document = conn.execute("SELECT value FROM badge_meta WHERE key = 'document'").fetchone()
+            if document is None:
+                return None
+
+            badge_data = _decode_value(document[0])
+            for list_key, (table, _, _) in BADGE_TABLES.items():
+                rows = conn.execute(f'SELECT id, position, data FROM {table} ORDER BY position').fetchall()
+                badge_data[list_key] = [_decode_value(data) for _, _, data in rows]
+                self._row_cache[(table, None)] = {key: (position, data) for key, position, data in rows}
+
+            activity = conn.execute('SELECT seq, data FROM badge_activity ORDER BY seq DESC').fetchall()
+            badge_data['activityFeed'] = [_decode_value(data) for _, data in activity]
+            self._row_cache[('badge_activity', None)] = {seq: data for seq, data in activity}
+        return badge_data
+
+    def encode_badges(self, badge_data):
+        badge_data = dict(badge_data)
+        payload = {}
+        for list_key, (table, _, index_value) in BADGE_TABLES.items():
+            seen = set()
+            payload[list_key] = [
+                (_row_key(row, position, seen), position, self._encode(row), index_value(row))
+                for position, row in enumerate(badge_data.pop(list_key, None) or [])
+            ]
+        activity = badge_data.pop('activityFeed', None) or []
+        payload['activityFeed'] = [
+            (activity_entry.get('seq', len(activity) - position), self._encode(activity_entry))
+            for position, activity_entry in enumerate(activity)
+        ]
+        # Anything else in the document is stored as-is
+        payload['document'] = self._encode(badge_data)
+        return payload
+
+    def write_badges(self, payload):
+        with self._lock:
+            conn = self._connect()
+            new_cache = {}
+            try:
+                conn.execute('BEGIN')
+                conn.execute(
+                    "INSERT OR REPLACE INTO badge_meta (key, value) VALUES ('document', ?)", (payload['document'],)
+                )
+                for list_key, (table, extra_column, _) in BADGE_TABLES.items():
+                    cache_key, rows = self._sync_rows(conn, table, None, None, payload[list_key], extra_column)
+                    new_cache[cache_key] = rows
+
+                # Activity is append-mostly: insert new entries, delete trimmed or removed ones
+                cached = self._row_cache.get(('badge_activity', None))
+                if cached is None:
+                    cached = dict(conn.execute('SELECT seq, data FROM badge_activity'))
+                current = dict(payload['activityFeed'])
+                conn.executemany(
+                    'INSERT OR REPLACE INTO badge_activity (seq, data) VALUES (?, ?)',
+                    [(seq, data) for seq, data in current.items() if cached.get(seq) != data]
+                )
+                conn.executemany(
+                    'DELETE FROM badge_activity WHERE seq = ?', [(seq,) for seq in cached if seq not in current]
+                )
+                conn.execute('COMMIT')
+            except Exception:
+                if conn.in_transaction:
+                    conn.execute('ROLLBACK')
+                # Re-read on the next save rather than trust a cache from a failed transaction
+                for table, _, _ in BADGE_TABLES.values():
+                    self._row_cache.pop((table, None), None)
+                self._row_cache.pop(('badge_activity', None), None)
+                raise
+
+            self._row_cache.update(new_cache)
+            self._row_cache[('badge_activity', None)] = current
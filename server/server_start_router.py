@@ -0,0 +1,217 @@
+import asyncio
+import logging
+import os
+import signal
+import subprocess
+import sys
+import aiohttp
+from aiohttp import web
+from server.server_state import WORKER_PROCESSES, WORKER_SOCKET_DIR, WORKER_START_TIMEOUT, SERVER_PORT, WS_BINARY_PROTOCOL, get_project_root
+from server.server_room_shards import room_shards, server_worker_socket_path, WORKER_BUS_SOCKET
+from server.server_storage import storage
+from server.server_room_bus import ServerRoomBusBroker
+from server.server_compressed_websocket import ServerWebSocketResponse, server_compression_stats
+from server.server_json_codec import json_decode, server_json_response
+
+# Request headers that describe the client's connection to us, not the request itself
+HOP_BY_HOP_HEADERS = {'host', 'connection', 'upgrade', 'keep-alive', 'transfer-encoding', 'content-length',
+                      'sec-websocket-key', 'sec-websocket-version', 'sec-websocket-extensions'}
+
+# The worker processes and a connection pool to each one's Unix socket
+class ServerWorkerPool:
+    def __init__(self, worker_count):
+        self.worker_count = worker_count
+        self.restart_count = 0
+        self._processes = {}   # worker index -> Popen
+        self._sessions = {}    # worker index -> ClientSession over the worker's socket
+        self._stopping = False
+
+    def _spawn(self, worker_index):
+        socket_path = server_worker_socket_path(worker_index)
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        self._processes[worker_index] = subprocess.Popen(
+            [sys.executable, '-m', 'server.server_run_worker', str(worker_index), str(self.worker_count)],
+            cwd=get_project_root()
+        )
+
+    async def _wait_ready(self, worker_index):
+        socket_path = server_worker_socket_path(worker_index)
+        deadline = asyncio.get_running_loop().time() + WORKER_START_TIMEOUT
+        while not os.path.exists(socket_path):
+            if self._processes[worker_index].poll() is not None:
+                raise RuntimeError(f"Worker {worker_index} exited during startup")
+            if asyncio.get_running_loop().time() > deadline:
+                raise RuntimeError(f"Worker {worker_index} did not start within {WORKER_START_TIMEOUT}s")
+            await asyncio.sleep(0.05)
+
+    async def start(self):
+        for worker_index in range(self.worker_count):
+            self._spawn(worker_index)
+        for worker_index in range(self.worker_count):
+            await self._wait_ready(worker_index)
+            self._sessions[worker_index] = aiohttp.ClientSession(
+                connector=aiohttp.UnixConnector(path=server_worker_socket_path(worker_index))
+            )
+        logging.info(f"Started {self.worker_count} worker processes")
+
+    def session(self, worker_index):
+        return self._sessions[worker_index]
+
+    async def watch(self):
+        """Restart workers that exit unexpectedly; their rooms reload from storage."""
+        while not self._stopping:
+            await asyncio.sleep(1)
+            for worker_index, process in list(self._processes.items()):
+                if process.poll() is None or self._stopping:
+                    continue
+                logging.error(f"Worker {worker_index} exited with code {process.returncode}; restarting it")
+                self.restart_count += 1
+                self._spawn(worker_index)
+                try:
+                    await self._wait_ready(worker_index)
+                except RuntimeError as e:
+                    logging.error(f"Could not restart worker {worker_index}: {e}")
+
+    async def stop(self):
+        self._stopping = True
+        for session in self._sessions.values():
+            await session.close()
+        # Workers flush their rooms and badges on SIGTERM
+        for process in self._processes.values():
+            if process.poll() is None:
+                process.send_signal(signal.SIGTERM)
+        for worker_index, process in self._processes.items():
+            try:
+                await asyncio.to_thread(process.wait, WORKER_START_TIMEOUT)
+            except subprocess.TimeoutExpired:
+                logging.error(f"Worker {worker_index} did not stop; killing it")
+                process.kill()
+        logging.info("All worker processes stopped")
+
+    def stats(self):
+        return {
+            'workers': self.worker_count,
+            'running': sum(1 for process in self._processes.values() if process.poll() is None),
+            'restarts': self.restart_count
+        }
+
+async def _pump(source, target):
+    """Copy WebSocket messages one way until either side closes."""
+    async for msg in source:
+        if msg.type == aiohttp.WSMsgType.TEXT:
+            # Client-side text frames arrive as bytes (see ServerWebSocketResponse), worker-side as str
+            data = msg.data
+            await target.send_frame(data if isinstance(data, bytes) else data.encode('utf-8'), aiohttp.WSMsgType.TEXT)
+        elif msg.type == aiohttp.WSMsgType.BINARY:
+            await target.send_bytes(msg.data)
+        elif msg.type in (aiohttp.WSMsgType.CLOSE, aiohttp.WSMsgType.ERROR):
+            break
+
+async def _proxy_websocket(request, session, binary_protocol=None):
+    ws = ServerWebSocketResponse(binary_protocol=binary_protocol)
+    await ws.prepare(request)
+    try:
+        # The worker speaks whichever subprotocol the client and the router agreed on
+        protocols = (ws.ws_protocol,) if ws.ws_protocol else ()
+        async with session.ws_connect(f'http://worker{request.path_qs}', protocols=protocols) as upstream:
+            pumps = [
+                asyncio.create_task(_pump(ws, upstream)),
+                asyncio.create_task(_pump(upstream, ws))
+            ]
+            try:
+                await asyncio.wait(pumps, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                for pump in pumps:
+                    pump.cancel()
+                await asyncio.gather(*pumps, return_exceptions=True)
+    except (aiohttp.ClientError, ConnectionError) as e:
+        logging.error(f"WebSocket proxy error for {request.path_qs}: {e}")
+    finally:
+        await ws.close()
+    return ws
+
+async def _proxy_http(request, session):
+    headers = {name: value for name, value in request.headers.items() if name.lower() not in HOP_BY_HOP_HEADERS}
+    try:
+        async with session.request(request.method, f'http://worker{request.path_qs}',
+                                   headers=headers, data=await request.read()) as response:
+            body = await response.read()
+            return web.Response(body=body, status=response.status,
+                                headers={'Content-Type': response.headers.get('Content-Type', 'application/octet-stream')})
+    except (aiohttp.ClientError, ConnectionError) as e:
+        logging.error(f"HTTP proxy error for {request.path_qs}: {e}")
+        return web.Response(text="Worker unavailable", status=502)
+
+async def server_start_router(add_page_routes, worker_count=WORKER_PROCESSES, port=SERVER_PORT):
+    """
+    Run the multi-process front end on the given port.
+
+    Pages and static files are served here. Room connections and room APIs are
+    proxied to the worker that owns the room; badges go to worker 0.
+    """
+    os.makedirs(WORKER_SOCKET_DIR, exist_ok=True)
+    room_shards.configure(0, worker_count)
+
+    # Done once here so the workers don't race to create tables or import old files
+    storage.prepare()
+
+    broker = ServerRoomBusBroker()
+    await broker.start(f'unix:{WORKER_BUS_SOCKET}')
+    pool = ServerWorkerPool(worker_count)
+    runner = None
+    watcher = None
+
+    async def room_socket_handler(request):
+        room = request.query.get('room', 'default')
+        return await _proxy_websocket(request, pool.session(room_shards.owner(room)), WS_BINARY_PROTOCOL)
+
+    async def badge_socket_handler(request):
+        return await _proxy_websocket(request, pool.session(0))
+
+    async def room_api_handler(request):
+        return await _proxy_http(request, pool.session(room_shards.owner(request.match_info['room'])))
+
+    async def badge_api_handler(request):
+        return await _proxy_http(request, pool.session(0))
+
+    async def metrics_handler(request):
+        async def worker_metrics(worker_index):
+            try:
+                async with pool.session(worker_index).get('http://worker/api/metrics') as response:
+                    return json_decode(await response.read())
+            except Exception as e:
+                return {'error': str(e)}
+        workers = await asyncio.gather(*(worker_metrics(worker_index) for worker_index in range(worker_count)))
+        return server_json_response({
+            'router': {**pool.stats(), 'busRelayed': broker.relayed_count, 'compression': server_compression_stats()},
+            'workers': workers
+        })
+
+    try:
+        await pool.start()
+        watcher = asyncio.create_task(pool.watch())
+
+        app = web.Application()
+        add_page_routes(app)
+        app.router.add_get('/ws', room_socket_handler)
+        app.router.add_get('/badge-ws', badge_socket_handler)
+        app.router.add_get('/api/metrics', metrics_handler)
+        app.router.add_get('/api/rooms/{room}/{tail:.*}', room_api_handler)
+        app.router.add_get('/api/badges{tail:.*}', badge_api_handler)
+
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, 'localhost', port)
+        await site.start()
+        logging.info(f"Router running on http://localhost:{port} with {worker_count} worker processes")
+
+        while True:
+            await asyncio.sleep(3600)
+    finally:
+        if watcher is not None:
+            watcher.cancel()
+        if runner is not None:
+            await runner.cleanup()
+        await pool.stop()
+        await broker.stop()
@@ -2,11 +2,16 @@ import asyncio
 from aiohttp import web
 import logging
 import os
-from server.server_websocket_handler import server_websocket_handler
 from server.server_index_handler import server_index_handler
-from server.server_update_timer import server_update_timer
-from server.server_badge_websocket_handler import server_badge_websocket_handler
+from server.server_schedule_running_timers import server_schedule_running_timers
 from server.server_badge_page_handler import server_badge_page_handler
+from server.server_persistence_engine import persistence_engine
+from server.server_room_evictor import room_evictor
+from server.server_badge_store import badge_store
+from server.server_add_api_routes import server_add_api_routes
+from server.server_state import SERVER_PORT
+from server.server_room_bus import room_bus, server_create_bus_transport, server_room_bus_member
+from server.server_handle_room_bus_event import server_handle_room_bus_event
 
 # Component handlers
 async def serve_component(request, component_name):
@@ -30,13 +35,8 @@ async def serve_rps(request):
     """Handler for RPS Game component."""
     return await serve_component(request, 'rps')
 
-async def server_start_server():
-    app = web.Application()
-    
-    # WebSocket routes
-    app.router.add_get('/ws', server_websocket_handler)
-    app.router.add_get('/badge-ws', server_badge_websocket_handler)
-    
+def server_add_page_routes(app):
+    """Add the main page, component page and static file routes (no room state)."""
     # Main page route
     app.router.add_get('/', server_index_handler)
     
@@ -61,17 +61,45 @@ async def server_start_server():
     
     app.router.add_static('/components/badges/static', 
                          'components/badges/static')
+
+async def server_start_server(port=SERVER_PORT):
+    app = web.Application()
+    
+    server_add_page_routes(app)
+    
+    # WebSocket and API routes
+    server_add_api_routes(app)
     
     runner = web.AppRunner(app)
     await runner.setup()
-    site = web.TCPSite(runner, 'localhost', 8080)
+    site = web.TCPSite(runner, 'localhost', port)
+    
+    # Share rooms with other server instances (in-process only unless ROOM_BUS_BACKEND is 'socket')
+    try:
+        await room_bus.start(server_room_bus_member(), server_handle_room_bus_event, server_create_bus_transport())
+    except Exception as e:
+        logging.error(f"Could not join the room bus; serving rooms from this instance only: {e}")
+    
+    # Start the background room state writer
+    await persistence_engine.start()
+    
+    # Save and drop rooms that nobody has been in for a while
+    await room_evictor.start()
     
-    # Start the timer update task
-    asyncio.create_task(server_update_timer())
+    # Schedule expiry callbacks for timers that were running when the rooms were saved
+    await server_schedule_running_timers()
     
     await site.start()
-    logging.info("======== Running on http://localhost:8080 ========")
+    logging.info(f"======== Running on http://localhost:{port} ========")
     logging.info("(Press CTRL+C to quit)")
     
-    while True:
-        await asyncio.sleep(3600)
+    try:
+        while True:
+            await asyncio.sleep(3600)
+    finally:
+        # Flush pending room and badge saves before shutting down
+        await room_evictor.stop()
+        await persistence_engine.stop()
+        await badge_store.flush()
+        await room_bus.stop()
+        await runner.cleanup()
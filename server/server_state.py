@@ -6,6 +6,101 @@ from collections import defaultdict
 STORAGE_FILE = 'room_states.json'
 BADGE_STORAGE_FILE = 'badges.json'
 
+# Write-behind persistence: changes to a room within this window (seconds) are merged into one write
+SAVE_COALESCE_WINDOW = 0.25
+
+# Room journal: mutations are appended to states/{room}.journal (one fsync per file per write-behind
+# cycle) and folded into states/{room}.json once a room has this many records or its oldest
+# un-compacted record is this old (seconds), and at shutdown
+JOURNAL_ENABLED = True
+JOURNAL_COMPACT_RECORDS = 500
+JOURNAL_COMPACT_INTERVAL = 300
+
+# Room state files are replaced atomically; these control how durable each replace is
+STATE_FSYNC_FILE = True   # fsync the new file before renaming it into place
+STATE_FSYNC_DIR = True    # fsync the states directory after the rename
+
+# Where room state and badge data are kept:
+#   'json'   - states/{room}.json snapshots, states/{room}.journal logs and data/badges.json
+#   'sqlite' - one SQLite database (WAL mode) with a row per room, work item and badge record;
+#              imports the JSON files on first start
+STORAGE_BACKEND = 'json'
+SQLITE_DB_FILE = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'storage.sqlite3')
+
+# How room snapshots and badge data are encoded on disk (journals stay JSON lines):
+#   'json'    - compact JSON
+#   'msgpack' - MessagePack: smaller files and faster loads with the msgpack package installed;
+#               without it a pure-Python codec is used, which is smaller but slower than JSON
+# Existing snapshots in the other format still load and are rewritten in this one on their next save.
+SNAPSHOT_FORMAT = 'json'
+
+# Room cache: rooms are loaded on first join. A room with no connections is saved and dropped
+# from memory once it has been idle this long (seconds), or sooner - least recently used first -
+# while more than ROOM_CACHE_MAX_ROOMS rooms are loaded. Checked every ROOM_EVICT_INTERVAL seconds.
+ROOM_IDLE_EVICT_SECONDS = 600
+ROOM_CACHE_MAX_ROOMS = 200
+ROOM_EVICT_INTERVAL = 30
+
+# Room list broadcasts only go out when the list changes, at most once per this many seconds
+ROOM_LIST_BROADCAST_DELAY = 0.1
+
+# Multi-process mode: with WORKER_PROCESSES > 1, server.py runs a router on port 8080 that starts
+# that many worker processes and sends each room's connections to the worker that owns the room
+# (consistent hashing with SHARD_VIRTUAL_NODES points per worker). Workers listen on Unix sockets
+# in WORKER_SOCKET_DIR and tell each other about room list changes and deletions over a bus socket
+# there. 1 runs everything in this process, as before.
+WORKER_PROCESSES = 1
+SHARD_VIRTUAL_NODES = 64
+WORKER_SOCKET_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'workers')
+WORKER_START_TIMEOUT = 15     # seconds to wait for a worker's socket to appear
+WORKER_BUS_TIMEOUT = 5        # seconds to wait for another process on the room bus to answer a request
+
+# Room bus: carries room changes, room messages, deletions and room list changes between server
+# processes, so several server.py instances can serve the same rooms. Each instance applies the
+# others' changes to its copy of a room and forwards their broadcasts to its own clients.
+#   'local'  - in-process only (a single instance)
+#   'socket' - join the broker at ROOM_BUS_ADDRESS ('unix:/path/to.sock' or 'tcp:host:port'), started
+#              with: python -m server.server_run_bus_broker <address>
+# Instances sharing rooms should share storage too (STORAGE_BACKEND = 'sqlite'). Rock-paper-scissors
+# games stay local to each instance.
+ROOM_BUS_BACKEND = 'local'
+ROOM_BUS_ADDRESS = 'tcp:127.0.0.1:8765'
+ROOM_BUS_INSTANCE = None      # this instance's name on the bus; None uses the host name and process id
+ROOM_BUS_QUEUE_SIZE = 4096    # lines queued for one bus connection before it counts as stuck and is closed
+
+# Port the server (or, with WORKER_PROCESSES > 1, the router) listens on; `python server.py <port>` overrides it
+SERVER_PORT = 8080
+
+# Per-connection outbound queues: maximum queued messages and what to do when a queue is full
+#   'drop'       - discard the new message
+#   'coalesce'   - replace a queued message of the same kind (e.g. timer updates); disconnect the
+#                  client if a message still doesn't fit
+#   'disconnect' - close the slow connection; the client reconnects and reloads full state
+OUTBOUND_QUEUE_SIZE = 256
+OUTBOUND_FULL_POLICY = 'coalesce'
+
+# permessage-deflate for WebSocket connections, negotiated per connection when the client offers it
+# (browsers do). Only frames of at least WS_COMPRESS_MIN_BYTES are compressed - full room snapshots,
+# board replaces, query results - since deflating small patches costs more CPU than it saves. A
+# broadcast is compressed once, at WS_COMPRESS_LEVEL (zlib 1-9), and the result sent to every client.
+WS_COMPRESSION = True
+WS_COMPRESS_MIN_BYTES = 1024
+WS_COMPRESS_LEVEL = 6
+
+# WebSocket subprotocol a /ws client can ask for (Sec-WebSocket-Protocol) to exchange MessagePack
+# binary frames instead of JSON text; negotiated per connection, so other clients keep JSON.
+# None turns it off.
+WS_BINARY_PROTOCOL = 'tagteam.msgpack'
+
+# Badge activity feed: how many activities are kept, and page sizes for the cursor API
+BADGE_FEED_RETENTION = 1000
+BADGE_FEED_PAGE_SIZE = 50
+BADGE_FEED_MAX_PAGE_SIZE = 200
+
+# Work item queries (query_work_items / /api/rooms/{room}/work-items): default and largest page size
+WORK_ITEM_PAGE_SIZE = 50
+WORK_ITEM_MAX_PAGE_SIZE = 200
+
 # Default states
 DEFAULT_ROOM_STATE = {
     'board': {
@@ -43,18 +138,21 @@ DEFAULT_RPS_STATE = {
     'gameActive': False
 }
 
-# Room states (key = room name, value = room state)
-rooms_state = defaultdict(lambda: None)
-
-# WebSocket connections (key = room name, value = list of connections)
-connections = defaultdict(list)
-
-# Client tracking (maps client IDs to their WebSocket connections)
-clients = {}
+# Loaded room states (key = room name, value = room state); see server_room_directory for every saved room
+rooms_state = {}
 
 # Deleted rooms tracking
 deleted_rooms = set()
 
+# Rooms whose in-memory state has changed since the last save
+dirty_rooms = set()
+
+# Outbound message queues (key = WebSocket connection, value = ServerOutboundQueue)
+outbound_queues = {}
+
+# Badge WebSocket subscribers (/badge-ws connections)
+badge_clients = set()
+
 # Timer tasks for each room
 timer_tasks = defaultdict(lambda: None)
 
@@ -0,0 +1,227 @@
+import glob
+import logging
+import os
+from contextlib import contextmanager
+from server.server_state import STORAGE_BACKEND, STATE_FSYNC_FILE, SNAPSHOT_FORMAT
+from server.server_atomic_write import server_atomic_write
+from server.server_json_codec import json_encode, json_decode, JSONDecodeError
+from server.server_msgpack_codec import msgpack_encode, msgpack_decode
+
+# Snapshot encodings (SNAPSHOT_FORMAT): format -> (file extension, encode, decode)
+SNAPSHOT_FORMATS = {
+    'json': ('.json', json_encode, json_decode),
+    'msgpack': ('.msgpack', msgpack_encode, msgpack_decode)
+}
+
+try:
+    import fcntl
+except ImportError:
+    # No cross-process file locks (Windows); only matters when instances share a states directory
+    fcntl = None
+
+@contextmanager
+def _file_lock(lock_path):
+    """Hold an exclusive lock on lock_path (created if missing) across processes."""
+    with open(lock_path, 'a') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        yield
+
+def server_snapshot_format(snapshot_format=SNAPSHOT_FORMAT):
+    """The configured snapshot format, falling back to JSON for an unknown one."""
+    if snapshot_format not in SNAPSHOT_FORMATS:
+        logging.warning(f"Unknown snapshot format '{snapshot_format}', using JSON")
+        return 'json'
+    return snapshot_format
+
+# Badge data file used by the JSON backend
+BADGE_DATA_FILE = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'badges.json')
+
+# Storage backends for room state and badge data.
+#
+# encode_* methods run on the event loop and return an opaque payload, so the state can't
+# change while it's being serialized; every other method does blocking I/O and is called
+# from a worker thread (asyncio.to_thread) or at startup.
+#
+#   prepare()                          create directories/tables, clean up after a crash
+#   list_rooms()                       names of every room with saved state
+#   read_room(room)                    (snapshot dict or None, journal lines newest last)
+#   encode_room_snapshot(state)        payload for write_room_snapshots
+#   write_room_snapshots(items)        [(room, payload)] -> rooms that failed; drops journal
+#                                      records each snapshot covers, and skips a snapshot older
+#                                      than the saved one (another instance sharing the room
+#                                      may have saved it since)
+#   append_journal(batches)            [(room, [(seq, line)])] -> rooms that failed
+#   delete_room(room)                  remove a room's snapshot and journal
+#   load_badges()                      badge document (feed newest first) or None
+#   encode_badges(badge_data)          payload for write_badges
+#   write_badges(payload)
+class ServerJsonStorage:
+    """
+    Default backend: states/{room}.json snapshots, states/{room}.journal logs, data/badges.json.
+
+    With SNAPSHOT_FORMAT = 'msgpack' snapshots and badges are .msgpack files instead; a
+    file in the other format is still read, and replaced on the next save.
+    """
+    name = 'json'
+
+    def __init__(self, states_dir='states', badge_file=BADGE_DATA_FILE, snapshot_format=SNAPSHOT_FORMAT):
+        self.states_dir = states_dir
+        self.badge_file = badge_file
+        self.snapshot_format = server_snapshot_format(snapshot_format)
+
+    def _snapshot_path(self, room_name, snapshot_format=None):
+        extension = SNAPSHOT_FORMATS[snapshot_format or self.snapshot_format][0]
+        return os.path.join(self.states_dir, f'{room_name}{extension}')
+
+    def _badge_path(self, snapshot_format=None):
+        extension = SNAPSHOT_FORMATS[snapshot_format or self.snapshot_format][0]
+        return os.path.splitext(self.badge_file)[0] + extension
+
+    def _other_formats(self):
+        return [snapshot_format for snapshot_format in SNAPSHOT_FORMATS if snapshot_format != self.snapshot_format]
+
+    def _read_document(self, path_for):
+        """Decode the file path_for(format) names, preferring the configured format; None if there is none."""
+        for snapshot_format in [self.snapshot_format] + self._other_formats():
+            file_path = path_for(snapshot_format)
+            if os.path.exists(file_path):
+                with open(file_path, 'rb') as f:
+                    return SNAPSHOT_FORMATS[snapshot_format][2](f.read())
+        return None
+
+    def _remove_other_formats(self, path_for):
+        # A document just saved in the configured format replaces any copy left in another one
+        for snapshot_format in self._other_formats():
+            file_path = path_for(snapshot_format)
+            if os.path.exists(file_path):
+                os.remove(file_path)
+
+    def _journal_path(self, room_name):
+        return os.path.join(self.states_dir, f'{room_name}.journal')
+
+    def _lock_path(self, room_name):
+        # Serializes journal appends and compactions between instances sharing the states directory
+        return os.path.join(self.states_dir, f'.{room_name}.lock')
+
+    def prepare(self):
+        os.makedirs(self.states_dir, exist_ok=True)
+
+        # Remove temp files left behind by a save that was interrupted mid-write
+        for stale_file in glob.glob(os.path.join(self.states_dir, '.*.tmp')):
+            try:
+                os.remove(stale_file)
+                logging.info(f"Removed stale temp file {stale_file}")
+            except OSError as e:
+                logging.warning(f"Could not remove stale temp file {stale_file}: {e}")
+
+    def list_rooms(self):
+        # A room may have only a journal if it was never compacted before a crash
+        extensions = [extension for extension, _, _ in SNAPSHOT_FORMATS.values()] + ['.journal']
+        state_files = [f for extension in extensions for f in glob.glob(os.path.join(self.states_dir, f'*{extension}'))]
+        return list(dict.fromkeys(os.path.splitext(os.path.basename(f))[0] for f in state_files))
+
+    def read_room(self, room_name):
+        snapshot = self._read_document(lambda snapshot_format: self._snapshot_path(room_name, snapshot_format))
+
+        journal_lines = []
+        journal_path = self._journal_path(room_name)
+        if os.path.exists(journal_path):
+            with open(journal_path, 'r') as f:
+                journal_lines = f.readlines()
+
+        return snapshot, journal_lines
+
+    def encode_room_snapshot(self, state):
+        return SNAPSHOT_FORMATS[self.snapshot_format][1](state), state.get('journalSeq', 0)
+
+    def _compact_journal(self, room_name, journal_seq):
+        """Drop the journal records a snapshot at journal_seq covers, keeping any newer ones."""
+        journal_path = self._journal_path(room_name)
+        if not os.path.exists(journal_path):
+            return
+
+        kept_lines = []
+        with open(journal_path, 'rb') as f:
+            for line in f:
+                try:
+                    seq = json_decode(line).get('seq', 0)
+                except JSONDecodeError:
+                    # A torn line from a crashed append
+                    continue
+                # Appended by another instance after this snapshot was encoded
+                if seq > journal_seq:
+                    kept_lines.append(line)
+
+        if kept_lines:
+            server_atomic_write(journal_path, b''.join(kept_lines))
+        else:
+            os.remove(journal_path)
+
+    def write_room_snapshots(self, encoded_rooms):
+        failed_rooms = []
+        for room_name, (encoded_state, journal_seq) in encoded_rooms:
+            try:
+                snapshot_path = lambda snapshot_format: self._snapshot_path(room_name, snapshot_format)
+                file_path = self._snapshot_path(room_name)
+                with _file_lock(self._lock_path(room_name)):
+                    saved = self._read_document(snapshot_path)
+                    saved_seq = saved.get('journalSeq', 0) if isinstance(saved, dict) else 0
+                    if saved_seq > journal_seq:
+                        logging.info(f"Kept saved state for room '{room_name}': it is newer (journal record {saved_seq} > {journal_seq})")
+                        continue
+
+                    # Atomically replace the file - using room name as filename
+                    server_atomic_write(file_path, encoded_state)
+                    self._remove_other_formats(snapshot_path)
+                    self._compact_journal(room_name, journal_seq)
+
+                logging.debug(f"Saved state for room '{room_name}' to {file_path}")
+
+            except Exception as e:
+                failed_rooms.append(room_name)
+                logging.error(f"Error saving state for room '{room_name}': {e}")
+        return failed_rooms
+
+    def append_journal(self, batches, fsync=STATE_FSYNC_FILE):
+        failed_rooms = []
+        for room_name, records in batches:
+            try:
+                with _file_lock(self._lock_path(room_name)), open(self._journal_path(room_name), 'a') as f:
+                    f.write(''.join(line for _, line in records))
+                    if fsync:
+                        f.flush()
+                        os.fsync(f.fileno())
+            except Exception as e:
+                failed_rooms.append(room_name)
+                logging.error(f"Error appending to journal for room '{room_name}': {e}")
+        return failed_rooms
+
+    def delete_room(self, room_name):
+        snapshot_paths = [self._snapshot_path(room_name, snapshot_format) for snapshot_format in SNAPSHOT_FORMATS]
+        for file_path in snapshot_paths + [self._journal_path(room_name), self._lock_path(room_name)]:
+            if os.path.exists(file_path):
+                os.remove(file_path)
+                logging.info(f"Deleted {file_path} for room '{room_name}'")
+
+    def load_badges(self):
+        return self._read_document(self._badge_path)
+
+    def encode_badges(self, badge_data):
+        return SNAPSHOT_FORMATS[self.snapshot_format][1](badge_data)
+
+    def write_badges(self, payload):
+        os.makedirs(os.path.dirname(self.badge_file), exist_ok=True)
+        server_atomic_write(self._badge_path(), payload)
+        self._remove_other_formats(self._badge_path)
+
+def server_create_storage(backend=STORAGE_BACKEND):
+    """Build the configured storage backend ('json' or 'sqlite')."""
+    if backend == 'sqlite':
+        from server.server_sqlite_storage import ServerSqliteStorage
+        return ServerSqliteStorage()
+    if backend != 'json':
+        logging.warning(f"Unknown storage backend '{backend}', using JSON files")
+    return ServerJsonStorage()
+
+storage = server_create_storage()
@@ -0,0 +1,101 @@
+import asyncio
+import time
+import logging
+import server.server_state as server_state
+from server.server_timer_manager import ServerTimerManager
+from server.server_journal_room_change import server_journal_room_change
+from server.server_broadcast_timer_update import server_broadcast_timer_update
+from server.server_room_locks import room_locks
+
+# Event-driven room timers: one loop.call_later handle per running timer, fired at its endTime
+class ServerTimerScheduler:
+    def __init__(self):
+        self._handles = {}   # room -> (end_time, asyncio.TimerHandle)
+        # Expiries in progress; referenced here so the loop can't garbage-collect them mid-flight
+        self._expiry_tasks = set()
+
+    @property
+    def scheduled_count(self):
+        return len(self._handles)
+
+    def sync_room(self, room, timer_state=None):
+        """Arm, re-arm or cancel a room's expiry to match its current timer state."""
+        if timer_state is None:
+            room_state = server_state.rooms_state.get(room)
+            timer_state = room_state.get('timer') if room_state else None
+
+        if not timer_state or not timer_state.get('isRunning'):
+            self.cancel(room)
+            return
+
+        end_time = timer_state.get('endTime')
+        if not isinstance(end_time, (int, float)) or end_time <= 0:
+            # Running without a usable end time: let the timer manager assign one
+            ServerTimerManager.update_running_timer(timer_state, time.time())
+            server_journal_room_change(room, 'timer', timer_state, publish=False)
+            end_time = timer_state['endTime']
+
+        current = self._handles.get(room)
+        if current is not None:
+            if current[0] == end_time:
+                return
+            current[1].cancel()
+
+        loop = asyncio.get_running_loop()
+        # endTime is wall-clock; convert to a delay on the loop's monotonic clock
+        delay = max(0, end_time - time.time())
+        handle = loop.call_later(delay, self._fire, room, end_time)
+        self._handles[room] = (end_time, handle)
+        logging.debug(f"Timer for room '{room}' scheduled to expire in {delay:.1f}s")
+
+    def cancel(self, room):
+        """Forget any pending expiry for a room."""
+        current = self._handles.pop(room, None)
+        if current is not None:
+            current[1].cancel()
+            logging.debug(f"Cancelled timer expiry for room '{room}'")
+
+    def cancel_all(self):
+        for room in list(self._handles):
+            self.cancel(room)
+
+    def _fire(self, room, end_time):
+        current = self._handles.get(room)
+        if current is None or current[0] != end_time:
+            return
+        del self._handles[room]
+        task = asyncio.create_task(self._expire(room, end_time))
+        self._expiry_tasks.add(task)
+        task.add_done_callback(self._expiry_tasks.discard)
+
+    async def _expire(self, room, end_time):
+        try:
+            async with room_locks.hold(room):
+                room_state = server_state.rooms_state.get(room)
+                if room_state is None or room in server_state.deleted_rooms:
+                    return
+
+                timer_state = room_state.get('timer', {})
+                # The timer was stopped or restarted after this expiry was scheduled
+                if not timer_state.get('isRunning') or timer_state.get('endTime') != end_time:
+                    return
+
+                timer_state, save_needed = ServerTimerManager.update_running_timer(timer_state, time.time())
+                room_state['timer'] = timer_state
+
+                if timer_state.get('isRunning'):
+                    # Fired a little early (clock adjustment) - try again at the real end time
+                    self.sync_room(room, timer_state)
+                    return
+
+                logging.info(f"Timer expired in room '{room}'")
+                # Every instance serving the room expires its own copy and tells its own clients
+                if save_needed:
+                    server_journal_room_change(room, 'timer', timer_state, publish=False)
+
+                await server_broadcast_timer_update(room)
+
+        except Exception as e:
+            logging.error(f"Error expiring timer for room '{room}': {e}")
+
+timer_scheduler = ServerTimerScheduler()
@@ -1,34 +1,104 @@
-import json
 import logging
+from aiohttp import WSMsgType
 import server.server_state as server_state
+from server.server_connection_manager import connection_manager
+from server.server_room_bus import room_bus
+from server.server_compressed_websocket import ServerFrame
+from server.server_json_codec import json_encode
 
-async def broadcast_to_room(room, message):
+def encode_message(message):
+    """
+    Encode a message once into the UTF-8 bytes that go on the wire.
+
+    Args:
+        message (dict | str | bytes): The message to encode
+
+    Returns:
+        bytes: The encoded text frame payload (a ServerFrame, which is also compressed at most once)
+    """
+    if isinstance(message, bytes):
+        return message
+    if isinstance(message, str):
+        return ServerFrame(message.encode('utf-8'))
+    return ServerFrame(json_encode(message))
+
+async def send_encoded(client, payload, coalesce_key=None):
+    """
+    Send a pre-encoded text frame to one client without re-encoding it.
+
+    Clients with an outbound queue get the frame queued (and possibly coalesced
+    with an older frame of the same coalesce_key) instead of awaiting the socket.
+    """
+    queue = server_state.outbound_queues.get(client)
+    if queue is not None:
+        queue.enqueue(payload, coalesce_key)
+        return
+
+    send_frame = getattr(client, 'send_frame', None)
+    if send_frame is not None:
+        await send_frame(payload, WSMsgType.TEXT)
+    else:
+        # Older aiohttp without send_frame
+        await client.send_str(payload.decode('utf-8'))
+
+async def broadcast_message(recipients, message, exclude=None, coalesce_key=None):
+    """
+    Broadcast a message to a group of clients, encoding it only once.
+
+    Args:
+        recipients (iterable): WebSocket connections to send to
+        message (dict | str | bytes): The message to broadcast
+        exclude (WebSocketResponse, optional): A client to skip, usually the sender
+        coalesce_key (str, optional): Lets a slow client's queue keep only the latest message of this kind
+
+    Returns:
+        int: Number of clients the message was sent to
+    """
+    payload = encode_message(message)
+
+    client_count = 0
+    for client in list(recipients):
+        if client is exclude:
+            continue
+        try:
+            if not client.closed:
+                await send_encoded(client, payload, coalesce_key)
+                client_count += 1
+        except Exception as e:
+            logging.error(f"Error sending message to client: {e}")
+
+    return client_count
+
+async def broadcast_to_room(room, message, exclude=None, coalesce_key=None, publish=False):
     """
     Broadcast a message to all clients in a room.
-    
+
     Args:
         room (str): The room name to broadcast to
-        message (dict): The message to broadcast
+        message (dict | str | bytes): The message to broadcast
+        exclude (WebSocketResponse, optional): A client to skip, usually the sender
+        coalesce_key (str, optional): Lets a slow client's queue keep only the latest message of this kind
+        publish (bool): Also send it to other server instances' clients in the room, over the room bus
+
+    Returns:
+        int: Number of clients the message was sent to
     """
     try:
-        if room not in server_state.connections or not server_state.connections[room]:
+        if publish:
+            # The same encoded bytes go to the bus and this instance's clients; each instance encodes once
+            message = encode_message(message)
+            room_bus.publish_room_message(room, message, coalesce_key)
+
+        recipients = connection_manager.connections(room)
+        if not recipients:
             logging.debug(f"No clients in room {room} to broadcast message to")
-            return
-
-        # Convert the message to JSON string if it's a dictionary
-        message_str = json.dumps(message) if isinstance(message, dict) else message
-        
-        # Send to all clients in the room
-        client_count = 0
-        for client in server_state.connections[room]:
-            try:
-                if not client.closed:
-                    await client.send_str(message_str)
-                    client_count += 1
-            except Exception as e:
-                logging.error(f"Error sending message to client: {e}")
-                
+            return 0
+
+        client_count = await broadcast_message(recipients, message, exclude=exclude, coalesce_key=coalesce_key)
+
         logging.debug(f"Message broadcast to {client_count} clients in room {room}")
-        
+        return client_count
+
     except Exception as e:
         logging.error(f"Error broadcasting message to room {room}: {e}")
+        return 0
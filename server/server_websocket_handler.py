@@ -1,41 +1,24 @@
 import logging
-import json
-import os
-import asyncio
 from aiohttp import web
 import server.server_state as server_state
 from server.server_handle_message import server_handle_message
 from server.server_broadcast_room_list import server_broadcast_room_list
 from server.server_handle_get_rooms import server_handle_get_rooms
 from server.server_create_default_room_state import server_create_default_room_state
+from server.server_get_room_state import server_get_room_state
+from server.server_connection_manager import connection_manager
+from server.server_room_locks import room_locks
+from server.server_room_directory import room_directory
+from server.server_room_evictor import room_evictor
+from server.server_room_shards import room_shards
+from server.server_compressed_websocket import ServerWebSocketResponse
+from server.server_utils import encode_message, send_encoded
+from server.server_json_codec import json_decode, JSONDecodeError
+from server.server_msgpack_codec import msgpack_decode, MsgpackDecodeError
+from server.server_state import WS_BINARY_PROTOCOL
 
-# Load a specific room's state from its file
-async def load_room_state_from_file(room_name):
-    """Load a specific room's state from its JSON file."""
-    try:
-        file_path = f'states/{room_name}.json'
-        
-        # If file doesn't exist, create default state
-        if not os.path.exists(file_path):
-            logging.info(f"State file for room '{room_name}' not found, using default state")
-            return server_create_default_room_state()
-            
-        # Load from file
-        with open(file_path, 'r') as f:
-            room_state = json.load(f)
-            
-            # Log timer state for debugging
-            if 'timer' in room_state:
-                timer_state = room_state['timer']
-                logging.info(f"Loaded timer state for room '{room_name}': running={timer_state.get('isRunning', False)}, endTime={timer_state.get('endTime')}")
-            else:
-                logging.warning(f"No timer state found in room '{room_name}' file")
-                
-            logging.debug(f"Loaded state for room '{room_name}' from file")
-            return room_state
-    except Exception as e:
-        logging.error(f"Error loading state for room '{room_name}' from file: {e}")
-        return server_create_default_room_state()
+# Messages that act on other rooms (or none) and take any room locks they need themselves
+CROSS_ROOM_MESSAGE_TYPES = ('delete_room_request', 'get_rooms')
 
 # Helper function to create serializable room state
 def create_serializable_state(room_state, room_name):
@@ -49,7 +32,7 @@ def create_serializable_state(room_state, room_name):
             'workItems': room_state.get('workItems', []),
         },
         'room': room_name,  # Explicitly include the room name
-        'rooms': list(server_state.rooms_state.keys())
+        'rooms': room_directory.names()
     }
     
     # Handle RPS state carefully to remove WebSocketResponse objects
@@ -63,44 +46,37 @@ def create_serializable_state(room_state, room_name):
 
 async def server_websocket_handler(request):
     """Handle WebSocket connections."""
-    ws = web.WebSocketResponse()
+    # Clients may ask for MessagePack binary frames instead of JSON text
+    ws = ServerWebSocketResponse(binary_protocol=WS_BINARY_PROTOCOL)
     await ws.prepare(request)
     
     # Get room from query string
     room = request.query.get('room', 'default')
     
-    # Always try to load room state from file first to ensure we have the latest
+    # In-memory state is authoritative; storage is only read if the room isn't loaded yet
     try:
-        room_state = await load_room_state_from_file(room)
-        server_state.rooms_state[room] = room_state
-        logging.info(f"Loaded state for room '{room}' from file")
+        room_state = await server_get_room_state(room)
     except Exception as e:
-        if room not in server_state.rooms_state:
-            server_state.rooms_state[room] = server_create_default_room_state()
-            logging.warning(f"Created new default state for room '{room}': {e}")
+        room_state = server_create_default_room_state()
+        server_state.rooms_state[room] = room_state
+        logging.warning(f"Created new default state for room '{room}': {e}")
     
-    # Add client to room
-    if room not in server_state.clients:
-        server_state.clients[room] = []
-    server_state.clients[room].append(ws)
+    # Add client to room (this also gives it its outbound queue)
+    connection_manager.add(ws, room)
+    room_evictor.mark_active(room)
     
     logging.info(f"WebSocket connection established for room '{room}' from {request.remote}")
     
-    # Broadcast updated room list to all clients
+    # Tell everyone about the room if it's new (no-op when the room list is unchanged)
     await server_broadcast_room_list()
     
     # Send initial state to the new client
     try:
-        # Get room state - ensure we load from file for the most up-to-date state
-        fresh_state = await load_room_state_from_file(room)
-        # Update in-memory state to match file
-        server_state.rooms_state[room] = fresh_state
-        
-        # Create serializable state
-        serializable_state = create_serializable_state(fresh_state, room)
+        # Create serializable state from the in-memory copy
+        serializable_state = create_serializable_state(room_state, room)
         
-        # Send to client
-        await ws.send_json(serializable_state)
+        # Queued like everything else, so it can't overtake or be overtaken by a broadcast
+        await send_encoded(ws, encode_message(serializable_state))
         logging.info(f"Sent full state update to client for room '{room}'")
     except Exception as e:
         logging.error(f"Error sending initial state: {e}")
@@ -108,35 +84,42 @@ async def server_websocket_handler(request):
     # Handle messages
     try:
         async for msg in ws:
-            if msg.type == web.WSMsgType.TEXT:
+            if msg.type == web.WSMsgType.TEXT or (msg.type == web.WSMsgType.BINARY and ws.binary):
                 try:
-                    data = json.loads(msg.data)
+                    data = json_decode(msg.data) if msg.type == web.WSMsgType.TEXT else msgpack_decode(msg.data)
                     msg_type = data.get('type', '')
                     
                     # Handle reload state request
                     if msg_type == 'reload_state_request':
                         target_room = data.get('room', room)
+                        if not room_shards.owns(target_room):
+                            # Another worker process holds that room; reloading it here would fork its state
+                            logging.warning(f"Ignoring reload of room '{target_room}' owned by worker {room_shards.owner(target_room)}")
+                            continue
                         try:
-                            # Load fresh state from file to ensure we get the most recent state
-                            logging.info(f"Reloading state for room '{target_room}' from file")
-                            fresh_state = await load_room_state_from_file(target_room)
-                            
-                            # Update in-memory state
-                            server_state.rooms_state[target_room] = fresh_state
+                            # Serve from memory; disk is only touched on a cache miss
+                            # Encoded under the lock for a consistent snapshot, then queued so a slow client doesn't hold the lock
+                            async with room_locks.hold(target_room):
+                                fresh_state = await server_get_room_state(target_room)
+                                payload = encode_message(create_serializable_state(fresh_state, target_room))
                             
-                            # Send to client
-                            serializable_state = create_serializable_state(fresh_state, target_room)
-                            await ws.send_json(serializable_state)
+                            await send_encoded(ws, payload)
                             logging.debug(f"Sent reloaded state for room '{target_room}' to client")
                         except Exception as e:
                             logging.error(f"Error handling reload state request: {e}")
-                    else:
-                        # Normal message handling - using the current in-memory room state
+                    elif msg_type in CROSS_ROOM_MESSAGE_TYPES:
                         room_state = server_state.rooms_state.get(room, server_create_default_room_state())
                         await server_handle_message(ws, data, room, room_state)
+                    else:
+                        # Normal message handling - one message at a time per room, using the current in-memory room state
+                        async with room_locks.hold(room):
+                            room_state = await server_get_room_state(room)
+                            await server_handle_message(ws, data, room, room_state)
                         
-                except json.JSONDecodeError:
+                except JSONDecodeError:
                     logging.error(f"Invalid JSON received: {msg.data}")
+                except MsgpackDecodeError as e:
+                    logging.error(f"Invalid MessagePack received ({len(msg.data)} bytes): {e}")
                 except Exception as e:
                     logging.error(f"Error handling message: {e}")
             elif msg.type == web.WSMsgType.ERROR:
@@ -144,16 +127,13 @@ async def server_websocket_handler(request):
                 break
     finally:
         # Handle disconnection
-        if room in server_state.clients:
-            server_state.clients[room].remove(ws)
+        if connection_manager.remove(ws) is not None:
             logging.info(f"WebSocket connection closing for room '{room}'.")
             
             # If this was the last client in the room
-            if len(server_state.clients[room]) == 0:
+            if not connection_manager.has_connections(room):
                 logging.info(f"Last client left room {room}")
-        
-        # Broadcast updated room list
-        await server_broadcast_room_list()
+                room_evictor.mark_idle(room)
             
         logging.debug(f"WebSocket handler for {request.remote} finished.")
         
@@ -0,0 +1,124 @@
+import bisect
+import logging
+from datetime import datetime, timezone
+
+def server_work_item_timestamp():
+    """Current time in the same ISO format the browser uses (toISOString)."""
+    return datetime.now(timezone.utc).isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+
+def server_work_item_updated(item):
+    """When an item last changed; items saved before updates were tracked fall back to 'created'."""
+    return item.get('updated') or item.get('created') or ''
+
+def server_stamp_changed_work_items(old_items, new_items):
+    """Set 'updated' on every item in a replacement workItems list that is new or differs from before."""
+    old_by_id = {item.get('id'): item for item in old_items or [] if isinstance(item, dict)}
+    now = server_work_item_timestamp()
+    for item in new_items:
+        if not isinstance(item, dict):
+            continue
+        old_item = old_by_id.get(item.get('id'))
+        if old_item is None:
+            item['updated'] = now
+            continue
+        changed = any(item.get(key) != old_item.get(key) for key in item.keys() | old_item.keys() if key != 'updated')
+        if changed:
+            item['updated'] = now
+        elif 'updated' in old_item:
+            # Clients echo back the timestamp they were sent; keep ours for items they didn't touch
+            item['updated'] = old_item['updated']
+        else:
+            item.pop('updated', None)
+
+# Lookup structures over one room's workItems list
+class ServerWorkItemIndex:
+    def __init__(self, work_items):
+        self.work_items = work_items
+        self.by_id = {}          # id -> item
+        self.position = {}       # id -> position in workItems (the list order clients see)
+        self.by_state = {}       # stateId -> {id: None}
+        self.by_updated = []     # sorted (updated, position, id)
+        for position, item in enumerate(work_items):
+            if isinstance(item, dict):
+                self._add(item, position)
+        self.by_updated.sort()
+
+    def _add(self, item, position):
+        item_id = item.get('id')
+        self.by_id[item_id] = item
+        self.position[item_id] = position
+        self.by_state.setdefault(item.get('stateId'), {})[item_id] = None
+        self.by_updated.append((server_work_item_updated(item), position, item_id))
+
+    def _remove(self, item_id):
+        old_item = self.by_id.pop(item_id)
+        position = self.position.pop(item_id)
+        state_ids = self.by_state.get(old_item.get('stateId'), {})
+        state_ids.pop(item_id, None)
+        if not state_ids:
+            self.by_state.pop(old_item.get('stateId'), None)
+        entry = (server_work_item_updated(old_item), position, item_id)
+        index = bisect.bisect_left(self.by_updated, entry)
+        if index < len(self.by_updated) and self.by_updated[index] == entry:
+            del self.by_updated[index]
+        return position
+
+    def put(self, item):
+        """Re-index an item that was just added to (appended) or replaced in workItems."""
+        item_id = item.get('id')
+        if item_id in self.by_id:
+            position = self._remove(item_id)
+        else:
+            position = len(self.work_items) - 1
+        self.by_id[item_id] = item
+        self.position[item_id] = position
+        self.by_state.setdefault(item.get('stateId'), {})[item_id] = None
+        bisect.insort(self.by_updated, (server_work_item_updated(item), position, item_id))
+
+    def remove(self, item_id):
+        """Un-index an item that was just removed from workItems; the items after it move up a place."""
+        position = self._remove(item_id)
+        for later_id, later_position in self.position.items():
+            if later_position > position:
+                self.position[later_id] = later_position - 1
+        # Shifting every later position by one keeps the list sorted
+        self.by_updated = [
+            (updated, later_position - 1 if later_position > position else later_position, later_id)
+            for updated, later_position, later_id in self.by_updated
+        ]
+
+    def state_ids(self, state_id):
+        return self.by_state.get(state_id, {})
+
+    def updated_since(self, timestamp):
+        """Ids of items updated at or after an ISO timestamp, oldest first."""
+        start = bisect.bisect_left(self.by_updated, (timestamp,))
+        return [item_id for _, _, item_id in self.by_updated[start:]]
+
+# Per-room work item indexes, rebuilt when a room's workItems list is replaced
+class ServerWorkItemIndexes:
+    def __init__(self):
+        self._indexes = {}   # room -> ServerWorkItemIndex
+
+    def get(self, room, room_state):
+        work_items = room_state.setdefault('workItems', [])
+        index = self._indexes.get(room)
+        # The list object changes whenever the room is reloaded or its items are replaced wholesale
+        if index is None or index.work_items is not work_items:
+            index = ServerWorkItemIndex(work_items)
+            self._indexes[room] = index
+            logging.debug(f"Indexed {len(work_items)} work item(s) in room '{room}'")
+        return index
+
+    def peek(self, room, room_state):
+        """A room's index if one is built and current, without building it."""
+        index = self._indexes.get(room)
+        if index is not None and index.work_items is room_state.get('workItems'):
+            return index
+        return None
+
+    def invalidate(self, room):
+        """Drop a room's index (its items changed in place, or it left memory)."""
+        self._indexes.pop(room, None)
+
+work_item_indexes = ServerWorkItemIndexes()
@@ -0,0 +1,38 @@
+import logging
+from aiohttp import web
+from server.server_query_work_items import server_query_work_items
+from server.server_get_room_state import server_get_room_state
+from server.server_room_directory import room_directory
+from server.server_room_locks import room_locks
+from server.server_utils import encode_message
+from server.server_json_codec import server_json_response
+
+async def handle_work_items_request(request):
+    """
+    Handle HTTP work item queries: /api/rooms/{room}/work-items
+
+    Takes the same fields as the query_work_items WebSocket message as query
+    parameters; stateId may be repeated or comma-separated.
+    """
+    room = request.match_info['room']
+    if room not in room_directory:
+        return server_json_response({'status': 'error', 'message': f"Room '{room}' not found"}, status=404)
+
+    query = dict(request.query)
+    state_ids = [state_id for value in request.query.getall('stateId', []) for state_id in value.split(',') if state_id]
+    if state_ids:
+        query['stateId'] = state_ids
+
+    try:
+        async with room_locks.hold(room):
+            room_state = await server_get_room_state(room)
+            result = server_query_work_items(room, room_state, query)
+            # Encode while holding the lock so the items can't change mid-serialization
+            body = encode_message({'status': 'success', 'room': room, **result})
+    except (ValueError, TypeError) as e:
+        return server_json_response({'status': 'error', 'message': f"Invalid work item query: {e}"}, status=400)
+    except Exception as e:
+        logging.error(f"Error serving work items for room '{room}': {e}")
+        return web.Response(text="Error querying work items", status=500)
+
+    return web.Response(body=body, content_type='application/json')
@@ -0,0 +1,123 @@
+import logging
+from collections import deque
+
+# A room's workflow compiled to lookup tables, so checking a move doesn't scan every transition
+class ServerWorkflowGraph:
+    def __init__(self, workflow, work_items):
+        self.workflow = workflow
+        self.work_items = work_items
+        self.states = {}        # stateId -> state
+        self.outgoing = {}      # stateId -> {toStateId: None}, in transition order
+        self.incoming = {}      # stateId -> {fromStateId: None}
+        self.item_counts = {}   # stateId -> number of work items in it
+        for state in workflow.get('states', []):
+            if isinstance(state, dict):
+                self.states[state.get('id')] = state
+        for transition in workflow.get('transitions', []):
+            if isinstance(transition, dict):
+                self._link(transition.get('from'), transition.get('to'))
+        for item in work_items:
+            if isinstance(item, dict):
+                self._count(item.get('stateId'), 1)
+
+    def _link(self, from_state, to_state):
+        self.outgoing.setdefault(from_state, {})[to_state] = None
+        self.incoming.setdefault(to_state, {})[from_state] = None
+
+    def _unlink(self, from_state, to_state):
+        for edges, key, other in ((self.outgoing, from_state, to_state), (self.incoming, to_state, from_state)):
+            linked = edges.get(key)
+            if linked is not None:
+                linked.pop(other, None)
+                if not linked:
+                    del edges[key]
+
+    def _count(self, state_id, delta):
+        count = self.item_counts.get(state_id, 0) + delta
+        if count > 0:
+            self.item_counts[state_id] = count
+        else:
+            self.item_counts.pop(state_id, None)
+
+    def has_state(self, state_id):
+        return state_id in self.states
+
+    def state_name(self, state_id):
+        state = self.states.get(state_id)
+        return state.get('name', 'Unknown') if state is not None else 'Unknown'
+
+    def allows(self, from_state, to_state):
+        """Whether the workflow has a transition from one state to another."""
+        return to_state in self.outgoing.get(from_state, ())
+
+    def next_states(self, state_id):
+        """States an item can move to directly from state_id."""
+        return list(self.outgoing.get(state_id, ()))
+
+    def reachable_states(self, state_id):
+        """Every state an item in state_id can eventually reach (not including state_id itself)."""
+        seen = {state_id}
+        reachable = []
+        queue = deque([state_id])
+        while queue:
+            for to_state in self.outgoing.get(queue.popleft(), ()):
+                if to_state not in seen:
+                    seen.add(to_state)
+                    reachable.append(to_state)
+                    queue.append(to_state)
+        return reachable
+
+    def item_count(self, state_id):
+        return self.item_counts.get(state_id, 0)
+
+    def apply_patch(self, patch, old_item=None):
+        """Follow a workflow patch that was just applied; old_item is the item it replaced or deleted."""
+        action = patch.get('action')
+
+        if 'item' in patch:
+            if old_item is not None:
+                self._count(old_item.get('stateId'), -1)
+            self._count(patch['item'].get('stateId'), 1)
+
+        elif action == 'delete_item':
+            if old_item is not None:
+                self._count(old_item.get('stateId'), -1)
+
+        elif 'state' in patch:
+            self.states[patch['state']['id']] = patch['state']
+
+        elif action == 'delete_state':
+            state_id = patch.get('stateId')
+            self.states.pop(state_id, None)
+            # Only the state's own edges are touched
+            for to_state in list(self.outgoing.get(state_id, ())):
+                self._unlink(state_id, to_state)
+            for from_state in list(self.incoming.get(state_id, ())):
+                self._unlink(from_state, state_id)
+
+        elif action == 'add_transition':
+            self._link(patch['transition']['from'], patch['transition']['to'])
+
+        elif action == 'delete_transition':
+            self._unlink(patch['transition']['from'], patch['transition']['to'])
+
+# Per-room workflow graphs, rebuilt when a room's workflow or workItems is replaced wholesale
+class ServerWorkflowGraphs:
+    def __init__(self):
+        self._graphs = {}   # room -> ServerWorkflowGraph
+
+    def get(self, room, room_state):
+        workflow = room_state.setdefault('workflow', {})
+        work_items = room_state.setdefault('workItems', [])
+        graph = self._graphs.get(room)
+        if graph is None or graph.workflow is not workflow or graph.work_items is not work_items:
+            graph = ServerWorkflowGraph(workflow, work_items)
+            self._graphs[room] = graph
+            logging.debug(f"Compiled workflow for room '{room}': {len(graph.states)} state(s)")
+        return graph
+
+    def invalidate(self, room):
+        """Drop a room's graph (it left memory or was deleted)."""
+        self._graphs.pop(room, None)
+
+workflow_graphs = ServerWorkflowGraphs()